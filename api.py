@@ -0,0 +1,378 @@
+# HTTP-Schnittstelle neben der UI: Dokument hochladen → Job-ID, Status/Log abfragen, Ergebnis als ZIP.
+# Nimmt nur an und liest aus der Job-Queue; konvertiert wird im Queue-Worker (job_queue.py → pipeline.py),
+# also mit derselben Engine-Wahl, denselben Optionen und derselben Parallelität (JOB_WORKERS) wie die UI.
+#
+#   python api.py [--host 0.0.0.0] [--port 8502]
+#
+#   POST   /jobs?name=skript.pdf&engine=Auto&tags=a,b   Rohdaten im Body → 202 {"id": …}
+#   GET    /jobs                                       letzte API-Jobs
+#   GET    /jobs/<id>                                  Status
+#   GET    /jobs/<id>/log?offset=0[&follow=1]          Log ab Byte-Offset (Header X-Log-Offset), follow streamt bis Job-Ende
+#   GET    /jobs/<id>/markdown                         Markdown
+#   GET    /jobs/<id>/bundle                           ZIP mit Markdown + assets/
+#   DELETE /jobs/<id>                                  abbrechen
+#   GET    /health
+#   GET    /metrics                                    Prometheus-Textformat (Stufen-Histogramme, Job-Zähler, Queue)
+import os, re, json, time, uuid, shutil, zipfile, argparse, threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+import job_queue
+import log_stream
+import spans
+from pipeline import DEFAULT_OPTIONS, OPTION_CHOICES, OPTION_LIMITS, OUT_DIR, job_options
+
+API_HOST = os.environ.get("API_HOST", "0.0.0.0")
+API_PORT = int(os.environ.get("API_PORT", "8502"))
+# Optional: Bearer-Token für alle Endpunkte außer /health
+API_TOKEN = os.environ.get("API_TOKEN", "")
+UPLOAD_DIR = os.environ.get("API_UPLOAD_DIR", "/app/data/state/api_uploads")
+API_OUT_DIR = os.environ.get("API_OUT_DIR", os.path.join(OUT_DIR, "_api"))
+MAX_UPLOAD_MB = float(os.environ.get("API_MAX_UPLOAD_MB", "512"))
+# Gleichzeitig bearbeitete Verbindungen (weitere warten im Listen-Backlog)
+MAX_CONNECTIONS = int(os.environ.get("API_MAX_CONNECTIONS", "32"))
+# Wartende Jobs in der Queue, ab denen neue Uploads mit 429 abgewiesen werden
+MAX_PENDING = int(os.environ.get("API_MAX_PENDING", "200"))
+FOLLOW_TIMEOUT = float(os.environ.get("API_FOLLOW_TIMEOUT", "600"))
+LOG_CHUNK = 256 * 1024
+
+# Vom Client nicht setzbar: Ablage wird von der API bestimmt
+_FIXED_OPTIONS = ("output_dir", "delete_after_success")
+_TRUE = ("1", "true", "yes", "ja", "on")
+_COMPRESSED_EXT = (".png", ".jpg", ".jpeg", ".webp", ".avif", ".gif", ".zip")
+
+
+class ApiError(Exception):
+    def __init__(self, status: int, message: str, headers: dict | None = None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+
+def parse_options(query: dict) -> dict:
+    """
+    Query-Parameter → Job-Optionen (Typ wie in DEFAULT_OPTIONS). Unbekannte Schlüssel, Werte außerhalb
+    von OPTION_CHOICES bzw. der Grenzen aus OPTION_LIMITS → 400.
+    """
+    opts = {}
+    for key, values in query.items():
+        if key == "name":
+            continue
+        if key not in DEFAULT_OPTIONS or key in _FIXED_OPTIONS:
+            raise ApiError(400, f"unbekannte Option: {key}")
+        raw = values[-1]
+        default = DEFAULT_OPTIONS[key]
+        try:
+            if isinstance(default, bool):
+                opts[key] = raw.strip().lower() in _TRUE
+            elif isinstance(default, int):
+                opts[key] = int(raw)
+            elif isinstance(default, list):
+                opts[key] = [t.strip() for t in raw.split(",") if t.strip()]
+            else:
+                opts[key] = raw
+        except ValueError:
+            raise ApiError(400, f"ungültiger Wert für {key}: {raw!r}")
+        if key in OPTION_CHOICES and opts[key] not in OPTION_CHOICES[key]:
+            raise ApiError(400, f"ungültiger Wert für {key}: {raw!r} (erlaubt: {', '.join(OPTION_CHOICES[key])})")
+        if key in OPTION_LIMITS:
+            lo, hi = OPTION_LIMITS[key]
+            if opts[key] < lo or (hi is not None and opts[key] > hi):
+                raise ApiError(400, f"{key} außerhalb des Bereichs {lo}–{hi if hi is not None else '∞'}: {raw!r}")
+    return opts
+
+
+def _safe_name(name: str) -> str:
+    name = os.path.basename((name or "").replace("\\", "/")).strip()
+    name = re.sub(r"[^\w.\- ]+", "_", name)
+    if not name or name.startswith("."):
+        raise ApiError(400, "Dateiname fehlt (?name=datei.pdf)")
+    return name
+
+
+_last_prune = 0.0
+
+
+def _prune_uploads() -> None:
+    # Der Worker löscht Uploads nach Erfolg; leere Job-Ordner gelegentlich mit aufräumen
+    global _last_prune
+    now = time.monotonic()
+    if now - _last_prune < 600:
+        return
+    _last_prune = now
+    try:
+        names = os.listdir(UPLOAD_DIR)
+    except OSError:
+        return
+    for n in names:
+        try:
+            os.rmdir(os.path.join(UPLOAD_DIR, n))
+        except OSError:
+            pass
+
+
+def _bundle_files(out_dir: str):
+    # Markdown + assets/ des Jobs; Chunk-Ordner und Manifeste (Präfix "_") bleiben draußen
+    for root, dirs, files in os.walk(out_dir):
+        dirs[:] = sorted(d for d in dirs if not d.startswith("_"))
+        for n in sorted(files):
+            if n.startswith("_") or n.endswith(".tmp"):
+                continue
+            path = os.path.join(root, n)
+            yield path, os.path.relpath(path, out_dir)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "md-converter-api/1"
+
+    def log_message(self, fmt, *args):
+        print(f"[api] {self.address_string()} {fmt % args}", flush=True)
+
+    # ---- Antworten ----
+    def _send(self, status: int, body: bytes, ctype: str, headers: dict | None = None) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, str(v))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _json(self, status: int, obj, headers: dict | None = None) -> None:
+        self._send(status, json.dumps(obj, ensure_ascii=False).encode("utf-8"), "application/json; charset=utf-8", headers)
+
+    def _dispatch(self, method: str) -> None:
+        url = urlsplit(self.path)
+        parts = [p for p in url.path.split("/") if p]
+        query = parse_qs(url.query, keep_blank_values=True)
+        try:
+            if parts == ["health"]:
+                return self._health()
+            if API_TOKEN and self.headers.get("Authorization", "") != f"Bearer {API_TOKEN}":
+                raise ApiError(401, "Token fehlt oder falsch", {"WWW-Authenticate": "Bearer"})
+            if parts == ["metrics"] and method == "GET":
+                return self._send(200, spans.prometheus_text(job_queue.counts()).encode("utf-8"), "text/plain; version=0.0.4; charset=utf-8")
+            if parts == ["jobs"] and method == "POST":
+                return self._submit(query)
+            if parts == ["jobs"] and method == "GET":
+                return self._list(query)
+            if len(parts) >= 2 and parts[0] == "jobs" and parts[1].isdigit():
+                job = job_queue.get_job(int(parts[1]))
+                if job is None or job["origin"] != "api":
+                    raise ApiError(404, "Job nicht gefunden")
+                action = parts[2] if len(parts) == 3 else ("" if len(parts) == 2 else None)
+                if method == "GET" and action == "":
+                    return self._json(200, _public(job))
+                if method == "DELETE" and action == "":
+                    return self._json(200, {"id": job["id"], "status": job_queue.request_cancel(job["id"])})
+                if method == "GET" and action == "log":
+                    return self._log(job, query)
+                if method == "GET" and action == "markdown":
+                    return self._markdown(job)
+                if method == "GET" and action == "bundle":
+                    return self._bundle(job)
+            raise ApiError(404, "unbekannter Endpunkt")
+        except ApiError as e:
+            self._json(e.status, {"error": str(e)}, e.headers)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_DELETE(self):
+        self._dispatch("DELETE")
+
+    # ---- Endpunkte ----
+    def _health(self) -> None:
+        self._json(200, {"ok": True, "worker": job_queue.worker_alive(), "queue": job_queue.counts()})
+
+    def _submit(self, query: dict) -> None:
+        name = _safe_name((query.get("name") or [self.headers.get("X-Filename", "")])[-1])
+        opts = parse_options(query)
+        try:
+            length = int(self.headers.get("Content-Length", ""))
+        except ValueError:
+            raise ApiError(411, "Content-Length fehlt")
+        if length <= 0:
+            raise ApiError(400, "leerer Upload")
+        if length > MAX_UPLOAD_MB * 1024 * 1024:
+            raise ApiError(413, f"Upload größer als {MAX_UPLOAD_MB:.0f} MB")
+        pending = self.server.pending_jobs()
+        if pending >= MAX_PENDING:
+            raise ApiError(429, f"{pending} Jobs warten bereits", {"Retry-After": 30})
+        _prune_uploads()
+        token = uuid.uuid4().hex[:12]
+        up_dir = os.path.join(UPLOAD_DIR, token)
+        os.makedirs(up_dir, exist_ok=True)
+        src = os.path.join(up_dir, name)
+        try:
+            with open(src + ".part", "wb") as fh:
+                remaining = length
+                while remaining:
+                    block = self.rfile.read(min(remaining, 1 << 20))
+                    if not block:
+                        raise ApiError(400, "Upload unvollständig")
+                    fh.write(block)
+                    remaining -= len(block)
+            os.replace(src + ".part", src)
+        except BaseException:
+            shutil.rmtree(up_dir, ignore_errors=True)
+            raise
+        # Upload nach Erfolg löschen; eigener Ausgabeordner je Job (gleiche Dateinamen kollidieren nicht)
+        opts.update(output_dir=os.path.join(API_OUT_DIR, token), delete_after_success=True)
+        job_id = job_queue.enqueue(src, job_options(opts), origin="api")
+        job_queue.ensure_worker()
+        self.server.note_enqueued()
+        self._json(202, {"id": job_id, "status": "queued", "status_url": f"/jobs/{job_id}"}, {"Location": f"/jobs/{job_id}"})
+
+    def _list(self, query: dict) -> None:
+        try:
+            limit = max(1, min(500, int((query.get("limit") or ["50"])[-1])))
+        except ValueError:
+            raise ApiError(400, "limit muss eine Zahl sein")
+        jobs = [j for j in job_queue.list_jobs(limit=limit * 3) if j["origin"] == "api"][:limit]
+        self._json(200, [_public(j) for j in jobs])
+
+    def _log(self, job: dict, query: dict) -> None:
+        try:
+            offset = max(0, int((query.get("offset") or ["0"])[-1]))
+        except ValueError:
+            raise ApiError(400, "offset muss eine Zahl sein")
+        path = job_queue.log_path(job["id"])
+        if (query.get("follow") or ["0"])[-1].lower() not in _TRUE:
+            data = b""
+            try:
+                with open(path, "rb") as fh:
+                    fh.seek(offset)
+                    data = fh.read(LOG_CHUNK)
+            except OSError:
+                pass
+            return self._send(200, data, "text/plain; charset=utf-8",
+                              {"X-Log-Offset": offset + len(data), "X-Job-Status": job["status"]})
+        # follow: bis zum Job-Ende streamen (Verbindungsende markiert das Ende der Antwort)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        deadline = time.monotonic() + FOLLOW_TIMEOUT
+        status = job["status"]
+        while True:
+            try:
+                with open(path, "rb") as fh:
+                    fh.seek(offset)
+                    while True:
+                        data = fh.read(LOG_CHUNK)
+                        if not data:
+                            break
+                        self.wfile.write(data)
+                        offset += len(data)
+                    self.wfile.flush()
+            except FileNotFoundError:
+                pass
+            if status not in job_queue.ACTIVE or time.monotonic() > deadline:
+                break
+            time.sleep(max(0.2, log_stream.LOG_FLUSH_INTERVAL))
+            status = job_queue.job_statuses([job["id"]]).get(job["id"], "")
+        self.close_connection = True
+
+    def _finished_output(self, job: dict) -> str:
+        if job["status"] != "done":
+            raise ApiError(409, f"Job ist nicht fertig (Status: {job['status']})", {"X-Job-Status": job["status"]})
+        if not job["output_path"] or not os.path.isfile(job["output_path"]):
+            raise ApiError(410, "Ergebnis nicht mehr vorhanden")
+        return job["output_path"]
+
+    def _markdown(self, job: dict) -> None:
+        out_md = self._finished_output(job)
+        with open(out_md, "rb") as fh:
+            body = fh.read()
+        self._send(200, body, "text/markdown; charset=utf-8",
+                   {"Content-Disposition": f'attachment; filename="{os.path.basename(out_md)}"'})
+
+    def _bundle(self, job: dict) -> None:
+        out_md = self._finished_output(job)
+        out_dir = os.path.dirname(out_md)
+        name = os.path.splitext(os.path.basename(out_md))[0]
+        # ZIP direkt in die Verbindung schreiben (kein Zwischenspeicher, Länge unbekannt → Verbindungsende)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/zip")
+        self.send_header("Content-Disposition", f'attachment; filename="{name}.zip"')
+        self.end_headers()
+        with zipfile.ZipFile(self.wfile, "w") as zf:
+            for path, arc in _bundle_files(out_dir):
+                method = zipfile.ZIP_STORED if arc.lower().endswith(_COMPRESSED_EXT) else zipfile.ZIP_DEFLATED
+                zf.write(path, arc, compress_type=method)
+        self.wfile.flush()
+        self.close_connection = True
+
+
+def _public(job: dict) -> dict:
+    keys = ("id", "status", "engine", "duration_ms", "cache", "error", "created", "started", "finished", "attempts")
+    out = {k: job[k] for k in keys}
+    out["source"] = os.path.basename(job["source"])
+    out["output"] = os.path.basename(job["output_path"]) if job["output_path"] else ""
+    return out
+
+
+class ApiServer(ThreadingHTTPServer):
+    """ThreadingHTTPServer mit begrenzter Zahl gleichzeitiger Verbindungen."""
+    daemon_threads = True
+
+    def __init__(self, address, max_connections: int = MAX_CONNECTIONS):
+        super().__init__(address, _Handler)
+        self._slots = threading.BoundedSemaphore(max_connections)
+        self._pending_lock = threading.Lock()
+        self._pending_checked = 0.0
+        self._pending = 0
+
+    def process_request(self, request, client_address):
+        self._slots.acquire()
+        try:
+            super().process_request(request, client_address)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def process_request_thread(self, request, client_address):
+        try:
+            super().process_request_thread(request, client_address)
+        finally:
+            self._slots.release()
+
+    def pending_jobs(self) -> int:
+        # wartende Jobs höchstens einmal pro Sekunde aus der DB lesen (Lasttests schicken viele Uploads)
+        with self._pending_lock:
+            now = time.monotonic()
+            if now - self._pending_checked > 1.0:
+                self._pending = job_queue.counts().get("queued", 0)
+                self._pending_checked = now
+            return self._pending
+
+    def note_enqueued(self) -> None:
+        with self._pending_lock:
+            self._pending += 1
+
+
+def serve(host: str = API_HOST, port: int = API_PORT) -> None:
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    httpd = ApiServer((host, port))
+    print(f"[api] lauscht auf {host}:{port} (max. {MAX_CONNECTIONS} Verbindungen)", flush=True)
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="HTTP-API für die Konvertierungs-Queue")
+    ap.add_argument("--host", default=API_HOST)
+    ap.add_argument("--port", type=int, default=API_PORT)
+    a = ap.parse_args()
+    serve(a.host, a.port)
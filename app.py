@@ -1,15 +1,15 @@
 # Dieser Code wurde unter Verwendung von generativer KI (OpenAI ChatGPT) generiert, geprüft und handbearbeitet.
-import os, io, shutil, time, subprocess, tempfile, re, json, csv
-from datetime import datetime
+import os, time, re
+from datetime import datetime, timedelta
 import streamlit as st
 
-# Import hier, damit Container schneller buildet (und App schneller lädt)
-from markitdown import MarkItDown
-from docling.document_converter import DocumentConverter
-
-IN_DIR  = "/app/data/in"
-OUT_DIR = "/app/data/out"
-AUTO_CHUNK_THRESHOLD = 0  # immer chunken: jedes PDF mit >=1 Seite wird gechunkt
+# Konvertierung läuft im Queue-Worker (job_queue.py → pipeline.py); die UI reiht Jobs nur ein
+import engine_registry
+import job_queue
+import pipeline
+import watch_manifest
+import job_store
+from pipeline import IN_DIR, OUT_DIR, MAX_PARALLEL_CHUNKS, marker_worker, conversion_cache, asset_optimize, log_job
 
 os.makedirs(IN_DIR, exist_ok=True)
 os.makedirs(OUT_DIR, exist_ok=True)
@@ -24,22 +24,12 @@ except Exception as e:
     def load_markdown_and_repair(*args, **kwargs):
         raise RuntimeError(f"repair_tools.py nicht gefunden oder fehlerhaft: {e}")
 
-try:
-    from housekeeping import delete_from_inbox  # def delete_from_inbox(path:str) -> None
-except Exception:
-    def delete_from_inbox(path: str) -> None:
-        try:
-            if os.path.exists(path):
-                os.remove(path)
-        except Exception:
-            pass
-
 tab_convert, tab_watch, tab_repair, tab_merge, tab_joblog, tab_help = st.tabs(["Konvertieren", "Auto-Watch", "Repair", "Merge", "Job-Log", "Hilfe"])
 with tab_help:
     st.subheader("Hilfe & Quickstart")
     st.markdown("""
 **Schnellstart**
-1. Datei(en) hochladen → **Konvertieren** drücken  
+1. Datei(en) hochladen → **Konvertieren** drücken (Jobs laufen im Hintergrund weiter, auch wenn der Tab geschlossen wird)  
 2. Optional **Ausgabename** setzen (sonst verwenden wir den *slug*).  
 3. Ergebnis-Ordner `./data/out/<slug>/` in Obsidian übernehmen.
 
@@ -56,574 +46,143 @@ with tab_help:
 
 with st.sidebar:
     st.header("Einstellungen")
-    engine = st.selectbox("Engine", ["Auto", "MarkItDown", "Docling", "Marker", "pptx2md"])
+    engine = st.selectbox("Engine", ["Auto", "MarkItDown", "Docling", "Marker", "pptx2md", "PDF-Text"])
+    auto_pdf_text = st.checkbox("Auto: digitale PDFs per Textlayer (schnell, ohne Modelle)", value=True, help="PDFs mit vollständigem Textlayer gehen an PDF-Text statt Marker. Keine Bilder/Tabellenstruktur.")
     add_frontmatter = st.checkbox("Obsidian Frontmatter hinzufügen", value=True)
     tags_default = st.text_input("Standard-Tags (kommagetrennt)", "studium,import")
     output_name = st.text_input("Ausgabename (ohne .md, optional)", "")
     force_ocr = st.checkbox("OCR forcieren (Marker)", value=False)
+    ocr_routing = st.checkbox("OCR pro Seite entscheiden (gemischte PDFs)", value=False, help="Seiten ohne brauchbaren Textlayer laufen mit OCR, digitale Seiten ohne. Ersetzt „OCR forcieren“ für gechunkte PDFs.")
     keep_images = st.checkbox("Bilder extrahieren", value=True)
     ocr_engine = st.selectbox("Docling OCR", ["auto", "easyocr", "tesseract", "rapidocr"], index=0)
-    enable_watcher = st.checkbox("Auto-Watch: data/in überwachen", value=False)
-    watch_interval = st.number_input("Watch-Intervall (Sek.)", min_value=2, max_value=120, value=10, step=1)
-    live_marker_logs = st.checkbox("Live-Logs (Marker) anzeigen", value=True, help="Zeigt Marker-Ausgabe (stdout/stderr) während der Konvertierung live an.")
-    chunk_size = st.number_input("Chunk-Größe (Seiten)", min_value=10, max_value=100, value=20, step=5)
+    watch_cfg = job_queue.get_watch()
+    enable_watcher = st.checkbox("Auto-Watch: data/in überwachen", value=watch_cfg["enabled"], help="Läuft im Queue-Worker weiter, auch ohne geöffneten Browser-Tab.")
+    watch_settle = st.number_input("Watch: Datei stabil seit (Sek.)", min_value=1, max_value=120, value=int(watch_cfg["settle"] or 2), step=1, help="Neue Dateien werden erst eingereiht, wenn Größe und Änderungszeit so lange unverändert sind (noch kopierende Dateien bleiben liegen).")
+    use_marker_worker = st.checkbox("Marker-Worker (Modelle vorladen)", value=os.environ.get("MARKER_WORKER", "1") != "0" and marker_worker is not None, disabled=marker_worker is None, help="Hält Marker-Modelle in langlebigen Worker-Prozessen geladen. Fallback: marker_single pro Aufruf.")
+    live_marker_logs = st.checkbox("Live-Logs anzeigen", value=True, help="Zeigt das Log (u. a. Marker stdout/stderr) laufender und fertiger Jobs an.")
+    chunk_mode = st.selectbox("Chunking", ["fest", "adaptiv"], index=0, help="adaptiv: Chunks nach geschätzten Seitenkosten (Textlayer, Bilder, Seitengröße) statt fester Seitenzahl.")
+    chunk_size = st.number_input("Chunk-Größe (Seiten bzw. Kosten-Ziel)", min_value=10, max_value=100, value=20, step=5, help="Bei „adaptiv“: Ziel-Kosten je Chunk in Textseiten-Äquivalenten (eine A4-Textseite = 1).")
+    max_parallel_chunks = st.number_input("Parallele Chunks (max.)", min_value=1, max_value=max(1, os.cpu_count() or 1), value=min(MAX_PARALLEL_CHUNKS, max(1, os.cpu_count() or 1)), step=1, help="Wie viele PDF-Chunks gleichzeitig konvertiert werden. Default über ENV MAX_PARALLEL_CHUNKS.")
     cleanup_chunks = st.checkbox("Chunk-Ordner nach Merge löschen", value=True, help="Temporäre _chunk_XX-Verzeichnisse werden nach dem Zusammenführen entfernt.")
     delete_after_success = st.checkbox("Nach Erfolg: Datei aus data/in löschen", value=False)
+    queue_workers = st.number_input("Parallele Jobs (Queue-Worker)", min_value=1, max_value=max(1, os.cpu_count() or 1), value=job_queue.get_concurrency(), step=1, help="Wie viele Dateien der Hintergrund-Worker gleichzeitig konvertiert. Default über ENV JOB_WORKERS.")
+    if st.button("Engines neu laden", help="Vorgehaltene Docling-/MarkItDown-Instanzen verwerfen (z. B. nach Modell-Updates)."):
+        engine_registry.evict()
+        job_queue.request_engine_reload()
+    use_cache = st.checkbox("Konvertierungs-Cache verwenden", value=os.environ.get("CONVERSION_CACHE", "1") != "0" and conversion_cache is not None, disabled=conversion_cache is None, help="Gleiche Datei + gleiche Einstellungen → Ergebnis aus /app/.cache statt erneuter Engine-Lauf.")
+    image_formats = asset_optimize.available_formats() if asset_optimize is not None else []
+    image_optimize = st.checkbox("Bilder optimieren", value=pipeline.DEFAULT_OPTIONS["image_optimize"] and bool(image_formats), disabled=not image_formats, help="Extrahierte Bilder nach der Konvertierung parallel verkleinern (PNG verlustfrei, JPEG ohne Neuquantisierung). Benötigt Pillow; Default über ENV IMAGE_OPTIMIZE=1.")
+    image_format = st.selectbox("Bildformat", image_formats or ["original"], index=0, disabled=not image_optimize, help="original: Format behalten (BMP/TIFF → PNG). webp/avif: umwandeln, nur übernommen, wenn kleiner.")
+    image_max_dim = st.number_input("Bilder: max. Kantenlänge (px, 0 = unverändert)", min_value=0, max_value=20000, value=0, step=100, disabled=not image_optimize)
+
+if int(queue_workers) != job_queue.get_concurrency():
+    job_queue.set_concurrency(int(queue_workers))
 
 if output_name and not re.match(r"^[\w\- ]+$", output_name):
     st.warning("Ausgabename: Erlaubt sind Buchstaben, Zahlen, Unterstrich und Bindestrich.")
 
-def slugify(name: str) -> str:
-    base = os.path.splitext(os.path.basename(name))[0]
-    base = re.sub(r"[^\w\-]+","-", base.lower()).strip("-")
-    return base or f"doc-{int(time.time())}"
-
-def write_frontmatter(md_text: str, title: str, src_name: str, tags: list[str]) -> str:
-    fm = {
-        "title": title,
-        "source_file": src_name,
-        "imported_at": datetime.now().isoformat(timespec="seconds"),
-        "tags": tags
-    }
-    return f"---\n{json.dumps(fm, ensure_ascii=False, indent=2)}\n---\n\n{md_text}"
-
-def postprocess_markdown(md_text: str, assets_rel="./assets") -> str:
-    # 1) Bildpfade relativieren
-    md_text = re.sub(
-        r'!\[(.*?)\]\((?:\./)?(?:assets/)?([^\)\s]+)\)',
-        lambda m: f"![{m.group(1)}]({assets_rel}/{m.group(2)})",
-        md_text,
-    )
-
-    # 2) Zeilenweise Reinigung (Seitenzahlen, häufige Footer/Köpfe)
-    lines = md_text.splitlines()
-    cleaned = []
-    freq = {}
-    for ln in lines:
-        key = ln.strip()
-        if 0 < len(key) <= 60:
-            freq[key] = freq.get(key, 0) + 1
-
-    def looks_like_footer(s: str) -> bool:
-        s_low = s.strip().lower()
-        # reine Seitenzahlen
-        if re.match(r"^\d{1,4}$", s_low):
-            return True
-        # Seite X / Seite X von Y / Page X / Page X of Y
-        if re.match(r"^(seite|page)\s+\d+(\s+(von|of)\s+\d+)?$", s_low):
-            return True
-        return False
-
-    repeated = {s for s, c in freq.items() if c >= 5 and looks_like_footer(s)}
-
-    for ln in lines:
-        raw = ln.rstrip()
-        key = raw.strip()
-        if key and (key in repeated or looks_like_footer(key)):
-            continue
-        if "|" in raw:
-            raw = re.sub(r" {2,}", " ", raw)
-        cleaned.append(raw)
-
-    md_text = "\n".join(cleaned)
-
-    # 3) Doppelte Leerzeilen normalisieren
-    md_text = re.sub(r"\n{3,}", "\n\n", md_text)
-
-    return md_text
-
-
-# Helper: Entfernt YAML-Frontmatter am Dokumentanfang, falls vorhanden.
-def strip_frontmatter(md: str) -> str:
-    """Entfernt YAML-Frontmatter am Dokumentanfang, falls vorhanden."""
-    if md.lstrip().startswith("---"):
-        lines = md.splitlines()
-        if lines and lines[0].strip() == "---":
-            for i in range(1, len(lines)):
-                if lines[i].strip() == "---":
-                    return "\n".join(lines[i+1:]).lstrip("\n")
-    return md
-
-def log_job(row: dict):
-    logfile = "/app/data/joblog.csv"
-    file_exists = os.path.exists(logfile)
-    # Sichere Feldreihenfolge
-    keys = ["timestamp","source","engine","ocr","duration_ms","output_path","status","error"]
-    for k in keys:
-        if k not in row:
-            row[k] = ""
-    with open(logfile, "a", newline="", encoding="utf-8") as fh:
-        w = csv.DictWriter(fh, fieldnames=keys)
-        if not file_exists:
-            w.writeheader()
-        w.writerow(row)
-
-def read_joblog_last(n: int = 10):
-    logfile = "/app/data/joblog.csv"
-    if not os.path.exists(logfile):
-        return []
-    with open(logfile, "r", encoding="utf-8") as fh:
-        r = csv.DictReader(fh)
-        rows = list(r)
-    if not rows:
-        return []
-    return rows[-n:][::-1]
-
-def convert_markitdown(path: str) -> str:
-    md = MarkItDown()
-    res = md.convert(path)
-    return res.text_content
-
-def convert_docling(path: str) -> str:
-    # Docling nutzt intern Converter-Pipelines; wir schalten über env/flags grob um
-    from docling.document_converter import DocumentConverter
-    from docling.datamodel.base_models import ConversionResult
-
-    # Primitive Umschaltung: Wir setzen ENV-Flags, die du im Container kontrollierst
-    # und die Docling-Pipelines (oder deine eigenen) auslesen können.
-    # Fallback: Wir probieren, ohne OCR zu konvertieren und nutzen nur bei Bedarf OCR.
-    want_ocr = os.path.splitext(path)[1].lower() in [".pdf", ".png", ".jpg", ".jpeg", ".tif", ".tiff"]
-
-    # Vor-OCR für Tesseract via ocrmypdf (optional, falls installiert)
-    if ocr_engine == "tesseract" and want_ocr:
-        try:
-            import shutil, tempfile, subprocess
-            tmp_pdf = path
-            if path.lower().endswith(".pdf"):
-                ocr_out = tempfile.NamedTemporaryFile(suffix=".pdf", delete=False).name
-                subprocess.run(["ocrmypdf", "--skip-text", path, ocr_out, "--optimize", "0"], check=True)
-                tmp_pdf = ocr_out
-            # Danach normale Konvertierung auf OCR-PDF
-            conv = DocumentConverter()
-            return conv.convert(tmp_pdf).document.export_to_markdown()
-        except Exception as _:
-            # Fallback: normale Konvertierung
-            pass
-    # EasyOCR / RapidOCR – hier verlassen wir uns auf Docling-Defaults
-    # (EasyOCR ist typischer Default; RapidOCR aktiviert Docling i. d. R., wenn vorhanden)
-    conv = DocumentConverter()
-    result: ConversionResult = conv.convert(path)
-    return result.document.export_to_markdown()
-
-def convert_pptx2md(path: str, out_dir: str) -> str:
-    # legt Bilder im Ordner an; schreibt stdout als MD
-    import subprocess, os
-    assets = os.path.join(out_dir, "assets")
-    os.makedirs(assets, exist_ok=True)
-    # --img-dir legt das Ziel für exportierte Bilder fest
-    res = subprocess.run(
-        ["pptx2md", path, "--img-dir", assets],
-        check=True, capture_output=True, text=True
-    )
-    return res.stdout
-
-
-def _marker_advice(force_ocr: bool, keep_images: bool) -> str:
-    tips = [
-        "Prüfe, ob das PDF passwortgeschützt oder beschädigt ist.",
-        f"Schalte OCR {'aus' if force_ocr else 'ein'} (Option „OCR forcieren“) und versuche es erneut.",
-        "Setze die Chunk-Größe kleiner (z. B. 10–15 Seiten).",
-        "Lass testweise Bilder-Extraktion an, falls Layout-Analyse an Bilder gebunden ist.",
-        "Teste die gleiche Datei einmal mit Docling (Engine „Docling“), um ein Datei- oder Parserproblem auszuschließen.",
-    ]
-    if not keep_images:
-        tips.append("Hinweis: Bilder-Extraktion ist deaktiviert – das ist ok, kann aber die Layout-Erkennung beeinflussen.")
-    return "- " + "\n- ".join(tips)
-
-def convert_marker_cli(path: str, out_dir: str, force_ocr: bool, keep_images: bool, live_cb=None) -> tuple[str, str]:
-    """
-    Runs marker_single and returns (markdown_text, debug_log).
-    On failure, tries a fallback run toggling --force_ocr.
-    Raises RuntimeError with combined stderr if both attempts fail.
-    live_cb: optional callback(line:str) for live logs.
-    """
-    def _run_marker(_force_ocr: bool) -> tuple[bool, str, str]:
-        args = [
-            "marker_single",
-            path,
-            "--output_format", "markdown",
-            "--output_dir", out_dir,
-        ]
-        if _force_ocr:
-            args.append("--force_ocr")
-        if not keep_images:
-            args.append("--disable_image_extraction")
-
-        if callable(live_cb):
-            # Stream live output
-            proc = subprocess.Popen(args, text=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, bufsize=1)
-            collected = []
-            try:
-                for line in proc.stdout:
-                    collected.append(line.rstrip("\n"))
-                    live_cb(line.rstrip("\n"))
-            finally:
-                proc.wait()
-            ok = proc.returncode == 0
-            return ok, "\n".join(collected), ""  # stderr gemerged in stdout
-        else:
-            # capture stdout/stderr to show in UI
-            proc = subprocess.run(args, text=True, capture_output=True)
-            ok = proc.returncode == 0
-            return ok, proc.stdout, proc.stderr
-
-    # First attempt
-    ok1, out1, err1 = _run_marker(force_ocr)
-    if ok1:
-        # Pick newest .md from out_dir (recursive)
-        md_candidates = []
-        for root, _dirs, files in os.walk(out_dir):
-            for n in files:
-                if n.lower().endswith(".md"):
-                    md_candidates.append(os.path.join(root, n))
-        if not md_candidates:
-            raise RuntimeError(
-                "Marker hat keine Markdown-Datei erzeugt.\n\nLogs:\n" + (err1 or out1 or "(keine Logs)") +
-                "\n\nEmpfehlungen:\n" + _marker_advice(force_ocr, keep_images)
-            )
-        md_candidates.sort(key=lambda p: os.path.getmtime(p), reverse=True)
-        with open(md_candidates[0], "r", encoding="utf-8") as fh:
-            md_text = fh.read()
-        # Sanity check: empty or trivially short output is suspicious
-        if not md_text or len(md_text.strip()) < 50:
-            raise RuntimeError(
-                "Sanity check fehlgeschlagen: Marker hat eine ungewöhnlich kurze Markdown-Datei erzeugt.\n\n"
-                "Empfehlungen:\n" + _marker_advice(force_ocr, keep_images)
-            )
-        return md_text, err1 or ""
-
-    # Fallback attempt: toggle force_ocr
-    ok2, out2, err2 = _run_marker(not force_ocr)
-    if ok2:
-        md_candidates = []
-        for root, _dirs, files in os.walk(out_dir):
-            for n in files:
-                if n.lower().endswith(".md"):
-                    md_candidates.append(os.path.join(root, n))
-        if not md_candidates:
-            raise RuntimeError(
-                "Marker (Fallback) hat keine Markdown-Datei erzeugt.\n\nErster Lauf:\n{}\n\nFallback-Logs:\n{}\n\nEmpfehlungen:\n{}".format(
-                    err1 or "(keine Logs)", err2 or "(keine Logs)", _marker_advice(force_ocr, keep_images)
-                )
-            )
-        md_candidates.sort(key=lambda p: os.path.getmtime(p), reverse=True)
-        with open(md_candidates[0], "r", encoding="utf-8") as fh:
-            md_text = fh.read()
-        # Sanity check: empty or trivially short output is suspicious
-        if not md_text or len(md_text.strip()) < 50:
-            raise RuntimeError(
-                "Sanity check fehlgeschlagen: Marker hat eine ungewöhnlich kurze Markdown-Datei erzeugt.\n\n"
-                "Empfehlungen:\n" + _marker_advice(force_ocr, keep_images)
-            )
-        return md_text, (err1 or "") + "\n" + (err2 or "")
-
-    # Both failed: raise with combined logs
-    combined = "First attempt (force_ocr={}):\n{}\n\nFallback (force_ocr={}):\n{}".format(
-        force_ocr, err1 or out1 or "(no logs)", not force_ocr, err2 or out2 or "(no logs)"
-    )
-    raise RuntimeError("Marker failed on both attempts.\n\n" + combined + "\n\nEmpfehlungen:\n" + _marker_advice(force_ocr, keep_images))
-
-
-def convert_marker_chunked(src_pdf: str, target_dir: str, force_ocr: bool, keep_images: bool, chunk_size: int, live_cb=None, cleanup: bool = False) -> tuple[str, str]:
-    """
-    Verarbeitet ein PDF in Chunks mit Marker. Fällt pro Chunk auf Docling zurück.
-    Gibt (merged_markdown, combined_logs) zurück.
-    """
-    md_parts: list[tuple[str, tuple[int,int]]] = []
-    chunk_assets_dirs: list[str] = []
-    logs = []
-    chunk_dirs: list[str] = []
-
-    chunks = chunk_pdf(src_pdf, chunk_size)
-    for idx, (tmp_pdf, (start, end)) in enumerate(chunks, start=1):
-        chunk_out = os.path.join(target_dir, f"_chunk_{idx:02d}")
-        os.makedirs(chunk_out, exist_ok=True)
-        chunk_dirs.append(chunk_out)
-        try:
-            md_text, mk_logs = convert_marker_cli(tmp_pdf, chunk_out, force_ocr, keep_images, live_cb=live_cb)
-            logs.append(f"[chunk {idx} {start}-{end}] MARKER ok")
-            if mk_logs:
-                logs.append(mk_logs)
-        except Exception as e:
-            logs.append(f"[chunk {idx} {start}-{end}] MARKER failed: {e}")
-            try:
-                md_text = convert_docling(tmp_pdf)
-                logs.append(f"[chunk {idx} {start}-{end}] DOCLING ok")
-            except Exception as e2:
-                logs.append(f"[chunk {idx} {start}-{end}] DOCLING failed: {e2}")
-                raise RuntimeError("\n".join(logs))
-        # Determine asset source for this chunk: prefer <chunk>/assets, otherwise the chunk root
-        src_assets = os.path.join(chunk_out, "assets") if os.path.isdir(os.path.join(chunk_out, "assets")) else chunk_out
-        chunk_assets_dirs.append(src_assets)
-        md_parts.append((md_text, (start, end)))
-
-    merged_md, assets_report = merge_chunk_output(md_parts, os.path.join(target_dir, "assets"), chunk_assets_dirs)
-    if assets_report:
-        logs.append(assets_report)
-        # Optional: temporäre Chunk-Ordner entfernen
-        if cleanup:
-            for d in chunk_dirs:
-                try:
-                    shutil.rmtree(d, ignore_errors=True)
-                except Exception:
-                    pass
-        return merged_md, "\n".join(logs)
-
-def convert_plain_text(path: str) -> str:
-    with open(path, "r", encoding="utf-8", errors="ignore") as fh:
-        return fh.read()
-def build_page_chunks(total_pages: int, chunk_size: int) -> list[tuple[int,int]]:
-    chunks = []
-    start = 1
-    while start <= total_pages:
-        end = min(start + chunk_size - 1, total_pages)
-        chunks.append((start, end))
-        start = end + 1
-    return chunks
-
-def chunk_pdf(src_path: str, chunk_size: int) -> list[tuple[str, tuple[int,int]]]:
-    """
-    Schneidet src_path in temporäre PDFs mit je chunk_size Seiten.
-    Rückgabe: Liste [(temp_pdf_path, (start,end)), ...], 1-basiert.
-    """
-    from pypdf import PdfReader, PdfWriter
-    reader = PdfReader(src_path)
-    n = len(reader.pages)
-    chunks = []
-    for (start, end) in build_page_chunks(n, chunk_size):
-        writer = PdfWriter()
-        for p in range(start, end+1):
-            writer.add_page(reader.pages[p-1])
-        tmp = tempfile.NamedTemporaryFile(suffix=".pdf", delete=False).name
-        with open(tmp, "wb") as oh:
-            writer.write(oh)
-        chunks.append((tmp, (start, end)))
-    return chunks
-
-def merge_chunk_output(md_parts: list[tuple[str, tuple[int,int]]], final_assets_dir: str, chunk_assets_dirs: list[str]) -> tuple[str, str]:
-    """
-    md_parts: Liste [(md_text, (start,end)), ...]
-    chunk_assets_dirs: parallele Liste mit Pfaden zu den assets-Quellordnern je Chunk
-    Kopiert Assets in final_assets_dir, präfixiert Links je Chunk, baut eine TOC pro Chunk und setzt Überschriften.
-    """
-    os.makedirs(final_assets_dir, exist_ok=True)
-    merged = []
-    toc = ["## Inhalt (Chunks)"]
-    report_lines = []
-    for idx, ((md_text, (start, end)), src_assets) in enumerate(zip(md_parts, chunk_assets_dirs), start=1):
-        anchor = f"chunk-{idx:02d}-seiten-{start}-{end}"
-        heading = f"## Chunk {idx:02d} (Seiten {start}–{end})"
-        toc.append(f"- [{heading[3:]}](#{anchor})")
-
-        prefix = f"c{idx:02d}_"
-        found_cnt = 0
-        copied_cnt = 0
-        if os.path.isdir(src_assets):
-            # Copy images recursively (Marker kann Unterordner wie images/, figures/ etc. anlegen)
-            for root, _dirs, files in os.walk(src_assets):
-                for name in files:
-                    if re.search(r"\.(png|jpe?g|webp|gif|svg|tif|tiff|bmp|heic|avif)$", name, re.IGNORECASE):
-                        found_cnt += 1
-                        src = os.path.join(root, name)
-                        dst = os.path.join(final_assets_dir, prefix + name)
-                        try:
-                            shutil.copy2(src, dst)
-                            copied_cnt += 1
-                        except Exception:
-                            base, ext = os.path.splitext(name)
-                            k = 1
-                            while True:
-                                alt = f"{prefix}{base}_{k}{ext}"
-                                dst_alt = os.path.join(final_assets_dir, alt)
-                                if not os.path.exists(dst_alt):
-                                    shutil.copy2(src, dst_alt)
-                                    copied_cnt += 1
-                                    break
-                                k += 1
-        # Berichtzeile je Chunk
-        report_lines.append(f"[assets] Chunk {idx:02d} {start}-{end}: gefunden={found_cnt}, kopiert={copied_cnt}, quelle='{src_assets}'")
-
-        # Bildlinks im Markdown auf ./assets/ mit Chunk-Präfix umschreiben
-        def _rewr_any(m):
-            alt, href = m.group(1), m.group(2)
-            # Skip external/data/anchor links
-            if href.startswith(("http://", "https://", "data:", "#")):
-                return m.group(0)
-            fname = os.path.basename(href)
-            return f"![{alt}](./assets/{prefix}{fname})"
-        md_text = re.sub(r'!\[(.*?)\]\(([^)\s]+)\)', _rewr_any, md_text)
-
-        # Abschnitt in den Merge-Container aufnehmen
-        merged.append(f"\n\n<a name=\"{anchor}\"></a>\n{heading}\n\n{md_text}")
-
-    merged_text = "\n\n".join(toc) + "\n\n" + "\n\n".join(merged)
-    return merged_text, "\n".join(report_lines)
-
-def read_joblog_all():
-        logfile = "/app/data/joblog.csv"
-        if not os.path.exists(logfile):
-            return []
-        with open(logfile, "r", encoding="utf-8") as fh:
-            r = csv.DictReader(fh)
-            return list(r)
-
-
-# Helper: get page count of a PDF
-def get_pdf_page_count(path: str) -> int:
-    from pypdf import PdfReader
-    try:
-        return len(PdfReader(path).pages)
-    except Exception:
-        return -1
-
-def choose_engine(path: str, engine_choice: str) -> str:
-    ext = os.path.splitext(path)[1].lower()
-    if engine_choice != "Auto":
-        return engine_choice
-    # Heuristik:
-    if ext in [".pdf"]:
-        return "Marker"       # sehr gute PDF-Qualität
-    if ext in [".ppt", ".pptx"]:
-        return "pptx2md"
-    if ext in [".txt"]:
-        return "plain"
-    if ext in [".ppt", ".pptx", ".doc", ".docx", ".xls", ".xlsx", ".html", ".htm", ".epub"]:
-        return "MarkItDown"
-    # Fallback
-    return "Docling"
+# Einstellungen für neue Jobs (Schlüssel siehe pipeline.DEFAULT_OPTIONS)
+opts = pipeline.job_options({
+    "engine": engine,
+    "auto_pdf_text": auto_pdf_text,
+    "add_frontmatter": add_frontmatter,
+    "tags": [t.strip() for t in tags_default.split(",") if t.strip()],
+    "output_name": output_name.strip(),
+    "force_ocr": force_ocr,
+    "ocr_routing": ocr_routing,
+    "keep_images": keep_images,
+    "ocr_engine": ocr_engine,
+    "use_marker_worker": use_marker_worker,
+    "chunk_mode": chunk_mode,
+    "chunk_size": int(chunk_size),
+    "max_parallel_chunks": int(max_parallel_chunks),
+    "cleanup_chunks": cleanup_chunks,
+    "delete_after_success": delete_after_success,
+    "use_cache": use_cache,
+    "image_optimize": image_optimize,
+    "image_format": image_format,
+    "image_max_dim": int(image_max_dim),
+})
+
+JOB_STATUS_LABELS = {"queued": "wartet", "running": "läuft", "done": "fertig", "error": "Fehler", "cancelled": "abgebrochen"}
+
+WATCH_STATUS_LABELS = {"queued": "eingereiht", "done": "fertig", "error": "Fehler (Wiederholung geplant)", "failed": "aufgegeben", "cancelled": "abgebrochen"}
+
+def enqueue_files(paths: list[str], origin: str) -> list[int]:
+    ids = [job_queue.enqueue(p, opts, origin=origin) for p in paths]
+    job_queue.ensure_worker()
+    return ids
+
+def render_job(job: dict) -> None:
+    jid = job["id"]
+    status = job["status"]
+    if status in job_queue.ACTIVE:
+        if st.button("Abbrechen", key=f"cancel_{jid}"):
+            job_queue.request_cancel(jid)
+            st.rerun()
+        if job["cancel_requested"]:
+            st.caption("Abbruch angefordert …")
+    if status == "error":
+        st.error(job["error"][:2000] or "Fehler (siehe Log)")
+    log_text = job_queue.read_log(jid, max_bytes=32 * 1024) if live_marker_logs or status == "error" else ""
+    if log_text:
+        st.code(log_text, language="bash")
+    if status == "done" and job["output_path"] and os.path.isfile(job["output_path"]):
+        st.success(f"Fertig: {job['output_path']} (Assets: {os.path.join(os.path.dirname(job['output_path']), 'assets')})")
+        if job["cache"] == "hit":
+            st.caption("Konvertierungs-Cache: Treffer – Ergebnis wiederhergestellt, keine Engine ausgeführt.")
+        # Läuft alle 2 s für jeden fertigen Job (auch zugeklappt): nur die Vorschau lesen,
+        # die ganze Datei erst für den Download des gewählten Jobs
+        with open(job["output_path"], "r", encoding="utf-8") as fh:
+            st.markdown(fh.read(8000))
+        if st.checkbox("Download anbieten", key=f"dl_on_{jid}"):
+            with open(job["output_path"], "rb") as fh:
+                st.download_button("Markdown herunterladen", fh.read(), file_name=os.path.basename(job["output_path"]), mime="text/markdown", key=f"dl_{jid}")
+        if job["engine"] == "Marker":
+            asset_lines = "\n".join(ln for ln in job_queue.read_log(jid).splitlines() if ln.startswith("[assets]"))
+            st.caption("Asset-Kopierbericht")
+            st.code(asset_lines or "(keine Assets gefunden oder kopiert)", language="bash")
+
+def render_jobs(origin: str | None = None, limit: int = 20) -> None:
+    jobs = [j for j in job_queue.list_jobs(limit=limit * 3) if origin is None or j["origin"] == origin][:limit]
+    c = job_queue.counts()
+    pid = job_queue.worker_pid()
+    worker = f"läuft (PID {pid})" if pid else ("läuft" if job_queue.worker_alive() else "gestoppt")
+    st.caption(f"Queue: {c.get('queued', 0)} wartend · {c.get('running', 0)} laufend · {c.get('done', 0)} fertig · {c.get('error', 0)} Fehler · Worker {worker}")
+    if any(j["status"] in job_queue.ACTIVE for j in jobs) and not job_queue.worker_alive():
+        job_queue.ensure_worker()
+    for job in jobs:
+        dur = f" · {job['duration_ms']} ms" if job["duration_ms"] else ""
+        engine_lbl = f" · {job['engine']}" if job["engine"] else ""
+        label = f"#{job['id']} {os.path.basename(job['source'])} — {JOB_STATUS_LABELS.get(job['status'], job['status'])}{engine_lbl}{dur}"
+        with st.expander(label, expanded=job["status"] == "running"):
+            render_job(job)
+
+# Job-Liste regelmäßig neu zeichnen, ohne das ganze Skript neu laufen zu lassen (Streamlit >= 1.37)
+_fragment = getattr(st, "fragment", None)
+if _fragment is not None:
+    render_jobs = _fragment(run_every=2)(render_jobs)
+
 
 with tab_convert:
     uploaded = st.file_uploader("Datei(en) hochladen", type=None, accept_multiple_files=True)
 
     if uploaded and st.button("Konvertieren"):
+        paths = []
         for f in uploaded:
-            _t0 = time.time()
             # Speichere Upload
             input_path = os.path.join(IN_DIR, f.name)
             with open(input_path, "wb") as out:
                 out.write(f.read())
+            paths.append(input_path)
+        ids = enqueue_files(paths, origin="ui")
+        st.success(f"{len(ids)} Job(s) eingereiht: " + ", ".join(f"#{i}" for i in ids))
 
-            slug = slugify(f.name)
-            # Ausgabename bestimmen
-            base_name = output_name.strip() or slug
-            target_dir = os.path.join(OUT_DIR, slug)
-            assets_dir = os.path.join(target_dir, "assets")
-            os.makedirs(target_dir, exist_ok=True)
-            os.makedirs(assets_dir, exist_ok=True)
-
-            pick = choose_engine(input_path, engine)
-            st.write(f"**{f.name}** → Engine: `{pick}`")
-            st.caption(f"Ausgewählte Engine: **{pick}**")
-
-            with st.status(f"Konvertiere **{f.name}** …", expanded=False) as status:
-                try:
-                    if pick == "MarkItDown":
-                        md_text = convert_markitdown(input_path)
-                    elif pick == "Docling":
-                        md_text = convert_docling(input_path)
-                    elif pick == "pptx2md":
-                        md_text = convert_pptx2md(input_path, target_dir)
-                    elif pick == "plain":
-                        md_text = convert_plain_text(input_path)
-                    else:  # Marker (CLI)
-                        live_lines = []
-                        live_area = None
-                        def _cb(line: str):
-                            live_lines.append(line)
-                            if live_area is not None:
-                                # Update live text (truncate to last ~200 lines for performance)
-                                live_area.code("\n".join(live_lines[-200:]), language="bash")
-                        if live_marker_logs:
-                            with st.expander("Live-Logs (Marker)", expanded=False):
-                                live_area = st.empty()
-                        is_pdf = input_path.lower().endswith(".pdf")
-                        use_chunk = False
-                        if is_pdf:
-                            pc = get_pdf_page_count(input_path)
-                            if pc != -1 and pc > int(AUTO_CHUNK_THRESHOLD):
-                                use_chunk = True
-                                st.caption(f"Auto-Chunk aktiv: {pc} Seiten > {int(AUTO_CHUNK_THRESHOLD)} → Chunk-Größe {int(chunk_size)}.")
-                        if is_pdf and use_chunk:
-                            md_text, marker_logs = convert_marker_chunked(
-                                input_path, target_dir, force_ocr, keep_images, int(chunk_size),
-                                live_cb=_cb if live_marker_logs else None,
-                                cleanup=cleanup_chunks
-                            )
-                        else:
-                            md_text, marker_logs = convert_marker_cli(
-                                input_path, target_dir, force_ocr, keep_images,
-                                live_cb=_cb if live_marker_logs else None
-                            )
-
-                    md_text = postprocess_markdown(md_text, assets_rel="./assets")
-
-                    if add_frontmatter:
-                        tags = [t.strip() for t in tags_default.split(",") if t.strip()]
-                        md_text = write_frontmatter(md_text, title=slug, src_name=f.name, tags=tags)
-
-                    out_md = os.path.join(target_dir, f"{base_name}.md")
-                    with open(out_md, "w", encoding="utf-8") as oh:
-                        oh.write(md_text)
-
-                    dur_ms = int((time.time() - _t0) * 1000)
-                    st.success(f"Fertig: {out_md} (Assets: {assets_dir}) · {dur_ms} ms")
-                    if delete_after_success:
-                        try:
-                            delete_from_inbox(input_path)
-                            st.caption(f"Quelle gelöscht: {input_path}")
-                        except Exception:
-                            st.caption(f"Konnte Quelle nicht löschen: {input_path}")
-                    with st.expander(f"Vorschau: {base_name}.md"):
-                        st.markdown(md_text[:8000])
-                        st.download_button("Markdown herunterladen", md_text.encode("utf-8"), file_name=f"{base_name}.md")
-                    if pick == "Marker":
-                        with st.expander("Marker-Umgebung (Cache)"):
-                            st.code(
-                                "\n".join([
-                                    f"HOME={os.environ.get('HOME')}",
-                                    f"XDG_CACHE_HOME={os.environ.get('XDG_CACHE_HOME')}",
-                                    f"HF_HOME={os.environ.get('HF_HOME')}",
-                                    f"HUGGINGFACE_HUB_CACHE={os.environ.get('HUGGINGFACE_HUB_CACHE')}",
-                                    f"SURYA_CACHE_DIR={os.environ.get('SURYA_CACHE_DIR')}",
-                                ]),
-                                language="bash"
-                            )
-                        with st.expander("Marker-Logs (stderr/stdout)"):
-                            st.code(marker_logs or "(keine Logs)", language="bash")
-                        with st.expander("Asset-Kopierbericht"):
-                            asset_lines = "\n".join([ln for ln in (marker_logs or "").splitlines() if ln.startswith("[assets]")])
-                            st.code(asset_lines or "(keine Assets gefunden oder kopiert)", language="bash")    
-                    log_job({
-                        "timestamp": datetime.now().isoformat(timespec="seconds"),
-                        "source": f.name,
-                        "engine": pick,
-                        "ocr": ocr_engine if pick == "Docling" else "",
-                        "duration_ms": dur_ms,
-                        "output_path": out_md,
-                        "status": "ok",
-                        "error": ""
-                    })
-                    status.update(label="Konvertierung abgeschlossen", state="complete")
-                except Exception as e:
-                    dur_ms = int((time.time() - _t0) * 1000)
-                    st.error(f"Fehler bei {f.name}: {e}")
-                    st.info("Tipp: Siehe Empfehlungen oben. Passe ggf. OCR, Chunk-Größe oder Engine an und starte erneut.")
-                    with st.expander("Fehlerdetails / Logs"):
-                        st.code(str(e), language="bash")
-                    log_job({
-                        "timestamp": datetime.now().isoformat(timespec="seconds"),
-                        "source": f.name,
-                        "engine": pick,
-                        "ocr": ocr_engine if pick == "Docling" else "",
-                        "duration_ms": dur_ms,
-                        "output_path": "",
-                        "status": "error",
-                        "error": str(e)
-                    })
-                    status.update(label="Fehlgeschlagen", state="error")
+    st.markdown("**Jobs**")
+    render_jobs(origin="ui")
 
     st.info("Outputs liegen unter ./data/out/<slug>/<dein_name>.md (+ assets). Ordner in Obsidian übernehmen.")
-    st.caption("Job-Log: /app/data/joblog.csv (timestamp, source, engine, ocr, duration_ms, output_path, status, error)")
+    st.caption("Job-Log: /app/data/state/joblog.db, Tab „Job-Log“ (timestamp, source, engine, ocr, duration_ms, output_path, status, error, cache, chunk_layout, pages, probe)")
 
 
 # Repair Tab: Markdown prüfen & reparieren
@@ -668,29 +227,16 @@ with tab_merge:
     merge_output_name = st.text_input("Ausgabename (ohne .md)", value="")
 
     if merge_files and st.button("Zusammenführen"):
-        parts = []
-        toc = ["## Inhalt"] if add_toc else []
-        for idx, mf in enumerate(sorted(merge_files, key=lambda x: x.name.lower()), start=1):
+        t0 = time.time()
+        docs = []
+        for mf in merge_files:
             try:
                 text = mf.read().decode("utf-8", errors="ignore")
             except Exception:
                 text = mf.getvalue().decode("utf-8", errors="ignore")
-            if drop_frontmatter:
-                text = strip_frontmatter(text)
-            heading = os.path.splitext(os.path.basename(mf.name))[0]
-            anchor = re.sub(r"[^a-z0-9\-]+", "-", heading.lower()).strip("-")
-            if use_headings:
-                parts.append(f"\n\n<a name=\"{anchor}\"></a>\n## {heading}\n\n")
-            if add_toc:
-                toc.append(f"- [{heading}](#{anchor})")
-            parts.append(text.strip())
-            if idx != len(merge_files) and sep:
-                parts.append(sep)
-
-        merged = ("\n\n".join(toc) + "\n\n" if toc else "") + "\n".join(parts)
-
-        # Optional Post-Processing (sanfte Normalisierung nur):
-        merged = re.sub(r"\n{3,}", "\n\n", merged)
+            docs.append((mf.name, text))
+        merged = pipeline.merge_markdown(docs, use_headings=use_headings, add_toc=add_toc,
+                                         drop_frontmatter=drop_frontmatter, sep=sep)
 
         # Speichern & Download anbieten
         out_slug = f"merge-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
@@ -711,151 +257,115 @@ with tab_merge:
             "source": ", ".join([mf.name for mf in merge_files]),
             "engine": "merge-md",
             "ocr": "",
-            "duration_ms": "",
+            "duration_ms": int((time.time() - t0) * 1000),
             "output_path": out_md,
             "status": "ok",
             "error": ""
         })
 
 
+@st.cache_data(ttl=60, show_spinner=False)
+def joblog_analytics(since: str | None, bucket: str):
+    # Bei großen Historien dauert die Aggregation spürbar → nicht bei jedem Rerun neu rechnen
+    return (job_store.duration_stats("engine", since=since), job_store.duration_stats("ocr", since=since),
+            job_store.error_rate(bucket, since=since), job_store.slowest(20, since=since))
+
 with tab_joblog:
     st.subheader("Job-Log")
-    rows = read_joblog_all()
-    if not rows:
-        st.caption("Noch keine Jobs protokolliert.")
+    # Nur die aktuelle Seite wird geladen; Filter laufen als SQL-Abfrage über die Indizes
+    fcol1, fcol2, fcol3 = st.columns([1, 1, 2])
+    with fcol1:
+        f_status = st.selectbox("Status", [""] + job_store.distinct("status"), format_func=lambda v: v or "alle")
+    with fcol2:
+        f_engine = st.selectbox("Engine", [""] + job_store.distinct("engine"), format_func=lambda v: v or "alle")
+    with fcol3:
+        f_source = st.text_input("Quelle enthält", "")
+    filters = {"status": f_status, "engine": f_engine, "source": f_source.strip()}
+    total = job_store.count(filters)
+    if not total:
+        st.caption("Keine Jobs protokolliert." if not any(filters.values()) else "Keine Treffer für die Filter.")
     else:
-        import pandas as pd
-        df = pd.DataFrame(rows)
-        st.dataframe(df, use_container_width=True)
-        cols = list(df.columns)
-        csv_rows = [",".join(cols)]
-        for r in rows:
-            csv_rows.append(
-                ",".join(str(r.get(c, "")).replace(",", " ") for c in cols)
-            )
-        st.download_button("CSV herunterladen", data="\n".join(csv_rows), file_name="joblog.csv", mime="text/csv")
-
-def list_new_files(seen: set[str]) -> list[str]:
-    os.makedirs(IN_DIR, exist_ok=True)
-    files = []
-    for name in os.listdir(IN_DIR):
-        p = os.path.join(IN_DIR, name)
-        if os.path.isfile(p) and p not in seen:
-            files.append(p)
-    return files
-
-if "seen_files" not in st.session_state:
-    st.session_state.seen_files = set()
+        pcol1, pcol2 = st.columns([1, 1])
+        with pcol1:
+            page_size = st.selectbox("Einträge je Seite", [25, 50, 100, 250], index=1)
+        pages_total = (total + page_size - 1) // page_size
+        with pcol2:
+            page = st.number_input(f"Seite (von {pages_total})", min_value=1, max_value=pages_total, value=1, step=1)
+        st.caption(f"{total} Einträge · neueste zuerst")
+        st.dataframe(job_store.query(filters, limit=page_size, offset=(page - 1) * page_size), use_container_width=True)
+        if st.button("CSV-Export erstellen"):
+            # Zeilenweise aus der DB in eine Datei schreiben statt den ganzen Log im Speicher aufzubauen
+            export_dir = os.path.join(os.path.dirname(job_store.DB_PATH), "exports")
+            os.makedirs(export_dir, exist_ok=True)
+            export_path = os.path.join(export_dir, f"joblog-{datetime.now().strftime('%Y%m%d-%H%M%S')}.csv")
+            size = job_store.export_csv(export_path, filters)
+            st.session_state.joblog_export = export_path
+            st.success(f"Export: {export_path} ({size // 1024} KB)")
+        export_path = st.session_state.get("joblog_export")
+        if export_path and os.path.exists(export_path):
+            with open(export_path, "rb") as fh:
+                st.download_button("CSV herunterladen", data=fh, file_name=os.path.basename(export_path), mime="text/csv")
+
+    # Auswertung: Aggregation in SQLite (Fensterfunktionen), nicht über die geladene Tabelle
+    st.markdown("**Auswertung**")
+    acol1, acol2 = st.columns([1, 1])
+    with acol1:
+        span = st.selectbox("Zeitraum", ["7 Tage", "30 Tage", "90 Tage", "alles"], index=1)
+    with acol2:
+        bucket = st.selectbox("Fehlerquote je", ["day", "hour"], format_func=lambda v: {"day": "Tag", "hour": "Stunde"}[v])
+    days = {"7 Tage": 7, "30 Tage": 30, "90 Tage": 90}.get(span)
+    since = (datetime.now() - timedelta(days=days)).isoformat(timespec="seconds") if days else None
+    st.caption("Dauer-Perzentile (ms) und Seiten/s über erfolgreiche Jobs ohne Cache-Treffer (aktualisiert höchstens jede Minute).")
+    by_engine, by_ocr, rates, slow = joblog_analytics(since[:16] if since else None, bucket)
+    if by_engine:
+        st.write("Je Engine")
+        st.dataframe(by_engine, use_container_width=True)
+    if by_ocr:
+        st.write("Je OCR-Backend")
+        st.dataframe(by_ocr, use_container_width=True)
+    if rates:
+        st.write("Fehlerquote")
+        st.line_chart({r["bucket"]: r["error_rate"] for r in rates})
+    if slow:
+        st.write("Langsamste Dokumente")
+        st.dataframe(slow, use_container_width=True)
+    stage_rows = job_store.stage_totals()
+    if stage_rows:
+        # Kumulierte Zähler aus den Spans (unabhängig vom Zeitraum); Details: python spans.py show
+        st.write("Zeit je Stufe (seit Beginn der Aufzeichnung)")
+        st.dataframe(stage_rows, use_container_width=True)
+
+# Watcher-Einstellungen an den Worker übergeben (nur bei Änderung; Job-Optionen beim Einschalten übernehmen)
+if enable_watcher != watch_cfg["enabled"]:
+    job_queue.set_watch(enabled=enable_watcher, settle=watch_settle, options=opts if enable_watcher else None)
+elif enable_watcher and float(watch_settle) != watch_cfg["settle"]:
+    job_queue.set_watch(settle=watch_settle)
+if enable_watcher:
+    job_queue.ensure_worker()
 
 with tab_watch:
     if enable_watcher:
-        st.write("👀 Watcher aktiv…")
-        new_files = list_new_files(st.session_state.seen_files)
-        if new_files:
-            st.write(f"Neue Dateien: {', '.join(os.path.basename(n) for n in new_files)}")
-            # Simuliere Upload-Flow
-            class _F: pass
-            uploaded = []
-            for p in new_files:
-                f = _F()
-                f.name = os.path.basename(p)
-                with open(p, "rb") as fh:
-                    f.data = fh.read()
-                uploaded.append(f)
-            # Re-use Konvertierungslogik
-            for f in uploaded:
-                input_path = os.path.join(IN_DIR, f.name)
-                # (Datei liegt ja schon da)
-                slug = slugify(f.name)
-                base_name = output_name.strip() or slug
-                target_dir = os.path.join(OUT_DIR, slug)
-                assets_dir = os.path.join(target_dir, "assets")
-                os.makedirs(target_dir, exist_ok=True)
-                os.makedirs(assets_dir, exist_ok=True)
-
-                pick = choose_engine(input_path, engine)
-                _t0 = time.time()
-                with st.status(f"[Watcher] Konvertiere **{f.name}** …", expanded=False) as status:
-                    try:
-                        if pick == "MarkItDown":
-                            md_text = convert_markitdown(input_path)
-                        elif pick == "Docling":
-                            md_text = convert_docling(input_path)
-                        elif pick == "pptx2md":
-                            md_text = convert_pptx2md(input_path, target_dir)
-                        elif pick == "plain":
-                            md_text = convert_plain_text(input_path)
-                        else:
-                            is_pdf = input_path.lower().endswith(".pdf")
-                            use_chunk = False
-                            if is_pdf:
-                                pc = get_pdf_page_count(input_path)
-                                if pc != -1 and pc > int(AUTO_CHUNK_THRESHOLD):
-                                    use_chunk = True
-                                    st.caption(f"[Watcher] Auto-Chunk aktiv: {pc} Seiten > {int(AUTO_CHUNK_THRESHOLD)} → Chunk-Größe {int(chunk_size)}.")
-                            if is_pdf and use_chunk:
-                                md_text, marker_logs = convert_marker_chunked(
-                                    input_path, target_dir, force_ocr, keep_images, int(chunk_size),
-                                    live_cb=None,
-                                    cleanup=cleanup_chunks
-                                )
-                            else:
-                                md_text, marker_logs = convert_marker_cli(input_path, target_dir, force_ocr, keep_images, live_cb=None)
-
-                        md_text = postprocess_markdown(md_text, assets_rel="./assets")
-
-                        if add_frontmatter:
-                            tags = [t.strip() for t in tags_default.split(",") if t.strip()]
-                            md_text = write_frontmatter(md_text, title=slug, src_name=f.name, tags=tags)
-
-                        out_md = os.path.join(target_dir, f"{base_name}.md")
-                        with open(out_md, "w", encoding="utf-8") as oh:
-                            oh.write(md_text)
-
-                        dur_ms = int((time.time() - _t0) * 1000)
-                        if pick == "Marker":
-                            with st.expander(f"[Watcher] Marker-Logs für {f.name}"):
-                                st.code(marker_logs or "(keine Logs)", language="bash")
-                            with st.expander(f"[Watcher] Asset-Kopierbericht für {f.name}"):
-                                asset_lines = "\n".join([ln for ln in (marker_logs or "").splitlines() if ln.startswith("[assets]")])
-                                st.code(asset_lines or "(keine Assets gefunden oder kopiert)", language="bash")    
-                        st.success(f"[Watcher] Fertig: {out_md} · {dur_ms} ms")
-                        if delete_after_success:
-                            try:
-                                delete_from_inbox(input_path)
-                                st.caption(f"[Watcher] Quelle gelöscht: {input_path}")
-                            except Exception:
-                                st.caption(f"[Watcher] Quelle konnte nicht gelöscht werden: {input_path}")
-                        log_job({
-                            "timestamp": datetime.now().isoformat(timespec="seconds"),
-                            "source": f.name,
-                            "engine": pick,
-                            "ocr": ocr_engine if pick == "Docling" else "",
-                            "duration_ms": dur_ms,
-                            "output_path": out_md,
-                            "status": "ok",
-                            "error": ""
-                        })
-                        st.session_state.seen_files.add(input_path)
-                        status.update(label="[Watcher] Konvertierung abgeschlossen", state="complete")
-                    except Exception as e:
-                        dur_ms = int((time.time() - _t0) * 1000)
-                        st.error(f"[Watcher] Fehler bei {f.name}: {e}")
-                        st.info("Tipp: Siehe Empfehlungen oben. Passe ggf. OCR, Chunk-Größe oder Engine an und starte erneut.")
-                        with st.expander(f"[Watcher] Fehlerdetails / Logs für {f.name}"):
-                            st.code(str(e), language="bash")
-                        log_job({
-                            "timestamp": datetime.now().isoformat(timespec="seconds"),
-                            "source": f.name,
-                            "engine": pick,
-                            "ocr": ocr_engine if pick == "Docling" else "",
-                            "duration_ms": dur_ms,
-                            "output_path": "",
-                            "status": "error",
-                            "error": str(e)
-                        })
-                        status.update(label="[Watcher] Fehlgeschlagen", state="error")
-
-        # Auto-Refresh
-        time.sleep(watch_interval)
-        st.rerun()
\ No newline at end of file
+        status = job_queue.get_watch()["status"]
+        st.write(f"👀 Watcher aktiv ({status})" if status else "👀 Watcher startet…")
+        st.caption("Neue Dateien in data/in werden sofort erkannt und eingereiht, sobald sie vollständig geschrieben sind. Es gelten die Sidebar-Einstellungen zum Zeitpunkt des Einschaltens.")
+        if st.button("Aktuelle Sidebar-Einstellungen für den Watcher übernehmen"):
+            job_queue.set_watch(options=opts)
+            st.success("Übernommen – gilt für neu erkannte Dateien.")
+    else:
+        st.caption("Watcher aus. In der Sidebar „Auto-Watch“ aktivieren.")
+    # Manifest (data/state): fertige Dateien werden nicht erneut konvertiert, Fehler mit Backoff wiederholt
+    wm = watch_manifest.counts()
+    if wm:
+        st.caption("Manifest: " + " · ".join(f"{n} {WATCH_STATUS_LABELS.get(k, k)}" for k, n in sorted(wm.items())))
+    failed = watch_manifest.problems()
+    if failed:
+        with st.expander(f"Fehlgeschlagene Dateien ({len(failed)})"):
+            for row in failed:
+                when = datetime.fromtimestamp(row["next_attempt"]).strftime("%H:%M:%S") if row["next_attempt"] else "–"
+                st.write(f"**{os.path.basename(row['path'])}** — Versuch {row['attempts']}/{watch_manifest.MAX_ATTEMPTS}, nächster Versuch: {when}")
+                if row["last_error"]:
+                    st.code(row["last_error"][-1000:])
+            if st.button("Jetzt erneut versuchen"):
+                n = watch_manifest.retry_failed()
+                st.success(f"{n} Datei(en) freigegeben.")
+    render_jobs(origin="watch")
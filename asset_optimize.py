@@ -0,0 +1,261 @@
+# Optionale Bild-Nachbearbeitung nach der Konvertierung: verlustfreie PNG-Optimierung, JPEG ohne
+# Neuquantisierung, BMP/TIFF → PNG, optional WebP/AVIF und Verkleinern auf eine maximale Kantenlänge.
+# Die Bilder werden in einem Prozess-Pool umgerechnet, während der Text nachbearbeitet wird (start() → Future).
+# Ergebnisse werden nur übernommen, wenn sie kleiner sind. Dateien werden nie in-place geschrieben
+# (assets/ enthält Hardlinks in den Asset-Speicher); mit Asset-Speicher wird jedes Bild je Einstellung
+# nur einmal umgerechnet.
+import os, re, threading, multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import doc_probe
+
+try:
+    import asset_store
+except Exception:
+    asset_store = None
+
+IMAGE_WORKERS = int(os.environ.get("IMAGE_WORKERS", max(1, (os.cpu_count() or 1) // 2)))
+WEBP_QUALITY = int(os.environ.get("IMAGE_WEBP_QUALITY", "80"))
+AVIF_QUALITY = int(os.environ.get("IMAGE_AVIF_QUALITY", "60"))
+JPEG_QUALITY = int(os.environ.get("IMAGE_JPEG_QUALITY", "85"))
+
+FORMATS = ("original", "webp", "avif")
+# GIF (Animationen), SVG und HEIC bleiben unverändert
+_RASTER_EXT = (".png", ".jpg", ".jpeg", ".webp", ".bmp", ".tif", ".tiff")
+_LOSSLESS_SOURCES = ("PNG", "BMP", "TIFF", "GIF")
+
+_pool = None
+_pool_lock = threading.Lock()
+# Koordination (Hashing, Übernehmen der Ergebnisse) im Job-Prozess, Umrechnen im Pool
+_coordinator = ThreadPoolExecutor(max_workers=4, thread_name_prefix="asset-optimize")
+
+
+def available_formats() -> list[str]:
+    """Zielformate, die das installierte Pillow schreiben kann ([] ohne Pillow)."""
+    try:
+        from PIL import features
+    except ImportError:
+        return []
+    out = ["original"]
+    for fmt in FORMATS[1:]:
+        try:
+            if features.check(fmt):
+                out.append(fmt)
+        except Exception:
+            pass
+    return out
+
+
+def _encode(src: str, tmp_base: str, fmt: str, max_dim: int) -> tuple[str, int] | None:
+    """
+    Läuft im Pool-Prozess. Schreibt das Ergebnis nach tmp_base + Endung.
+    Rückgabe: (Endung, Größe) oder None, wenn das Original bleiben soll (nicht kleiner, nicht unterstützt).
+    """
+    from PIL import Image
+    src_size = os.path.getsize(src)
+    ext = os.path.splitext(src)[1].lower()
+    with Image.open(src) as im:
+        if getattr(im, "n_frames", 1) > 1:
+            return None
+        src_format = im.format
+        icc = im.info.get("icc_profile")
+        img = im
+        resized = False
+        if max_dim and max(im.size) > max_dim:
+            img = im.copy()
+            img.thumbnail((max_dim, max_dim), Image.LANCZOS)
+            resized = True
+        if fmt == "webp":
+            out_ext, save_format = ".webp", "WEBP"
+            params = dict(lossless=True, method=4) if src_format in _LOSSLESS_SOURCES else dict(quality=WEBP_QUALITY, method=4)
+        elif fmt == "avif":
+            out_ext, save_format = ".avif", "AVIF"
+            params = dict(quality=AVIF_QUALITY)
+        elif src_format == "PNG":
+            out_ext, save_format, params = ext, "PNG", dict(optimize=True)
+        elif src_format == "JPEG":
+            out_ext, save_format = ext, "JPEG"
+            # ohne Verkleinern die Quantisierungstabellen übernehmen (kein weiterer Qualitätsverlust)
+            params = dict(optimize=True, progressive=True, quality=JPEG_QUALITY if resized else "keep")
+        elif src_format in ("BMP", "TIFF"):
+            out_ext, save_format, params = ".png", "PNG", dict(optimize=True)
+        elif resized and src_format == "WEBP":
+            out_ext, save_format, params = ext, "WEBP", dict(quality=WEBP_QUALITY, method=4)
+        else:
+            return None
+        if save_format == "JPEG" and img.mode not in ("RGB", "L", "CMYK"):
+            img = img.convert("RGB")
+        elif save_format in ("WEBP", "AVIF") and img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA" if "A" in img.getbands() or "transparency" in img.info else "RGB")
+        elif save_format == "PNG" and img.mode == "CMYK":
+            img = img.convert("RGB")
+        if icc:
+            params["icc_profile"] = icc
+        tmp = tmp_base + out_ext
+        img.save(tmp, format=save_format, **params)
+    size = os.path.getsize(tmp)
+    if size >= src_size:
+        os.remove(tmp)
+        return None
+    return out_ext, size
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn statt fork: der Job-Prozess hält Threads und ggf. geladene Modelle
+            _pool = ProcessPoolExecutor(max_workers=IMAGE_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def _reset_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def _remove_quietly(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _install(assets_dir: str, rel: str, out_ext: str, tmp: str | None, blob: str | None, sha: str | None) -> str:
+    """Ergebnis (tmp oder Blob) unter neuem Namen ablegen, altes Bild entfernen. Rückgabe: neuer relativer Pfad."""
+    sub, name = os.path.split(rel)
+    stem = os.path.splitext(name)[0]
+    if blob is not None:
+        # Inhalts-Namen aus dem Asset-Speicher bleiben Inhalts-Namen
+        blob_sha = os.path.splitext(os.path.basename(blob))[0]
+        content_named = sha is not None and name == asset_store.asset_name(sha, os.path.splitext(name)[1])
+        new_name = asset_store.asset_name(blob_sha, out_ext) if content_named else stem + out_ext
+        new_rel = os.path.join(sub, new_name)
+        asset_store.link_to(blob, os.path.join(assets_dir, new_rel))
+    else:
+        new_rel = os.path.join(sub, stem + out_ext)
+        os.replace(tmp, os.path.join(assets_dir, new_rel))
+    if new_rel != rel:
+        _remove_quietly(os.path.join(assets_dir, rel))
+    return new_rel
+
+
+def _apply_memo(assets_dir: str, rel: str, size: int, sha: str, blob: str, renames: dict, stats: dict) -> None:
+    # bereits berechnete Variante übernehmen (oder Original behalten, wenn sie nicht kleiner ist)
+    new_size = os.path.getsize(blob)
+    if new_size >= size:
+        stats["bytes_after"] += size
+        return
+    new_rel = _install(assets_dir, rel, os.path.splitext(blob)[1], None, blob, sha)
+    if new_rel != rel:
+        renames[rel] = new_rel
+    stats["optimized"] += 1
+    stats["reused"] += 1
+    stats["bytes_after"] += new_size
+
+
+def optimize(assets_dir: str, rel_paths, fmt: str = "original", max_dim: int = 0) -> tuple[dict, dict]:
+    """
+    Verweiste Bilder in assets_dir umrechnen (rel_paths relativ zu assets_dir, z. B. aus den Markdown-Links).
+    Rückgabe: (Umbenennungen {alter Pfad: neuer Pfad}, Statistik).
+    """
+    if fmt not in FORMATS:
+        raise ValueError(fmt)
+    variant = f"{fmt}-{int(max_dim)}"
+    store = asset_store is not None and asset_store.ENABLED
+    stats = {"files": 0, "optimized": 0, "reused": 0, "errors": 0, "bytes_before": 0, "bytes_after": 0}
+    renames: dict[str, str] = {}
+    jobs = []
+    submitted = set()
+    for rel in sorted(set(rel_paths)):
+        # nur Dateien innerhalb von assets_dir (Links können beliebige Pfade/URLs enthalten)
+        if os.path.isabs(rel) or ".." in rel.replace("\\", "/").split("/"):
+            continue
+        src = os.path.join(assets_dir, rel)
+        if not rel.lower().endswith(_RASTER_EXT) or not os.path.isfile(src):
+            continue
+        size = os.path.getsize(src)
+        stats["files"] += 1
+        stats["bytes_before"] += size
+        sha = doc_probe.file_sha256(src) if store else None
+        if store:
+            blob = asset_store.derived_get(sha, variant)
+            if blob is not None:
+                _apply_memo(assets_dir, rel, size, sha, blob, renames, stats)
+                continue
+            if sha in submitted:
+                # gleicher Inhalt unter anderem Namen: nur einmal umrechnen, danach aus dem Speicher
+                jobs.append((rel, src, size, sha, None, None))
+                continue
+            submitted.add(sha)
+        tmp_base = f"{src}.{os.getpid()}-{threading.get_ident()}-opt"
+        try:
+            fut = _get_pool().submit(_encode, src, tmp_base, fmt, int(max_dim))
+        except BrokenProcessPool:
+            _reset_pool()
+            fut = _get_pool().submit(_encode, src, tmp_base, fmt, int(max_dim))
+        jobs.append((rel, src, size, sha, tmp_base, fut))
+    for rel, src, size, sha, tmp_base, fut in jobs:
+        if fut is None:
+            blob = asset_store.derived_get(sha, variant)
+            if blob is None:
+                stats["errors"] += 1
+                stats["bytes_after"] += size
+            else:
+                _apply_memo(assets_dir, rel, size, sha, blob, renames, stats)
+            continue
+        try:
+            res = fut.result()
+        except Exception as e:
+            if isinstance(e, BrokenProcessPool):
+                _reset_pool()
+            stats["errors"] += 1
+            stats["bytes_after"] += size
+            continue
+        if res is None:
+            stats["bytes_after"] += size
+            if store:
+                # "bringt nichts" ebenfalls merken: Variante = Original
+                asset_store.derived_put(sha, variant, asset_store.add(src, sha))
+            continue
+        out_ext, new_size = res
+        tmp = tmp_base + out_ext
+        blob = None
+        if store:
+            blob = asset_store.add(tmp)
+            asset_store.derived_put(sha, variant, blob)
+            _remove_quietly(tmp)
+        new_rel = _install(assets_dir, rel, out_ext, tmp, blob, sha)
+        if new_rel != rel:
+            renames[rel] = new_rel
+        stats["optimized"] += 1
+        stats["bytes_after"] += new_size
+    return renames, stats
+
+
+def start(assets_dir: str, rel_paths, fmt: str = "original", max_dim: int = 0):
+    """optimize(...) im Hintergrund starten; Future liefert (Umbenennungen, Statistik)."""
+    return _coordinator.submit(optimize, assets_dir, list(rel_paths), fmt, max_dim)
+
+
+_ASSET_LINK_RE = re.compile(r"(!\[.*?\]\(\./assets/)([^\)\s]+)\)")
+
+
+def rewrite_links(md_text: str, renames: dict) -> str:
+    """Bildlinks ./assets/<alt> → ./assets/<neu> (nach postprocess_markdown)."""
+    if not renames:
+        return md_text
+    return _ASSET_LINK_RE.sub(lambda m: f"{m.group(1)}{renames.get(m.group(2), m.group(2))})", md_text)
+
+
+def describe(stats: dict) -> str:
+    before, after = stats["bytes_before"], stats["bytes_after"]
+    saved = before - after
+    pct = f", −{saved / before:.0%}" if before else ""
+    reused = f" ({stats['reused']} aus Speicher)" if stats["reused"] else ""
+    return (f"[bilder] {stats['files']} Bilder, {stats['optimized']} optimiert{reused}, "
+            f"{before / 1e6:.1f} MB → {after / 1e6:.1f} MB (−{saved / 1e6:.1f} MB{pct}), Fehler={stats['errors']}")
@@ -0,0 +1,206 @@
+# Inhaltsadressierter Asset-Speicher: jedes Bild liegt genau einmal unter OUT_DIR/.blobs/<sha[:2]>/<sha><ext>.
+# Die assets/-Ordner der Dokumente bekommen Hardlinks darauf (über Dateisystemgrenzen hinweg: Kopie),
+# benannt nach dem Inhalt (<sha[:16]><ext>) – Logos, Folienhintergründe usw. belegen nur einmal Platz.
+# Blobs sind schreibgeschützt; verlinkte Dateien werden nie in-place geschrieben, sondern per os.replace ersetzt.
+# Verweist kein Dokument mehr auf einen Blob (Linkzähler 1), entfernt prune() ihn.
+#
+#   python asset_store.py stats | prune
+import os, time, shutil, argparse, threading
+
+import doc_probe
+
+STORE_DIR = os.environ.get("ASSET_STORE_DIR", "/app/data/out/.blobs")
+ENABLED = os.environ.get("ASSET_STORE", "1") != "0"
+NAME_LEN = 16
+# Frisch angelegte Blobs nicht sofort verwerfen (Link ins Dokument folgt erst nach dem Ablegen)
+PRUNE_MIN_AGE = 3600
+
+
+def asset_name(sha: str, ext: str) -> str:
+    """Deterministischer Dateiname in assets/ (gleicher Inhalt → gleicher Name)."""
+    return sha[:NAME_LEN] + ext.lower()
+
+
+def _blob_path(sha: str, ext: str) -> str:
+    return os.path.join(STORE_DIR, sha[:2], sha + ext.lower())
+
+
+def _same_file(a: str, b: str) -> bool:
+    try:
+        return os.path.samefile(a, b)
+    except OSError:
+        return False
+
+
+def _tmp_name(dst: str) -> str:
+    return f"{dst}.{os.getpid()}-{threading.get_ident()}.tmp"
+
+
+def _replace_with(src: str, dst: str, link: bool) -> None:
+    tmp = _tmp_name(dst)
+    try:
+        if link:
+            os.link(src, tmp)
+        else:
+            shutil.copy2(src, tmp)
+        os.replace(tmp, dst)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def add(src: str, sha: str | None = None) -> str:
+    """Datei in den Speicher aufnehmen (falls ihr Inhalt neu ist) und den Blob-Pfad zurückgeben."""
+    sha = sha or doc_probe.file_sha256(src)
+    blob = _blob_path(sha, os.path.splitext(src)[1])
+    if os.path.exists(blob):
+        return blob
+    os.makedirs(os.path.dirname(blob), exist_ok=True)
+    # Quelle kopieren statt verlinken: Engines überschreiben ihre Ausgabedateien bei erneuten Läufen in-place
+    tmp = _tmp_name(blob)
+    try:
+        shutil.copy2(src, tmp)
+        os.chmod(tmp, 0o444)
+        os.replace(tmp, blob)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+    return blob
+
+
+def link_to(blob: str, dst: str) -> bool:
+    """dst durch einen Hardlink auf blob ersetzen (Kopie, wenn kein Hardlink möglich). True = verlinkt."""
+    if _same_file(blob, dst):
+        return True
+    try:
+        _replace_with(blob, dst, link=True)
+        return True
+    except FileNotFoundError:
+        raise
+    except OSError:
+        _replace_with(blob, dst, link=False)
+        return False
+
+
+def place(src: str, assets_dir: str, sha: str | None = None) -> tuple[str, bool]:
+    """
+    Bild src als assets_dir/<sha16><ext> bereitstellen: Hardlink auf den Blob, sonst Kopie.
+    Rückgabe: (Dateiname in assets_dir, verlinkt).
+    """
+    sha = sha or doc_probe.file_sha256(src)
+    name = asset_name(sha, os.path.splitext(src)[1])
+    dst = os.path.join(assets_dir, name)
+    if not ENABLED:
+        if not os.path.exists(dst):
+            _replace_with(src, dst, link=False)
+        return name, False
+    for _attempt in range(2):
+        blob = add(src, sha)
+        if _same_file(blob, dst):
+            return name, True
+        try:
+            _replace_with(blob, dst, link=True)
+            return name, True
+        except FileNotFoundError:
+            # Blob wurde zwischenzeitlich von prune() entfernt → neu anlegen
+            continue
+        except OSError:
+            break
+    # Kein Hardlink möglich (anderes Dateisystem): vorhandene Datei hat per Name denselben Inhalt
+    if not os.path.exists(dst):
+        _replace_with(src, dst, link=False)
+    return name, False
+
+
+# -------- Abgeleitete Varianten (z. B. optimierte Bilder) --------
+# derived/<variante>/<sha der Quelle> enthält den Blob-Namen des Ergebnisses; so wird ein Logo,
+# das in hundert Dokumenten vorkommt, nur einmal umgerechnet.
+
+def _derived_path(sha: str, variant: str) -> str:
+    return os.path.join(STORE_DIR, "derived", variant, sha)
+
+
+def derived_get(sha: str, variant: str) -> str | None:
+    """Blob-Pfad der Variante variant zur Quelle sha, falls schon berechnet (und der Blob noch existiert)."""
+    try:
+        with open(_derived_path(sha, variant), "r", encoding="utf-8") as fh:
+            name = fh.read().strip()
+    except OSError:
+        return None
+    blob = os.path.join(STORE_DIR, name[:2], name)
+    return blob if name and os.path.exists(blob) else None
+
+
+def derived_put(sha: str, variant: str, blob: str) -> None:
+    path = _derived_path(sha, variant)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = _tmp_name(path)
+    with open(tmp, "w", encoding="utf-8") as fh:
+        fh.write(os.path.basename(blob))
+    os.replace(tmp, path)
+
+
+def _blobs():
+    if not os.path.isdir(STORE_DIR):
+        return
+    for shard in os.listdir(STORE_DIR):
+        if len(shard) != 2:
+            continue
+        shard_dir = os.path.join(STORE_DIR, shard)
+        if not os.path.isdir(shard_dir):
+            continue
+        for name in os.listdir(shard_dir):
+            if name.endswith(".tmp"):
+                continue
+            path = os.path.join(shard_dir, name)
+            try:
+                yield path, os.stat(path)
+            except OSError:
+                continue
+
+
+def prune(min_age: float = PRUNE_MIN_AGE) -> tuple[int, int]:
+    """Blobs ohne Verweis aus einem assets/-Ordner entfernen. Rückgabe: (Anzahl, freigegebene Bytes)."""
+    cutoff = time.time() - min_age
+    removed = freed = 0
+    for path, st in _blobs():
+        if st.st_nlink > 1 or st.st_ctime > cutoff:
+            continue
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        removed += 1
+        freed += st.st_size
+    return removed, freed
+
+
+def stats() -> dict:
+    """Blobs, belegte Bytes und durch Hardlinks eingesparte Bytes (Verweise ohne eigene Kopie)."""
+    count = stored = referenced = 0
+    for _path, st in _blobs():
+        count += 1
+        stored += st.st_size
+        referenced += st.st_size * max(0, st.st_nlink - 1)
+    return {"blobs": count, "bytes": stored, "saved_bytes": max(0, referenced - stored)}
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Inhaltsadressierter Asset-Speicher")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("stats")
+    pp = sub.add_parser("prune")
+    pp.add_argument("--min-age", type=float, default=PRUNE_MIN_AGE, help="nur Blobs, die älter sind (Sekunden)")
+    a = ap.parse_args()
+    if a.cmd == "stats":
+        s = stats()
+        print(f"{s['blobs']} Blobs, {s['bytes'] / 1e6:.1f} MB belegt, {s['saved_bytes'] / 1e6:.1f} MB eingespart")
+    elif a.cmd == "prune":
+        n, b = prune(a.min_age)
+        print(f"{n} Blobs entfernt, {b / 1e6:.1f} MB freigegeben")
@@ -0,0 +1,609 @@
+# End-to-End-Benchmark der Engines mit einem erzeugten, deterministischen Korpus (offline, CPU).
+#
+#   python benchmark.py corpus [--scale 1]                  # Korpus erzeugen (Text-/Bild-/Scan-PDFs, DOCX, PPTX, TXT)
+#   python benchmark.py run [--engines PDF-Text,plain] [--baseline base.json]
+#   python benchmark.py compare base.json results.json [--threshold 0.15]
+#
+# Jede Kombination aus Dokument und Engine läuft in einem eigenen Prozess durch pipeline.convert_file
+# (Probe, Engine, Post-Processing, Frontmatter) mit festen Einstellungen: ohne Konvertierungs-Cache,
+# ohne Marker-Worker (Modelle werden je Lauf geladen, zählen also zur Zeit), eigene Ausgabe-/Cache-Ordner.
+# Ergebnis je Lauf: Wandzeit, Seiten/s, Spitzen-RSS (größter Prozess im Baum) und Ausgabegröße als JSON.
+# compare meldet Regressionen gegenüber einer gespeicherten Baseline (Exit-Code 1).
+import os, sys, io, json, time, zlib, random, shutil, signal, hashlib, zipfile, argparse, platform, statistics, subprocess, tempfile, threading
+
+BENCH_DIR = os.environ.get("BENCH_DIR", "/app/data/bench")
+CORPUS_SEED = 20240917
+# Relative Verschlechterung (Zeit, RSS), ab der compare eine Regression meldet; darunter gilt Rauschen
+REGRESSION_THRESHOLD = 0.15
+MIN_DELTA_S = 0.25
+MIN_DELTA_MB = 32
+
+# Engine-Pfade je Dokumentart (Reihenfolge = Laufreihenfolge)
+ENGINE_MATRIX = {
+    "pdf-text": ["PDF-Text", "MarkItDown", "Docling", "Marker"],
+    "pdf-images": ["Docling", "Marker"],
+    "pdf-scan": ["Docling", "Marker"],
+    "docx": ["MarkItDown", "Docling"],
+    "pptx": ["pptx2md", "MarkItDown"],
+    "txt": ["plain"],
+}
+
+# Feste Job-Einstellungen (überschreiben pipeline.DEFAULT_OPTIONS; engine kommt aus der Matrix)
+BENCH_OPTIONS = {
+    "auto_pdf_text": False,
+    "add_frontmatter": True,
+    "tags": ["bench"],
+    "force_ocr": False,
+    "ocr_routing": False,
+    "keep_images": True,
+    "ocr_engine": "auto",
+    "use_marker_worker": False,
+    "chunk_mode": "fest",
+    "chunk_size": 20,
+    "max_parallel_chunks": 1,
+    "cleanup_chunks": True,
+    "delete_after_success": False,
+    "use_cache": False,
+    "image_optimize": False,
+}
+
+# -------- Korpus --------
+# Text aus festem Wortschatz mit eigenem Zufallsgenerator: gleiche Seed → gleiche Dokumente.
+
+_WORDS = (
+    "Analyse Modell Daten Verfahren Ergebnis Struktur Prozess Beispiel Methode System Wert Funktion Grenze "
+    "Theorie Messung Übung Größe Aufgabe Lösung Variable Menge Prüfung Vorlesung Kapitel Abschnitt Regel "
+    "Bedingung Annahme Beweis Satz Definition Eigenschaft Zusammenhang Verteilung Mittelwert Abweichung "
+    "untersucht beschreibt zeigt ergibt folgt bestimmt verwendet liefert enthält erfüllt betrachtet gilt "
+    "wichtige einfache lineare zentrale mögliche gegebene allgemeine stetige diskrete endliche große kleine "
+    "der die das und mit für von auf bei nach über unter zwischen ohne durch wird werden ist sind nicht auch"
+).split()
+_TITLES = ("Einführung", "Grundlagen", "Methoden", "Auswertung", "Diskussion", "Anwendung", "Zusammenfassung", "Übungen")
+
+
+def _sentence(rng: random.Random) -> str:
+    words = [rng.choice(_WORDS) for _ in range(rng.randint(6, 16))]
+    return " ".join(words).capitalize() + rng.choice(".....:?")
+
+
+def _paragraph(rng: random.Random) -> str:
+    return " ".join(_sentence(rng) for _ in range(rng.randint(3, 6)))
+
+
+def _blocks(rng: random.Random, n: int):
+    """n Abschnitte als (Art, Text): heading, para, item."""
+    for i in range(n):
+        yield "heading", f"{i + 1} {rng.choice(_TITLES)} {rng.choice(_WORDS)}"
+        for _ in range(rng.randint(2, 4)):
+            yield "para", _paragraph(rng)
+        if rng.random() < 0.4:
+            for _ in range(rng.randint(3, 5)):
+                yield "item", _sentence(rng)
+
+
+def _wrap(text: str, width: int) -> list[str]:
+    lines, cur = [], ""
+    for w in text.split():
+        if cur and len(cur) + 1 + len(w) > width:
+            lines.append(cur)
+            cur = w
+        else:
+            cur = f"{cur} {w}" if cur else w
+    if cur:
+        lines.append(cur)
+    return lines
+
+
+def _page_lines(rng: random.Random, capacity: int = 50, width: int = 85) -> list[tuple[str, str]]:
+    # Zeilen einer Textseite als (Stil, Text); Stil h = Überschrift, b = Fließtext
+    out = []
+    for kind, text in _blocks(rng, 3):
+        if kind == "heading":
+            out += [("b", ""), ("h", text)]
+        elif kind == "item":
+            out += [("b", ln) for ln in _wrap("- " + text, width)]
+        else:
+            out += [("b", ln) for ln in _wrap(text, width)] + [("b", "")]
+        if len(out) >= capacity:
+            break
+    return out[:capacity]
+
+
+class _Pdf:
+    """Minimaler PDF-Schreiber (A4, Helvetica, optionale Bilder) – keine Abhängigkeiten."""
+    W, H = 595, 842
+
+    def __init__(self):
+        self.objs: list[bytes] = []
+        self.pages: list[int] = []
+        self.pages_id = self._reserve()
+        self.font = self._add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+        self.bold = self._add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>")
+
+    def _reserve(self) -> int:
+        self.objs.append(b"")
+        return len(self.objs)
+
+    def _add(self, body: bytes) -> int:
+        self.objs.append(body)
+        return len(self.objs)
+
+    def _stream(self, data: bytes, entries: str = "", compress: bool = True) -> int:
+        if compress:
+            data = zlib.compress(data, 6)
+            entries += " /Filter /FlateDecode"
+        return self._add(f"<< /Length {len(data)}{entries} >>\nstream\n".encode() + data + b"\nendstream")
+
+    @staticmethod
+    def _text(s: str) -> bytes:
+        s = s.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+        return b"(" + s.encode("cp1252", errors="replace") + b")"
+
+    def _text_ops(self, lines, top: float) -> bytes:
+        ops = [b"BT", f"56 {top:.0f} Td 14 TL".encode()]
+        style = None
+        for st, text in lines:
+            if st != style:
+                ops.append(b"/F2 14 Tf" if st == "h" else b"/F1 11 Tf")
+                style = st
+            ops.append(self._text(text) + b" Tj T*")
+        ops.append(b"ET")
+        return b"\n".join(ops)
+
+    def image(self, jpeg: bytes, w: int, h: int, gray: bool = True) -> int:
+        cs = "/DeviceGray" if gray else "/DeviceRGB"
+        return self._stream(jpeg, f" /Type /XObject /Subtype /Image /Width {w} /Height {h} /ColorSpace {cs} "
+                                  f"/BitsPerComponent 8 /Filter /DCTDecode", compress=False)
+
+    def page(self, lines=(), images=()) -> None:
+        """images: (obj_id, x, y, w, h) in Punkten; Text beginnt unter den Bildern am oberen Rand."""
+        ops, xobj = [], []
+        for i, (oid, x, y, w, h) in enumerate(images):
+            ops.append(f"q {w} 0 0 {h} {x} {y} cm /Im{i} Do Q".encode())
+            xobj.append(f"/Im{i} {oid} 0 R")
+        if lines:
+            ops.append(self._text_ops(lines, self.H - 56))
+        content = self._stream(b"\n".join(ops))
+        res = f"/Font << /F1 {self.font} 0 R /F2 {self.bold} 0 R >>"
+        if xobj:
+            res += f" /XObject << {' '.join(xobj)} >>"
+        self.pages.append(self._add(
+            f"<< /Type /Page /Parent {self.pages_id} 0 R /MediaBox [0 0 {self.W} {self.H}] "
+            f"/Resources << {res} >> /Contents {content} 0 R >>".encode()))
+
+    def render(self) -> bytes:
+        kids = " ".join(f"{p} 0 R" for p in self.pages)
+        self.objs[self.pages_id - 1] = f"<< /Type /Pages /Kids [{kids}] /Count {len(self.pages)} >>".encode()
+        catalog = self._add(f"<< /Type /Catalog /Pages {self.pages_id} 0 R >>".encode())
+        buf = io.BytesIO()
+        buf.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        offsets = []
+        for i, body in enumerate(self.objs, 1):
+            offsets.append(buf.tell())
+            buf.write(f"{i} 0 obj\n".encode() + body + b"\nendobj\n")
+        xref = buf.tell()
+        buf.write(f"xref\n0 {len(self.objs) + 1}\n0000000000 65535 f \n".encode())
+        for off in offsets:
+            buf.write(f"{off:010d} 00000 n \n".encode())
+        buf.write(f"trailer\n<< /Size {len(self.objs) + 1} /Root {catalog} 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode())
+        return buf.getvalue()
+
+
+def _font(size: int):
+    from PIL import ImageFont
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:
+        return ImageFont.load_default()
+
+
+def _scan_image(lines, rng: random.Random) -> bytes:
+    """Seite als Graustufen-Scan (150 dpi, leicht gedreht, Rauschen) → JPEG."""
+    from PIL import Image, ImageDraw, ImageFilter
+    scale = 150 / 72
+    w, h = int(_Pdf.W * scale), int(_Pdf.H * scale)
+    img = Image.new("L", (w, h), 250)
+    draw = ImageDraw.Draw(img)
+    body, head = _font(int(11 * scale)), _font(int(14 * scale))
+    y = 56 * scale
+    for st, text in lines:
+        draw.text((56 * scale, y), text, fill=20, font=head if st == "h" else body)
+        y += 14 * scale
+    for _ in range(1500):
+        draw.point((rng.randrange(w), rng.randrange(h)), fill=rng.randrange(120, 220))
+    img = img.rotate(rng.uniform(-0.6, 0.6), resample=Image.BICUBIC, fillcolor=250).filter(ImageFilter.GaussianBlur(0.6))
+    out = io.BytesIO()
+    img.save(out, format="JPEG", quality=80)
+    return out.getvalue()
+
+
+def _chart_image(rng: random.Random, w: int = 800, h: int = 500, fmt: str = "JPEG") -> bytes:
+    """Balkendiagramm mit Beschriftung (für bildlastige PDFs und PPTX)."""
+    from PIL import Image, ImageDraw
+    img = Image.new("RGB", (w, h), "white")
+    draw = ImageDraw.Draw(img)
+    bars = rng.randint(4, 9)
+    bw = (w - 100) // bars
+    for i in range(bars):
+        bh = rng.randint(40, h - 120)
+        color = tuple(rng.randrange(40, 220) for _ in range(3))
+        draw.rectangle([60 + i * bw + 6, h - 60 - bh, 60 + (i + 1) * bw - 6, h - 60], fill=color)
+        draw.text((60 + i * bw + 8, h - 50), rng.choice(_WORDS)[:8], fill="black", font=_font(18))
+    draw.line([55, 20, 55, h - 58, w - 20, h - 58], fill="black", width=3)
+    draw.text((70, 20), f"Abbildung: {rng.choice(_TITLES)}", fill="black", font=_font(24))
+    out = io.BytesIO()
+    img.save(out, format=fmt, **({"quality": 85} if fmt == "JPEG" else {}))
+    return out.getvalue()
+
+
+def _make_pdf_text(path: str, pages: int, rng: random.Random) -> None:
+    pdf = _Pdf()
+    for _ in range(pages):
+        pdf.page(_page_lines(rng))
+    with open(path, "wb") as fh:
+        fh.write(pdf.render())
+
+
+def _make_pdf_images(path: str, pages: int, rng: random.Random) -> None:
+    # je Seite zwei Diagramme oben, darunter Text
+    pdf = _Pdf()
+    for _ in range(pages):
+        imgs = []
+        for col in range(2):
+            oid = pdf.image(_chart_image(rng), 800, 500, gray=False)
+            imgs.append((oid, 56 + col * 246, _Pdf.H - 56 - 150, 236, 148))
+        lines = [("b", "")] * 12 + _page_lines(rng, capacity=38)
+        pdf.page(lines, imgs)
+    with open(path, "wb") as fh:
+        fh.write(pdf.render())
+
+
+def _make_pdf_scan(path: str, pages: int, rng: random.Random) -> None:
+    pdf = _Pdf()
+    scale = 150 / 72
+    for _ in range(pages):
+        oid = pdf.image(_scan_image(_page_lines(rng), rng), int(_Pdf.W * scale), int(_Pdf.H * scale))
+        pdf.page(images=[(oid, 0, 0, _Pdf.W, _Pdf.H)])
+    with open(path, "wb") as fh:
+        fh.write(pdf.render())
+
+
+_FIXED_DATE = (2024, 1, 1, 0, 0, 0)
+
+
+def _normalize_zip(path: str) -> None:
+    # Office-Dateien byte-gleich machen (Zeitstempel im ZIP), damit Korpus-Hashes stabil sind
+    with zipfile.ZipFile(path) as zin:
+        entries = [(i.filename, zin.read(i.filename)) for i in zin.infolist()]
+    with zipfile.ZipFile(path + ".tmp", "w", zipfile.ZIP_DEFLATED) as zout:
+        for name, data in entries:
+            zout.writestr(zipfile.ZipInfo(name, _FIXED_DATE), data, compress_type=zipfile.ZIP_DEFLATED)
+    os.replace(path + ".tmp", path)
+
+
+def _fixed_core_properties(cp) -> None:
+    from datetime import datetime
+    cp.author = "benchmark"
+    cp.created = cp.modified = cp.last_printed = datetime(2024, 1, 1)
+    cp.revision = 1
+
+
+def _make_docx(path: str, sections: int, rng: random.Random) -> None:
+    import docx
+    doc = docx.Document()
+    _fixed_core_properties(doc.core_properties)
+    doc.add_heading("Benchmark-Dokument", 0)
+    for kind, text in _blocks(rng, sections):
+        if kind == "heading":
+            doc.add_heading(text, 1)
+        elif kind == "item":
+            doc.add_paragraph(text, style="List Bullet")
+        else:
+            doc.add_paragraph(text)
+        if kind == "heading" and rng.random() < 0.3:
+            table = doc.add_table(rows=4, cols=3)
+            for row in table.rows:
+                for cell in row.cells:
+                    cell.text = f"{rng.choice(_WORDS)} {rng.randint(1, 999)}"
+    doc.save(path)
+    _normalize_zip(path)
+
+
+def _make_pptx(path: str, slides: int, rng: random.Random) -> None:
+    import pptx
+    from pptx.util import Inches
+    prs = pptx.Presentation()
+    _fixed_core_properties(prs.core_properties)
+    for i in range(slides):
+        slide = prs.slides.add_slide(prs.slide_layouts[1])
+        slide.shapes.title.text = f"{i + 1} {rng.choice(_TITLES)}"
+        body = slide.placeholders[1].text_frame
+        body.text = _sentence(rng)
+        for _ in range(rng.randint(2, 5)):
+            body.add_paragraph().text = _sentence(rng)
+        if i % 3 == 2:
+            slide.shapes.add_picture(io.BytesIO(_chart_image(rng, fmt="PNG")), Inches(5), Inches(4.2), width=Inches(4.5))
+    prs.save(path)
+    _normalize_zip(path)
+
+
+def _make_txt(path: str, paragraphs: int, rng: random.Random) -> None:
+    with open(path, "w", encoding="utf-8", newline="\n") as fh:
+        for kind, text in _blocks(rng, paragraphs):
+            fh.write(("\n" if kind == "heading" else "") + text + "\n\n")
+
+
+# (Name, Art, Erzeuger, Umfang); Umfang = Seiten/Abschnitte/Folien, mit --scale multipliziert
+CORPUS = (
+    ("text-005.pdf", "pdf-text", _make_pdf_text, 5),
+    ("text-030.pdf", "pdf-text", _make_pdf_text, 30),
+    ("text-120.pdf", "pdf-text", _make_pdf_text, 120),
+    ("images-010.pdf", "pdf-images", _make_pdf_images, 10),
+    ("scan-004.pdf", "pdf-scan", _make_pdf_scan, 4),
+    ("scan-020.pdf", "pdf-scan", _make_pdf_scan, 20),
+    ("doc-040.docx", "docx", _make_docx, 40),
+    ("slides-030.pptx", "pptx", _make_pptx, 30),
+    ("notes-200.txt", "txt", _make_txt, 200),
+)
+
+
+def build_corpus(corpus_dir: str, scale: float = 1.0, force: bool = False) -> dict:
+    """Korpus erzeugen (vorhandenes mit gleicher Skalierung wird wiederverwendet). Rückgabe: Manifest."""
+    manifest_path = os.path.join(corpus_dir, "corpus.json")
+    if not force and os.path.exists(manifest_path):
+        with open(manifest_path, "r", encoding="utf-8") as fh:
+            manifest = json.load(fh)
+        if manifest.get("scale") == scale and all(os.path.exists(os.path.join(corpus_dir, d["name"])) for d in manifest["docs"]):
+            return manifest
+    os.makedirs(corpus_dir, exist_ok=True)
+    docs = []
+    for i, (name, kind, make, size) in enumerate(CORPUS):
+        n = max(1, round(size * scale))
+        stem, ext = os.path.splitext(name)
+        name = f"{stem.rsplit('-', 1)[0]}-{n:03d}{ext}"
+        path = os.path.join(corpus_dir, name)
+        try:
+            make(path, n, random.Random(CORPUS_SEED + i))
+        except ImportError as e:
+            # Pillow / python-docx / python-pptx fehlen → Dokumentart auslassen
+            print(f"[corpus] {name} übersprungen: {e}", file=sys.stderr)
+            continue
+        with open(path, "rb") as fh:
+            sha = hashlib.sha256(fh.read()).hexdigest()
+        pages = n if kind.startswith("pdf") or kind == "pptx" else None
+        docs.append({"name": name, "kind": kind, "pages": pages, "bytes": os.path.getsize(path), "sha256": sha})
+    manifest = {"seed": CORPUS_SEED, "scale": scale, "docs": docs,
+                "digest": hashlib.sha256("".join(d["sha256"] for d in docs).encode()).hexdigest()[:16]}
+    with open(manifest_path, "w", encoding="utf-8") as fh:
+        json.dump(manifest, fh, ensure_ascii=False, indent=2)
+    return manifest
+
+
+# -------- Läufe --------
+
+def _dir_bytes(path: str) -> int:
+    total = 0
+    for root, _dirs, files in os.walk(path):
+        for n in files:
+            try:
+                total += os.path.getsize(os.path.join(root, n))
+            except OSError:
+                pass
+    return total
+
+
+def _child(spec_path: str) -> None:
+    # Läuft im eigenen Prozess; Umgebung (Cache-/Log-Ordner) setzt der Elternprozess
+    with open(spec_path, "r", encoding="utf-8") as fh:
+        spec = json.load(fh)
+    import pipeline
+    pipeline.OUT_DIR = spec["out_dir"]
+    opts = pipeline.job_options(dict(spec["options"], engine=spec["engine"]))
+    t0 = time.perf_counter()
+    try:
+        res = pipeline.convert_file(spec["source"], opts)
+    except Exception as e:
+        # mehrzeilige Meldungen (Chunk-Logs) auf eine Zeile kürzen
+        msg = " | ".join(ln.strip() for ln in str(e).splitlines() if ln.strip())
+        print(json.dumps({"error": f"{type(e).__name__}: {msg}"[:500]}))
+        sys.exit(2)
+    wall = time.perf_counter() - t0
+    out_dir = os.path.dirname(res["output_path"])
+    with open(res["output_path"], "r", encoding="utf-8") as fh:
+        md_chars = len(fh.read())
+    print(json.dumps({"wall_s": wall, "engine": res["engine"], "md_chars": md_chars,
+                      "output_bytes": _dir_bytes(out_dir), "chunk_layout": res["chunk_layout"]}))
+
+
+def _run_child(spec: dict, work_dir: str, timeout: float, offline: bool) -> tuple[dict, float]:
+    """Einen Lauf im Kindprozess ausführen. Rückgabe: (Ergebnis des Kindes oder error, Spitzen-RSS in MB)."""
+    spec_path = os.path.join(work_dir, "spec.json")
+    with open(spec_path, "w", encoding="utf-8") as fh:
+        json.dump(spec, fh)
+    env = dict(os.environ,
+               JOB_STORE_DB=os.path.join(work_dir, "joblog.db"),
+               PROBE_CACHE_DIR=os.path.join(work_dir, "probe"),
+               ASSET_STORE_DIR=os.path.join(work_dir, "blobs"),
+               CONVERSION_CACHE="0", MARKER_WORKER="0", PYTHONUNBUFFERED="1")
+    if offline:
+        env.update(HF_HUB_OFFLINE="1", TRANSFORMERS_OFFLINE="1")
+    proc = subprocess.Popen([sys.executable, os.path.abspath(__file__), "_child", spec_path],
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env, start_new_session=True)
+    timed_out = threading.Event()
+
+    def _kill():
+        timed_out.set()
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except OSError:
+            pass
+    timer = threading.Timer(timeout, _kill)
+    timer.start()
+    try:
+        # stderr in eigenem Thread lesen, sonst blockiert ein volles Pipe-Puffer das Kind
+        err_chunks = []
+        reader = threading.Thread(target=lambda: err_chunks.append(proc.stderr.read()), daemon=True)
+        reader.start()
+        out = proc.stdout.read()
+        reader.join()
+        # wait4 statt wait: liefert die Ressourcennutzung genau dieses Kindes (inkl. seiner beendeten Unterprozesse)
+        _pid, status, usage = os.wait4(proc.pid, 0)
+        proc.returncode = os.waitstatus_to_exitcode(status)
+    finally:
+        timer.cancel()
+    rss_mb = usage.ru_maxrss / 1024  # Linux: KiB
+    if timed_out.is_set():
+        return {"error": f"Timeout nach {timeout:.0f}s"}, rss_mb
+    lines = out.decode("utf-8", errors="replace").strip().splitlines()
+    if proc.returncode != 0:
+        if lines and lines[-1].startswith('{"error"'):
+            return json.loads(lines[-1]), rss_mb
+        err = (err_chunks[0] if err_chunks else b"").decode("utf-8", errors="replace").strip().splitlines()
+        return {"error": (err[-1] if err else f"Exit-Code {proc.returncode}")[:500]}, rss_mb
+    return json.loads(lines[-1]), rss_mb
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip()
+    except Exception:
+        return ""
+
+
+def run(corpus_dir: str, engines: set[str] | None = None, kinds: set[str] | None = None, repeat: int = 1,
+        timeout: float = 1800, offline: bool = True, scale: float = 1.0) -> dict:
+    """Alle passenden Dokument/Engine-Paare messen (Median über repeat Läufe). Rückgabe: Ergebnis-dict."""
+    manifest = build_corpus(corpus_dir, scale)
+    results = []
+    work_root = tempfile.mkdtemp(prefix="md-bench-")
+    try:
+        for doc in manifest["docs"]:
+            if kinds and doc["kind"] not in kinds:
+                continue
+            for engine in ENGINE_MATRIX[doc["kind"]]:
+                if engines and engine not in engines:
+                    continue
+                walls, rss, last = [], [], {}
+                for r in range(repeat):
+                    work_dir = os.path.join(work_root, f"{doc['name']}-{engine}-{r}")
+                    os.makedirs(work_dir)
+                    spec = {"source": os.path.join(corpus_dir, doc["name"]), "engine": engine,
+                            "options": BENCH_OPTIONS, "out_dir": os.path.join(work_dir, "out")}
+                    last, rss_mb = _run_child(spec, work_dir, timeout, offline)
+                    shutil.rmtree(work_dir, ignore_errors=True)
+                    rss.append(rss_mb)
+                    if "error" in last:
+                        break
+                    walls.append(last["wall_s"])
+                rec = {"doc": doc["name"], "kind": doc["kind"], "engine": engine, "pages": doc["pages"],
+                       "runs": len(walls), "peak_rss_mb": round(max(rss), 1)}
+                if "error" in last:
+                    rec.update(status="error", error=last["error"])
+                    print(f"[bench] {doc['name']:<18} {engine:<10} FEHLER: {last['error']}", file=sys.stderr, flush=True)
+                else:
+                    wall = statistics.median(walls)
+                    rec.update(status="ok", wall_s=round(wall, 3),
+                               pages_per_s=round(doc["pages"] / wall, 3) if doc["pages"] and wall > 0 else None,
+                               output_bytes=last["output_bytes"], md_chars=last["md_chars"])
+                    pps = f"{rec['pages_per_s']:>7.2f} S/s" if rec["pages_per_s"] else " " * 11
+                    print(f"[bench] {doc['name']:<18} {engine:<10} {wall:>8.2f} s {pps} {rec['peak_rss_mb']:>8.0f} MB "
+                          f"{rec['output_bytes'] / 1024:>8.0f} KB", flush=True)
+                results.append(rec)
+    finally:
+        shutil.rmtree(work_root, ignore_errors=True)
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "commit": _git_commit(),
+            "host": platform.node(), "cpu_count": os.cpu_count(), "python": platform.python_version(),
+            "platform": platform.platform(), "corpus_digest": manifest["digest"], "scale": scale,
+            "repeat": repeat, "options": BENCH_OPTIONS,
+        },
+        "results": results,
+    }
+
+
+# -------- Vergleich --------
+
+def compare(baseline: dict, current: dict, threshold: float = REGRESSION_THRESHOLD) -> list[str]:
+    """Regressionen (Zeit, RSS, neue Fehler) von current gegenüber baseline als Textzeilen."""
+    base = {(r["doc"], r["engine"]): r for r in baseline["results"]}
+    problems = []
+    if baseline["meta"].get("corpus_digest") != current["meta"].get("corpus_digest"):
+        print("[bench] Hinweis: Korpus weicht von der Baseline ab (anderer Seed/Scale/Bibliotheksstand)", file=sys.stderr)
+    for r in current["results"]:
+        b = base.get((r["doc"], r["engine"]))
+        if b is None:
+            continue
+        key = f"{r['doc']} · {r['engine']}"
+        if r["status"] != "ok":
+            if b["status"] == "ok":
+                problems.append(f"{key}: neuer Fehler – {r.get('error', '')}")
+            continue
+        if b["status"] != "ok":
+            continue
+        dt = r["wall_s"] - b["wall_s"]
+        if dt > MIN_DELTA_S and dt > threshold * b["wall_s"]:
+            problems.append(f"{key}: Zeit {b['wall_s']:.2f} s → {r['wall_s']:.2f} s (+{dt / b['wall_s']:.0%})")
+        dm = r["peak_rss_mb"] - b["peak_rss_mb"]
+        if dm > MIN_DELTA_MB and dm > threshold * b["peak_rss_mb"]:
+            problems.append(f"{key}: RSS {b['peak_rss_mb']:.0f} MB → {r['peak_rss_mb']:.0f} MB (+{dm / b['peak_rss_mb']:.0%})")
+    return problems
+
+
+def _load(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def _report(problems: list[str]) -> int:
+    for p in problems:
+        print(f"[regression] {p}")
+    print(f"{len(problems)} Regression(en)" if problems else "keine Regressionen")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "_child":
+        _child(sys.argv[2])
+        sys.exit(0)
+    ap = argparse.ArgumentParser(description="End-to-End-Benchmark der Konvertierungs-Engines")
+    ap.add_argument("--dir", default=BENCH_DIR, help=f"Arbeitsordner für Korpus und Ergebnisse (Default {BENCH_DIR}, ENV BENCH_DIR)")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    cp = sub.add_parser("corpus", help="Korpus erzeugen")
+    cp.add_argument("--scale", type=float, default=1.0, help="Seiten-/Abschnittszahl skalieren (z. B. 0.2 für einen schnellen Lauf)")
+    cp.add_argument("--force", action="store_true", help="neu erzeugen, auch wenn vorhanden")
+    rp = sub.add_parser("run", help="Engines messen")
+    rp.add_argument("--scale", type=float, default=1.0)
+    rp.add_argument("--engines", help="nur diese Engines, kommagetrennt (" + ",".join(sorted({e for v in ENGINE_MATRIX.values() for e in v})) + ")")
+    rp.add_argument("--kinds", help="nur diese Dokumentarten, kommagetrennt (" + ",".join(ENGINE_MATRIX) + ")")
+    rp.add_argument("--repeat", type=int, default=1, help="Läufe je Paar (Median)")
+    rp.add_argument("--timeout", type=float, default=1800, help="Abbruch je Lauf (Sekunden)")
+    rp.add_argument("--allow-network", action="store_true", help="Modell-Downloads erlauben (Default: HF offline)")
+    rp.add_argument("--out", help="Ergebnisdatei (Default <dir>/results-<zeit>.json)")
+    rp.add_argument("--baseline", help="nach dem Lauf gegen diese Ergebnisdatei vergleichen")
+    rp.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    cmp = sub.add_parser("compare", help="Ergebnisse mit Baseline vergleichen")
+    cmp.add_argument("baseline")
+    cmp.add_argument("current")
+    cmp.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD, help="relative Verschlechterung (0.15 = 15 %%)")
+    a = ap.parse_args()
+    corpus_dir = os.path.join(a.dir, "corpus")
+    if a.cmd == "corpus":
+        m = build_corpus(corpus_dir, a.scale, force=a.force)
+        for d in m["docs"]:
+            print(f"{d['name']:<20} {d['kind']:<10} {d['bytes'] / 1024:>9.0f} KB  {d['sha256'][:12]}")
+        print(f"Korpus {m['digest']} unter {corpus_dir}")
+    elif a.cmd == "run":
+        split = lambda s: {x.strip() for x in s.split(",") if x.strip()} if s else None
+        res = run(corpus_dir, split(a.engines), split(a.kinds), repeat=max(1, a.repeat), timeout=a.timeout,
+                  offline=not a.allow_network, scale=a.scale)
+        out = a.out or os.path.join(a.dir, f"results-{time.strftime('%Y%m%d-%H%M%S')}.json")
+        os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+        with open(out, "w", encoding="utf-8") as fh:
+            json.dump(res, fh, ensure_ascii=False, indent=2)
+        print(f"Ergebnisse: {out}")
+        if a.baseline:
+            sys.exit(_report(compare(_load(a.baseline), res, a.threshold)))
+    elif a.cmd == "compare":
+        sys.exit(_report(compare(_load(a.baseline), _load(a.current), a.threshold)))
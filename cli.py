@@ -0,0 +1,219 @@
+# Konvertierung ohne Browser (cron, CI): Dateien, Globs oder Verzeichnisse parallel durch pipeline.convert_file.
+#
+#   python cli.py data/in                       # alle Dokumente im Verzeichnis (rekursiv)
+#   python cli.py "skripte/**/*.pdf" -j 4 --out /tmp/md
+#   python cli.py a.pdf b.docx --engine Docling --ocr-engine tesseract --json
+#
+# Importiert kein Streamlit; Engines werden wie im Queue-Worker erst beim ersten Job, der sie braucht, geladen.
+# Exit-Code 0, wenn alle Dateien konvertiert wurden, sonst 1 (2 bei fehlenden Eingaben).
+import os, sys, glob, json, time, argparse, threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pipeline
+import inbox_watcher
+
+# Beim Durchsuchen von Verzeichnissen berücksichtigte Endungen (explizit genannte Dateien laufen immer)
+DOC_EXTENSIONS = (".pdf", ".ppt", ".pptx", ".doc", ".docx", ".xls", ".xlsx", ".html", ".htm", ".epub", ".txt")
+ENGINES = pipeline.OPTION_CHOICES["engine"]
+
+
+def expand_inputs(args: list[str], extensions=DOC_EXTENSIONS) -> tuple[list[str], list[str]]:
+    """Dateien, Globs und Verzeichnisse → (sortierte, eindeutige Dateipfade, nicht gefundene Angaben)."""
+    found, missing = [], []
+    for arg in args:
+        if os.path.isdir(arg):
+            for root, dirs, files in os.walk(arg):
+                dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+                found.extend(os.path.join(root, n) for n in files
+                             if n.lower().endswith(extensions) and not inbox_watcher.ignored(n))
+        elif os.path.isfile(arg):
+            found.append(arg)
+        elif glob.has_magic(arg):
+            hits = [p for p in glob.glob(arg, recursive=True) if os.path.isfile(p)]
+            if not hits:
+                missing.append(arg)
+            found.extend(hits)
+        else:
+            missing.append(arg)
+    seen, out = set(), []
+    for p in sorted(os.path.abspath(p) for p in found):
+        if p not in seen:
+            seen.add(p)
+            out.append(p)
+    return out, missing
+
+
+def _bounded(key: str):
+    """argparse-type für eine Zahl-Option mit den Grenzen aus pipeline.OPTION_LIMITS."""
+    lo, hi = pipeline.OPTION_LIMITS[key]
+    def _parse(raw: str) -> int:
+        try:
+            v = int(raw)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"keine ganze Zahl: {raw!r}")
+        if v < lo or (hi is not None and v > hi):
+            raise argparse.ArgumentTypeError(f"erlaubt: {lo}–{hi if hi is not None else '∞'}, nicht {v}")
+        return v
+    return _parse
+
+
+def _options(a) -> dict:
+    overrides = {
+        "engine": a.engine,
+        "ocr_engine": a.ocr_engine,
+        "chunk_mode": a.chunk_mode,
+        "chunk_size": a.chunk_size,
+        "add_frontmatter": not a.no_frontmatter,
+        "auto_pdf_text": not a.no_pdf_text,
+        "force_ocr": a.force_ocr,
+        "ocr_routing": a.ocr_routing,
+        "keep_images": not a.no_images,
+        "delete_after_success": False,
+    }
+    if a.tags is not None:
+        overrides["tags"] = [t.strip() for t in a.tags.split(",") if t.strip()]
+    if a.max_parallel_chunks:
+        overrides["max_parallel_chunks"] = a.max_parallel_chunks
+    if a.no_cache:
+        overrides["use_cache"] = False
+    if a.no_marker_worker:
+        overrides["use_marker_worker"] = False
+    if a.image_format:
+        overrides.update(image_optimize=True, image_format=a.image_format, image_max_dim=a.image_max_dim)
+    return pipeline.job_options(overrides)
+
+
+class _Reporter:
+    """Statuszeilen aus mehreren Worker-Threads (eine Zeile je Ereignis, als Text oder JSON)."""
+    def __init__(self, as_json: bool, verbose: bool):
+        self.as_json = as_json
+        self.verbose = verbose
+        self._lock = threading.Lock()
+
+    def emit(self, text: str, record: dict | None = None, err: bool = False) -> None:
+        with self._lock:
+            if self.as_json:
+                if record is not None:
+                    print(json.dumps(record, ensure_ascii=False), flush=True)
+            else:
+                print(text, file=sys.stderr if err else sys.stdout, flush=True)
+
+    def live(self, name: str):
+        if not self.verbose or self.as_json:
+            return None
+        return lambda line: self.emit(f"  [{name}] {line}", err=True)
+
+
+def _convert_one(path: str, opts: dict, rep: _Reporter, cancel: threading.Event) -> dict:
+    name = os.path.basename(path)
+    t0 = time.time()
+    try:
+        res = pipeline.convert_file(path, opts, live_cb=rep.live(name), note_cb=rep.live(name), cancel_event=cancel)
+    except Exception as e:
+        status = "cancelled" if isinstance(e, pipeline.JobCancelled) else "error"
+        msg = str(e).strip().splitlines()[0] if str(e).strip() else type(e).__name__
+        rec = {"source": path, "status": status, "error": str(e), "duration_ms": int((time.time() - t0) * 1000)}
+        rep.emit(f"[{'abgebrochen' if status == 'cancelled' else 'fehler'}] {path}: {msg}", rec)
+        return rec
+    rec = {"source": path, "status": "ok", "engine": res["engine"], "output_path": res["output_path"],
+           "duration_ms": res["duration_ms"], "cache": res["cache"], "pages": res.get("pages") or 0,
+           "image_bytes_saved": res.get("image_bytes_saved", 0), "spans": res.get("spans") or []}
+    cache = " · Cache-Treffer" if res["cache"] == "hit" else ""
+    rep.emit(f"[ok] {path} → {res['output_path']} ({res['engine']}, {res['duration_ms'] / 1000:.1f} s{cache})", rec)
+    return rec
+
+
+def run(paths: list[str], opts: dict, workers: int = 1, as_json: bool = False, verbose: bool = False) -> dict:
+    """Dateien mit workers parallelen Jobs konvertieren. Rückgabe: Zusammenfassung (auch als letzte Ausgabe)."""
+    rep = _Reporter(as_json, verbose)
+    cancel = threading.Event()
+    results = []
+    # Gleicher Slug → gleicher Ausgabeordner: nur die erste Datei konvertieren
+    by_slug, todo = {}, []
+    for p in paths:
+        slug = pipeline.slugify(os.path.basename(p))
+        if slug in by_slug:
+            rec = {"source": p, "status": "skipped", "error": f"gleicher Ausgabeordner wie {by_slug[slug]}"}
+            rep.emit(f"[übersprungen] {p}: {rec['error']}", rec, err=True)
+            results.append(rec)
+            continue
+        by_slug[slug] = p
+        todo.append(p)
+    t0 = time.time()
+    pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="convert")
+    try:
+        futs = [pool.submit(_convert_one, p, opts, rep, cancel) for p in todo]
+        for fut in as_completed(futs):
+            results.append(fut.result())
+    except KeyboardInterrupt:
+        # laufende Engines beenden (Marker-Prozessgruppen, Worker-Verbindungen), wartende Jobs verwerfen
+        cancel.set()
+        pool.shutdown(wait=True, cancel_futures=True)
+        raise
+    finally:
+        pool.shutdown(wait=True)
+    wall = time.time() - t0
+    ok = [r for r in results if r["status"] == "ok"]
+    pages = sum(r["pages"] for r in ok)
+    summary = {
+        "summary": True, "files": len(results), "ok": len(ok),
+        "errors": sum(r["status"] == "error" for r in results),
+        "skipped": sum(r["status"] == "skipped" for r in results),
+        "cache_hits": sum(r["cache"] == "hit" for r in ok),
+        "wall_s": round(wall, 2), "workers": max(1, workers),
+        "files_per_min": round(len(ok) / wall * 60, 2) if wall > 0 else None,
+        "pages": pages, "pages_per_s": round(pages / wall, 2) if wall > 0 and pages else None,
+    }
+    rate = f", {summary['pages_per_s']} Seiten/s" if summary["pages_per_s"] else ""
+    rep.emit(f"{summary['ok']}/{summary['files']} konvertiert, {summary['errors']} Fehler, {summary['skipped']} übersprungen, "
+             f"{summary['cache_hits']} Cache-Treffer · {wall:.1f} s mit {summary['workers']} Worker(n) · "
+             f"{summary['files_per_min']} Dateien/min{rate}", summary)
+    return summary
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Dokumente ohne UI nach Markdown konvertieren")
+    ap.add_argument("inputs", nargs="+", help="Dateien, Globs (\"**/*.pdf\") oder Verzeichnisse (rekursiv)")
+    ap.add_argument("-j", "--workers", type=int, default=int(os.environ.get("JOB_WORKERS", "1")), help="parallele Dateien (Default ENV JOB_WORKERS bzw. 1)")
+    ap.add_argument("--out", default=pipeline.OUT_DIR, help=f"Ausgabeverzeichnis (Default {pipeline.OUT_DIR})")
+    ap.add_argument("--engine", choices=ENGINES, default="Auto")
+    ap.add_argument("--ocr-engine", default="auto", choices=pipeline.OPTION_CHOICES["ocr_engine"], help="OCR-Backend für Docling")
+    ap.add_argument("--chunk-mode", choices=pipeline.OPTION_CHOICES["chunk_mode"], default="fest")
+    ap.add_argument("--chunk-size", type=_bounded("chunk_size"), default=pipeline.DEFAULT_OPTIONS["chunk_size"], help="Seiten bzw. Kosten-Ziel je Chunk (10–100)")
+    ap.add_argument("--max-parallel-chunks", type=_bounded("max_parallel_chunks"), default=0, help="parallele Marker-Chunks je PDF (Default ENV MAX_PARALLEL_CHUNKS)")
+    ap.add_argument("--force-ocr", action="store_true")
+    ap.add_argument("--ocr-routing", action="store_true", help="OCR pro Seite entscheiden")
+    ap.add_argument("--no-images", action="store_true", help="keine Bilder extrahieren (Marker)")
+    ap.add_argument("--no-pdf-text", action="store_true", help="Auto: digitale PDFs nicht per Textlayer")
+    ap.add_argument("--no-frontmatter", action="store_true")
+    ap.add_argument("--tags", help="Frontmatter-Tags, kommagetrennt")
+    ap.add_argument("--no-cache", action="store_true", help="Konvertierungs-Cache nicht verwenden")
+    ap.add_argument("--no-marker-worker", action="store_true", help="marker_single statt persistenter Worker")
+    ap.add_argument("--image-format", choices=pipeline.OPTION_CHOICES["image_format"], help="Bilder optimieren (siehe asset_optimize.py)")
+    ap.add_argument("--image-max-dim", type=_bounded("image_max_dim"), default=0, help="max. Kantenlänge optimierter Bilder (px)")
+    ap.add_argument("--ext", help="Endungen beim Durchsuchen von Verzeichnissen, kommagetrennt (Default: " + ",".join(e[1:] for e in DOC_EXTENSIONS) + ")")
+    ap.add_argument("--json", action="store_true", help="eine JSON-Zeile je Datei und eine Zusammenfassung")
+    ap.add_argument("-v", "--verbose", action="store_true", help="Engine-Logs live auf stderr")
+    a = ap.parse_args(argv)
+
+    extensions = DOC_EXTENSIONS
+    if a.ext:
+        extensions = tuple("." + e.strip().lstrip(".").lower() for e in a.ext.split(",") if e.strip())
+    paths, missing = expand_inputs(a.inputs, extensions)
+    for m in missing:
+        print(f"[fehlt] {m}", file=sys.stderr)
+    if not paths:
+        print("Keine Eingabedateien gefunden.", file=sys.stderr)
+        return 2
+    pipeline.OUT_DIR = os.path.abspath(a.out)
+    os.makedirs(pipeline.OUT_DIR, exist_ok=True)
+    try:
+        summary = run(paths, _options(a), workers=a.workers, as_json=a.json, verbose=a.verbose)
+    except KeyboardInterrupt:
+        print("abgebrochen", file=sys.stderr)
+        return 130
+    return 0 if summary["ok"] == summary["files"] and not missing else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
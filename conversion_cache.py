@@ -0,0 +1,224 @@
+# Inhaltsadressierter Konvertierungs-Cache.
+# Schlüssel = SHA-256 der Quelldatei + effektive Konvertierungs-Einstellungen + Engine-Version.
+# Ein Eintrag enthält das Engine-Markdown (vor Post-Processing/Frontmatter) und die Bilder, auf die es
+# verweist (Pfad relativ zum Zielordner + SHA-256 in meta.json). Beim Wiederherstellen kommen die Bilder
+# über den Asset-Speicher (Hardlink auf den Blob) zurück in den Zielordner.
+import os, re, json, time, shutil, hashlib, tempfile, threading
+
+import doc_probe
+
+try:
+    import asset_store
+except Exception:
+    asset_store = None
+
+CACHE_DIR = os.environ.get("CONVERSION_CACHE_DIR", "/app/.cache/conversions")
+MAX_BYTES = int(float(os.environ.get("CONVERSION_CACHE_MAX_MB", "5120")) * 1024 * 1024)
+CACHE_FORMAT = 2
+
+# Python-Distribution je Engine (für die Versionskomponente im Schlüssel)
+ENGINE_PACKAGES = {
+    "Marker": "marker-pdf",
+    "Docling": "docling",
+    "MarkItDown": "markitdown",
+    "pptx2md": "pptx2md",
+    "PDF-Text": "pypdf",
+}
+
+_evict_lock = threading.Lock()
+
+# Bildverweise im Engine-Markdown: ![alt](pfad) und <img src="pfad">
+_REF_RES = (re.compile(r'!\[[^\]]*\]\(<?([^)\s>]+)>?'), re.compile(r'<img\s[^>]*?src=["\']([^"\']+)["\']', re.IGNORECASE))
+
+
+def engine_version(engine: str) -> str:
+    pkg = ENGINE_PACKAGES.get(engine)
+    if not pkg:
+        return "builtin"
+    try:
+        from importlib.metadata import version
+        return version(pkg)
+    except Exception:
+        return "unknown"
+
+
+def make_key(source_sha: str, engine: str, settings: dict) -> str:
+    payload = json.dumps(
+        {"format": CACHE_FORMAT, "sha256": source_sha, "engine": engine,
+         "engine_version": engine_version(engine), "settings": settings},
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _entry_dir(key: str) -> str:
+    return os.path.join(CACHE_DIR, key[:2], key)
+
+
+def _tree_size(path: str) -> int:
+    total = 0
+    for root, _dirs, files in os.walk(path):
+        for n in files:
+            try:
+                total += os.path.getsize(os.path.join(root, n))
+            except OSError:
+                pass
+    return total
+
+
+def _refs(md_text: str) -> list[str]:
+    refs = []
+    for rx in _REF_RES:
+        for m in rx.finditer(md_text):
+            href = m.group(1).split("#", 1)[0].split("?", 1)[0]
+            if href and "://" not in href and not href.startswith(("data:", "/")) and href not in refs:
+                refs.append(href)
+    return refs
+
+
+def _referenced_files(md_text: str, target_dir: str) -> list[str]:
+    """
+    Dateien (Pfade relativ zu target_dir), auf die md_text verweist. Relative Links gelten je nach Engine
+    gegenüber target_dir, target_dir/assets oder dem Unterordner, in dem die Engine ihr Markdown abgelegt hat
+    (Marker: <ziel>/<name>/); im letzten Fall gewinnt die jüngste passende Datei.
+    """
+    root = os.path.abspath(target_dir)
+    by_suffix: dict[str, list[str]] | None = None
+    found = []
+    for href in _refs(md_text):
+        rel = os.path.normpath(href)
+        if rel.startswith(".."):
+            continue
+        hit = next((c for c in (rel, os.path.join("assets", rel)) if os.path.isfile(os.path.join(root, c))), None)
+        if hit is None:
+            if by_suffix is None:
+                # einmal durchlaufen; Zwischenstände (_chunk_XX) gehören nicht zum Ergebnis
+                by_suffix = {}
+                for d, dirs, files in os.walk(root):
+                    dirs[:] = [n for n in dirs if not n.startswith("_chunk_")]
+                    for n in files:
+                        by_suffix.setdefault(n, []).append(os.path.relpath(os.path.join(d, n), root))
+            cands = [c for c in by_suffix.get(os.path.basename(rel), []) if c == rel or c.endswith(os.sep + rel)]
+            if cands:
+                hit = max(cands, key=lambda c: os.path.getmtime(os.path.join(root, c)))
+        if hit is not None and hit not in found:
+            found.append(hit)
+    return found
+
+
+def _restore_file(src: str, dst: str, sha: str) -> None:
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    if asset_store is not None and asset_store.ENABLED:
+        try:
+            asset_store.link_to(asset_store.add(src, sha), dst)
+            return
+        except FileNotFoundError:
+            # Blob zwischenzeitlich von prune() entfernt → Kopie aus dem Cache
+            pass
+    # Vorhandene Dateien ersetzen statt überschreiben: sie können Hardlinks in den Asset-Speicher sein
+    if os.path.lexists(dst):
+        os.remove(dst)
+    shutil.copy2(src, dst)
+
+
+def lookup(key: str, target_dir: str) -> str | None:
+    """Bei Treffer: Dateien nach target_dir wiederherstellen und Markdown zurückgeben, sonst None."""
+    entry = _entry_dir(key)
+    md_path = os.path.join(entry, "result.md")
+    if not os.path.isfile(md_path):
+        return None
+    try:
+        meta_path = os.path.join(entry, "meta.json")
+        with open(meta_path, "r", encoding="utf-8") as fh:
+            meta = json.load(fh)
+        for f in meta.get("files", []):
+            _restore_file(os.path.join(entry, "files", f["name"]), os.path.join(target_dir, f["path"]), f["sha256"])
+        with open(md_path, "r", encoding="utf-8") as fh:
+            md_text = fh.read()
+        # LRU: Zugriffszeit am Eintrag vermerken
+        meta["last_used"] = time.time()
+        meta["hits"] = int(meta.get("hits", 0)) + 1
+        with open(meta_path, "w", encoding="utf-8") as fh:
+            json.dump(meta, fh)
+        return md_text
+    except Exception:
+        return None
+
+
+def store(key: str, md_text: str, target_dir: str, info: dict | None = None) -> None:
+    """Legt Engine-Markdown + die von ihm verwiesenen Dateien aus target_dir ab und räumt danach per LRU auf."""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    entry = _entry_dir(key)
+    os.makedirs(os.path.dirname(entry), exist_ok=True)
+    tmp = tempfile.mkdtemp(prefix=".tmp-", dir=os.path.dirname(entry))
+    try:
+        with open(os.path.join(tmp, "result.md"), "w", encoding="utf-8") as fh:
+            fh.write(md_text)
+        files = []
+        if os.path.isdir(target_dir):
+            os.makedirs(os.path.join(tmp, "files"))
+            for rel in _referenced_files(md_text, target_dir):
+                src = os.path.join(target_dir, rel)
+                # Ablage als files/<n><ext>: der Asset-Speicher benennt Blobs nach Hash + Endung
+                name = f"{len(files)}{os.path.splitext(rel)[1].lower()}"
+                shutil.copy2(src, os.path.join(tmp, "files", name))
+                files.append({"path": rel, "name": name, "sha256": doc_probe.file_sha256(src)})
+        now = time.time()
+        meta = dict(info or {}, created=now, last_used=now, hits=0, size=_tree_size(tmp), files=files)
+        with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as fh:
+            json.dump(meta, fh)
+        if os.path.isdir(entry):
+            shutil.rmtree(entry, ignore_errors=True)
+        os.rename(tmp, entry)
+    except Exception:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    evict(MAX_BYTES)
+
+
+def evict(max_bytes: int = MAX_BYTES) -> int:
+    """Entfernt die am längsten nicht genutzten Einträge, bis der Cache <= max_bytes ist. Gibt freigegebene Bytes zurück."""
+    if not os.path.isdir(CACHE_DIR):
+        return 0
+    with _evict_lock:
+        entries = []
+        for shard in os.listdir(CACHE_DIR):
+            shard_dir = os.path.join(CACHE_DIR, shard)
+            if not os.path.isdir(shard_dir):
+                continue
+            for key in os.listdir(shard_dir):
+                meta_path = os.path.join(shard_dir, key, "meta.json")
+                try:
+                    with open(meta_path, "r", encoding="utf-8") as fh:
+                        meta = json.load(fh)
+                except Exception:
+                    continue
+                entries.append((float(meta.get("last_used", 0)), int(meta.get("size", 0)), os.path.join(shard_dir, key)))
+        total = sum(size for _t, size, _p in entries)
+        freed = 0
+        for _last_used, size, path in sorted(entries):
+            if total <= max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            freed += size
+        return freed
+
+
+def stats() -> dict:
+    count = 0
+    size = 0
+    if os.path.isdir(CACHE_DIR):
+        for shard in os.listdir(CACHE_DIR):
+            shard_dir = os.path.join(CACHE_DIR, shard)
+            if not os.path.isdir(shard_dir):
+                continue
+            for key in os.listdir(shard_dir):
+                meta_path = os.path.join(shard_dir, key, "meta.json")
+                try:
+                    with open(meta_path, "r", encoding="utf-8") as fh:
+                        size += int(json.load(fh).get("size", 0))
+                    count += 1
+                except Exception:
+                    continue
+    return {"entries": count, "bytes": size, "max_bytes": MAX_BYTES}
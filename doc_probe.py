@@ -0,0 +1,353 @@
+# Günstige Dokument-Analyse vor der Konvertierung (ohne Modelle).
+# probe(path) öffnet jede Eingabe genau einmal und legt das Ergebnis als kleinen
+# Metadaten-Datensatz ab (Schlüssel = SHA-256 der Datei, im Speicher und unter PROBE_CACHE_DIR).
+# Der Platten-Cache wird nach Alter und Größe geräumt (prune(), beim Schreiben höchstens alle 10 min):
+#
+#   python doc_probe.py prune
+import os, re, json, time, hashlib, argparse, threading, zipfile
+from collections import OrderedDict
+
+# OCR-Klassifikation je Seite (per ENV justierbar)
+OCR_MIN_TEXT_CHARS = int(os.environ.get("OCR_MIN_TEXT_CHARS", "30"))
+OCR_IMAGE_COVERAGE = float(os.environ.get("OCR_IMAGE_COVERAGE", "0.6"))
+OCR_SPARSE_TEXT_CHARS = int(os.environ.get("OCR_SPARSE_TEXT_CHARS", "300"))
+# Stichprobe für den Textlayer-Schnelltest (Auto → PDF-Text)
+TEXT_LAYER_SAMPLE_PAGES = int(os.environ.get("TEXT_LAYER_SAMPLE_PAGES", "8"))
+# Seiten ohne Text und ohne Bilder mit höchstens so viel Content (Leer-/Trennseiten) zählen beim Schnelltest nicht
+BLANK_PAGE_MAX_BYTES = int(os.environ.get("BLANK_PAGE_MAX_BYTES", "512"))
+
+PROBE_CACHE_DIR = os.environ.get("PROBE_CACHE_DIR", "/app/.cache/probe")
+# Einträge, die so lange nicht gelesen/geschrieben wurden, bzw. die ältesten über der Größengrenze fallen weg
+PROBE_CACHE_MAX_DAYS = float(os.environ.get("PROBE_CACHE_MAX_DAYS", "90"))
+PROBE_CACHE_MAX_MB = float(os.environ.get("PROBE_CACHE_MAX_MB", "256"))
+PROBE_FORMAT = 2
+_MEM_MAX = 256
+_PRUNE_INTERVAL = 600
+
+_mem_lock = threading.Lock()
+_mem: "OrderedDict[str, dict]" = OrderedDict()
+_last_prune = 0.0
+
+
+def file_sha256(path: str, block_size: int = 1024 * 1024) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _page_text_stats(page, xobjects) -> tuple[int, float]:
+    """(Zeichen im Textlayer, Anteil der Seitenfläche, die von Bildern bedeckt ist)."""
+    box = page.mediabox
+    page_area = max(1.0, float(box.width) * float(box.height))
+    img_area = 0.0
+
+    def _visit(op, args, cm, _tm):
+        nonlocal img_area
+        if op != b"Do" or not args:
+            return
+        try:
+            if xobjects[args[0]].get("/Subtype") == "/Image":
+                # Bilder werden auf das Einheitsquadrat gezeichnet → Fläche = |det(cm)|
+                img_area += abs(cm[0] * cm[3] - cm[1] * cm[2])
+        except Exception:
+            pass
+
+    try:
+        text = page.extract_text(visitor_operand_before=_visit)
+    except Exception:
+        text = ""
+    return len((text or "").strip()), min(1.0, img_area / page_area)
+
+
+def needs_ocr(text_chars: int, image_coverage: float) -> bool:
+    """Kein/kaum Textlayer oder überwiegend Bild mit wenig Text → OCR."""
+    if text_chars < OCR_MIN_TEXT_CHARS:
+        return True
+    return image_coverage >= OCR_IMAGE_COVERAGE and text_chars < OCR_SPARSE_TEXT_CHARS
+
+
+def _page_sha256(page, data: bytes, xobjects) -> str:
+    # Seitengröße, Content-Stream und eingebettete XObjects (Rohdaten) → erkennt geänderte Seiten
+    h = hashlib.sha256()
+    h.update(repr([float(v) for v in page.mediabox]).encode("ascii"))
+    h.update(data)
+    for name in sorted(xobjects):
+        h.update(name.encode("utf-8"))
+        h.update(getattr(xobjects[name].get_object(), "_data", b"") or b"")
+    return h.hexdigest()
+
+
+def _page_info(page, text_stats: bool, page_hash: bool = False) -> dict:
+    box = page.mediabox
+    resources = page["/Resources"] if "/Resources" in page else {}
+    fonts = resources["/Font"] if "/Font" in resources else {}
+    xobjects = _xobjects(page)
+    images = 0
+    for name in xobjects:
+        try:
+            if xobjects[name].get("/Subtype") == "/Image":
+                images += 1
+        except Exception:
+            continue
+    contents = page.get_contents()
+    data = contents.get_data() if contents is not None else b""
+    info = {
+        "width": float(box.width),
+        "height": float(box.height),
+        # Textlayer: Fonts in den Ressourcen und mindestens ein Textobjekt im Content-Stream
+        "has_text": len(fonts) > 0 and b"BT" in data,
+        "images": images,
+        "content_bytes": len(data.strip()),
+    }
+    if text_stats:
+        info.update(_text_fields(page, xobjects, info))
+    if page_hash:
+        info["sha256"] = _page_sha256(page, data, xobjects)
+    return info
+
+
+def _text_fields(page, xobjects, info: dict) -> dict:
+    chars, coverage = _page_text_stats(page, xobjects) if info["has_text"] or info["images"] else (0, 0.0)
+    return {"text_chars": chars, "image_coverage": round(coverage, 3), "needs_ocr": needs_ocr(chars, coverage)}
+
+
+def is_blank(info: dict) -> bool:
+    """Leer- oder Trennseite: kein Textlayer, keine Bilder, (fast) leerer Content-Stream."""
+    return not info["has_text"] and not info["images"] and info["content_bytes"] <= BLANK_PAGE_MAX_BYTES
+
+
+def _sample_indices(n: int, sample: int) -> list[int]:
+    # gleichmäßig über das Dokument verteilt, erste und letzte Seite inklusive
+    return sorted({round(i * (n - 1) / max(1, sample - 1)) for i in range(min(sample, n))})
+
+
+def _probe_pdf(path: str, rec: dict, text_stats: bool) -> None:
+    from pypdf import PdfReader
+    reader = PdfReader(path)
+    rec["encrypted"] = bool(reader.is_encrypted)
+    if reader.is_encrypted:
+        # Nur Besitzer-Passwort (leeres Benutzer-Passwort) → lesbar wie ein normales PDF
+        try:
+            decrypted = bool(reader.decrypt(""))
+        except Exception:
+            decrypted = False
+        if not decrypted:
+            rec["error"] = "verschlüsselt"
+            return
+    pages = reader.pages
+    infos = [_page_info(p, text_stats, page_hash=True) for p in pages]
+    n = len(infos)
+    rec["pages"] = n
+    rec["page_info"] = infos
+    rec["text_stats"] = text_stats
+    rec["images"] = sum(p["images"] for p in infos)
+    rec["text_ratio"] = round(sum(1 for p in infos if p["has_text"]) / n, 3) if n else 0.0
+    sizes: dict[tuple[int, int], int] = {}
+    for p in infos:
+        k = (round(p["width"]), round(p["height"]))
+        sizes[k] = sizes.get(k, 0) + 1
+    rec["page_sizes"] = [[w, h, c] for (w, h), c in sorted(sizes.items(), key=lambda kv: -kv[1])]
+    # Schnelltest für Auto: alle Seiten außer Leer-/Trennseiten mit Textlayer, keine Stichprobe braucht OCR
+    content = [i for i, p in enumerate(infos) if not is_blank(p)]
+    ok = bool(content) and all(infos[i]["has_text"] for i in content)
+    if ok:
+        for k in _sample_indices(len(content), TEXT_LAYER_SAMPLE_PAGES):
+            i = content[k]
+            stats = infos[i] if text_stats else _text_fields(pages[i], _xobjects(pages[i]), infos[i])
+            if stats["needs_ocr"]:
+                ok = False
+                break
+    rec["text_layer_ok"] = ok
+
+
+def _xobjects(page):
+    resources = page["/Resources"] if "/Resources" in page else {}
+    return resources["/XObject"] if "/XObject" in resources else {}
+
+
+def _probe_office(path: str, rec: dict) -> None:
+    with zipfile.ZipFile(path) as zf:
+        names = zf.namelist()
+        rec["slides"] = sum(1 for n in names if re.fullmatch(r"ppt/slides/slide\d+\.xml", n)) or None
+        rec["sheets"] = sum(1 for n in names if re.fullmatch(r"xl/worksheets/sheet\d+\.xml", n)) or None
+        rec["images"] = sum(1 for n in names if re.match(r"(ppt|word|xl)/media/", n))
+        if "docProps/app.xml" in names:
+            m = re.search(rb"<Pages>(\d+)</Pages>", zf.read("docProps/app.xml"))
+            if m:
+                rec["pages"] = int(m.group(1))
+    if rec["slides"]:
+        rec["pages"] = rec["slides"]
+
+
+def _cache_path(sha: str) -> str:
+    return os.path.join(PROBE_CACHE_DIR, sha[:2], sha + ".json")
+
+
+def _remember(rec: dict) -> None:
+    # Fehlgeschlagene Analysen nicht merken (z. B. Datei noch im Schreiben, fehlende Bibliothek)
+    if rec.get("error"):
+        return
+    with _mem_lock:
+        _mem[rec["sha256"]] = rec
+        _mem.move_to_end(rec["sha256"])
+        while len(_mem) > _MEM_MAX:
+            _mem.popitem(last=False)
+    try:
+        path = _cache_path(rec["sha256"])
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + ".tmp", "w", encoding="utf-8") as fh:
+            json.dump(rec, fh)
+        os.replace(path + ".tmp", path)
+    except OSError:
+        pass
+    _maybe_prune()
+
+
+def _recall(sha: str) -> dict | None:
+    with _mem_lock:
+        rec = _mem.get(sha)
+    if rec is not None:
+        return rec
+    path = _cache_path(sha)
+    try:
+        with open(path, "r", encoding="utf-8") as fh:
+            rec = json.load(fh)
+    except (OSError, ValueError):
+        return None
+    if rec.get("version") != PROBE_FORMAT:
+        return None
+    try:
+        os.utime(path)  # LRU: zuletzt benutzt
+    except OSError:
+        pass
+    with _mem_lock:
+        _mem[sha] = rec
+    return rec
+
+
+def _maybe_prune() -> None:
+    global _last_prune
+    now = time.monotonic()
+    with _mem_lock:
+        if now - _last_prune < _PRUNE_INTERVAL:
+            return
+        _last_prune = now
+    try:
+        prune()
+    except OSError:
+        pass
+
+
+def prune(max_days: float = PROBE_CACHE_MAX_DAYS, max_bytes: int = int(PROBE_CACHE_MAX_MB * 1024 * 1024)) -> tuple[int, int]:
+    """
+    Platten-Cache räumen: Einträge, die länger als max_days nicht benutzt wurden, dann die am längsten
+    nicht benutzten, bis höchstens max_bytes belegt sind. Rückgabe: (Anzahl, freigegebene Bytes).
+    """
+    if not os.path.isdir(PROBE_CACHE_DIR):
+        return 0, 0
+    entries = []
+    for shard in os.listdir(PROBE_CACHE_DIR):
+        shard_dir = os.path.join(PROBE_CACHE_DIR, shard)
+        if not os.path.isdir(shard_dir):
+            continue
+        for name in os.listdir(shard_dir):
+            path = os.path.join(shard_dir, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+    cutoff = time.time() - max_days * 86400
+    total = sum(size for _t, size, _p in entries)
+    removed = freed = 0
+    for mtime, size, path in sorted(entries):
+        if mtime >= cutoff and total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+        removed += 1
+        freed += size
+    return removed, freed
+
+
+def probe(path: str, sha: str | None = None, text_stats: bool = False) -> dict:
+    """
+    Metadaten einer Eingabedatei (ein Lesedurchgang, gecacht nach Datei-Hash):
+    sha256, size, ext, kind (pdf/office/other), pages, encrypted, text_ratio, images,
+    page_sizes ([[w, h, seiten], ...]), slides, sheets, text_layer_ok und für PDFs page_info
+    (je Seite Größe, Textlayer, Bilder, Content-Größe, Seiten-Hash).
+    text_stats: page_info zusätzlich mit Textlayer-Zeichen, Bildabdeckung und OCR-Bedarf.
+    Lesefehler landen in rec["error"], nicht als Exception.
+    """
+    sha = sha or file_sha256(path)
+    rec = _recall(sha)
+    if rec is not None and (not text_stats or rec.get("text_stats") or rec.get("kind") != "pdf"):
+        return rec
+    ext = os.path.splitext(path)[1].lower()
+    rec = {
+        "version": PROBE_FORMAT, "sha256": sha, "size": os.path.getsize(path), "ext": ext,
+        "kind": "pdf" if ext == ".pdf" else ("office" if ext in (".docx", ".pptx", ".xlsx") else "other"),
+        "pages": None, "encrypted": False, "text_ratio": None, "images": None, "page_sizes": [],
+        "slides": None, "sheets": None, "text_layer_ok": False, "text_stats": False, "error": "",
+    }
+    try:
+        if rec["kind"] == "pdf":
+            _probe_pdf(path, rec, text_stats)
+        elif rec["kind"] == "office":
+            _probe_office(path, rec)
+    except Exception as e:
+        rec["error"] = str(e)[:200]
+    _remember(rec)
+    return rec
+
+
+def summarize(rec: dict) -> str:
+    """Kurzform für Job-Log/Anzeige, z. B. "pdf 120 S. text=0.98 img=34 595x842"."""
+    parts = [rec.get("ext", "").lstrip(".") or rec.get("kind", "")]
+    if rec.get("slides"):
+        parts.append(f"{rec['slides']} Folien")
+    elif rec.get("pages") is not None:
+        parts.append(f"{rec['pages']} S.")
+    if rec.get("sheets"):
+        parts.append(f"{rec['sheets']} Blätter")
+    if rec.get("text_ratio") is not None:
+        parts.append(f"text={rec['text_ratio']:.2f}")
+    if rec.get("images"):
+        parts.append(f"img={rec['images']}")
+    if rec.get("page_sizes"):
+        w, h, _c = rec["page_sizes"][0]
+        parts.append(f"{w}x{h}" + ("+" if len(rec["page_sizes"]) > 1 else ""))
+    if rec.get("encrypted"):
+        parts.append("verschlüsselt")
+    if rec.get("error"):
+        parts.append("fehler")
+    return " ".join(parts)
+
+
+def chunk_hashes(rec: dict, ranges: list[tuple[int, int]]) -> list[str]:
+    """SHA-256 je Seitenbereich aus den Seiten-Hashes des Probe-Datensatzes (für das Chunk-Manifest)."""
+    pages = rec.get("page_info") or []
+    out = []
+    for (start, end) in ranges:
+        h = hashlib.sha256()
+        for p in pages[start - 1:end]:
+            h.update(p.get("sha256", "").encode("ascii"))
+        out.append(h.hexdigest())
+    return out
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Dokument-Analyse (Probe-Cache)")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    pp = sub.add_parser("prune", help="Platten-Cache nach Alter und Größe räumen")
+    pp.add_argument("--max-days", type=float, default=PROBE_CACHE_MAX_DAYS)
+    pp.add_argument("--max-mb", type=float, default=PROBE_CACHE_MAX_MB)
+    a = ap.parse_args()
+    if a.cmd == "prune":
+        n, b = prune(a.max_days, int(a.max_mb * 1024 * 1024))
+        print(f"{n} Einträge entfernt, {b / 1e6:.1f} MB freigegeben")
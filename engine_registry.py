@@ -0,0 +1,102 @@
+# Prozessweite Registry für Engine-Instanzen (Docling, MarkItDown).
+# Jede Instanz wird einmal gebaut (inkl. Pipeline-/Modell-Initialisierung) und danach
+# wiederverwendet. Parallele Aufrufe bekommen eigene Instanzen aus einem kleinen Pool.
+#
+#   with engine_registry.lease("docling", "easyocr") as conv:
+#       conv.convert(path)
+import os, threading
+from contextlib import contextmanager
+
+import spans
+
+# Maximal vorgehaltene (freie) Instanzen je Engine/Variante
+POOL_MAX_IDLE = int(os.environ.get("ENGINE_POOL_MAX_IDLE", "2"))
+
+_lock = threading.Lock()
+_idle: dict[tuple[str, str], list] = {}
+_generation: dict[tuple[str, str], int] = {}
+_built: dict[tuple[str, str], int] = {}
+
+
+def _build_markitdown(_variant: str):
+    from markitdown import MarkItDown
+    return MarkItDown()
+
+
+def _build_docling(ocr_engine: str):
+    """DocumentConverter mit dem gewählten OCR-Backend (auto = Docling-Defaults)."""
+    from docling.datamodel.base_models import InputFormat
+    from docling.document_converter import DocumentConverter
+    if ocr_engine in ("", "auto"):
+        conv = DocumentConverter()
+    else:
+        from docling.datamodel.pipeline_options import (
+            PdfPipelineOptions, EasyOcrOptions, TesseractCliOcrOptions, RapidOcrOptions,
+        )
+        from docling.document_converter import PdfFormatOption, ImageFormatOption
+        ocr_cls = {"easyocr": EasyOcrOptions, "tesseract": TesseractCliOcrOptions, "rapidocr": RapidOcrOptions}[ocr_engine]
+        opts = PdfPipelineOptions(do_ocr=True, ocr_options=ocr_cls())
+        conv = DocumentConverter(format_options={
+            InputFormat.PDF: PdfFormatOption(pipeline_options=opts),
+            InputFormat.IMAGE: ImageFormatOption(pipeline_options=opts),
+        })
+    # Modelle jetzt laden statt beim ersten Dokument
+    try:
+        conv.initialize_pipeline(InputFormat.PDF)
+    except Exception:
+        pass
+    return conv
+
+
+BUILDERS = {
+    "markitdown": _build_markitdown,
+    "docling": _build_docling,
+}
+
+
+@contextmanager
+def lease(kind: str, variant: str = "default"):
+    """Leiht eine (ggf. neu gebaute) Instanz exklusiv aus und gibt sie danach an den Pool zurück."""
+    key = (kind, variant)
+    with _lock:
+        gen = _generation.get(key, 0)
+        pool = _idle.get(key)
+        inst = pool.pop() if pool else None
+    if inst is None:
+        with spans.span(f"{kind}_model_load", variant=variant):
+            inst = BUILDERS[kind](variant)
+        with _lock:
+            _built[key] = _built.get(key, 0) + 1
+    try:
+        yield inst
+    finally:
+        with _lock:
+            # Nach evict() ausgeliehene Instanzen nicht zurücklegen
+            if _generation.get(key, 0) == gen:
+                pool = _idle.setdefault(key, [])
+                if len(pool) < POOL_MAX_IDLE:
+                    pool.append(inst)
+
+
+def evict(kind: str | None = None, keep_variant: str | None = None) -> int:
+    """
+    Verwirft vorgehaltene Instanzen (alle oder nur einer Engine), z. B. nach Einstellungsänderungen.
+    keep_variant: diese Variante behalten (z. B. das aktuell gewählte OCR-Backend).
+    Gibt die Anzahl verworfener Instanzen zurück.
+    """
+    dropped = 0
+    with _lock:
+        for key in set(_idle) | set(_built):
+            k, variant = key
+            if (kind is None or k == kind) and variant != keep_variant:
+                dropped += len(_idle.pop(key, []))
+                _generation[key] = _generation.get(key, 0) + 1
+    return dropped
+
+
+def stats() -> dict[str, dict[str, int]]:
+    with _lock:
+        return {
+            f"{k}:{v}": {"idle": len(_idle.get((k, v), [])), "built": n}
+            for (k, v), n in _built.items()
+        }
@@ -0,0 +1,183 @@
+# Ereignisgesteuerter Inbox-Watcher für data/in (inotify über watchdog, ohne Polling-Schleife).
+# Dateien gelten erst als fertig, wenn seit dem letzten Ereignis DEBOUNCE vergangen ist und
+# Größe + mtime mindestens SETTLE Sekunden unverändert sind (halb kopierte Dateien werden nicht eingereiht).
+#
+#   w = InboxWatcher("/app/data/in", on_ready=lambda paths: ...)
+#   w.start(); ...; w.stop()
+import os, time, threading
+
+WATCH_DEBOUNCE = float(os.environ.get("WATCH_DEBOUNCE", "1.0"))
+WATCH_SETTLE = float(os.environ.get("WATCH_SETTLE", "2.0"))
+# Docker Desktop (macOS/Windows) reicht inotify-Ereignisse aus Bind-Mounts nicht immer durch
+WATCH_POLLING = os.environ.get("WATCH_POLLING", "0") == "1"
+_TICK = 0.25
+
+# Temporäre Namen von Kopier-/Download-Tools
+_IGNORE_SUFFIXES = (".part", ".partial", ".tmp", ".crdownload", ".download", ".swp", "~")
+
+
+def ignored(path: str) -> bool:
+    name = os.path.basename(path)
+    return not name or name.startswith(".") or name.lower().endswith(_IGNORE_SUFFIXES)
+
+
+def _signature(path: str) -> tuple[int, int] | None:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    if not os.path.isfile(path):
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+class InboxWatcher:
+    """
+    Beobachtet ein Verzeichnis (nicht rekursiv) und ruft on_ready(paths) mit stabil gewordenen Dateien auf.
+    Bereits gemeldete Dateien werden erst nach einer inhaltlichen Änderung (Größe/mtime) erneut gemeldet.
+    Ohne watchdog bzw. mit WATCH_POLLING=1 wird das Verzeichnis periodisch gescannt.
+    """
+
+    def __init__(self, directory: str, on_ready, debounce: float = WATCH_DEBOUNCE, settle: float = WATCH_SETTLE):
+        self.directory = os.path.abspath(directory)
+        self.on_ready = on_ready
+        self.debounce = debounce
+        self.settle = settle
+        self.mode = ""
+        self._lock = threading.Lock()
+        # path → [letztes Ereignis, Signatur, stabil seit]
+        self._pending: dict[str, list] = {}
+        self._reported: dict[str, tuple[int, int]] = {}
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._observer = None
+
+    # -------- Ereignisse --------
+
+    def touch(self, path: str) -> None:
+        if ignored(path) or os.path.dirname(os.path.abspath(path)) != self.directory:
+            return
+        now = time.monotonic()
+        with self._lock:
+            entry = self._pending.get(path)
+            if entry is None:
+                self._pending[path] = [now, None, now]
+            else:
+                entry[0] = now
+
+    def forget(self, path: str) -> None:
+        with self._lock:
+            self._pending.pop(path, None)
+            self._reported.pop(path, None)
+
+    def scan(self) -> None:
+        """Alle vorhandenen Dateien vormerken (Start, Polling-Modus, verpasste Ereignisse)."""
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return
+        for name in names:
+            path = os.path.join(self.directory, name)
+            if path not in self._pending and self._reported.get(path) != _signature(path):
+                self.touch(path)
+
+    # -------- Stabilitätsprüfung --------
+
+    def _ready(self) -> list[str]:
+        now = time.monotonic()
+        ready: list[str] = []
+        with self._lock:
+            items = list(self._pending.items())
+        for path, entry in items:
+            sig = _signature(path)
+            with self._lock:
+                if self._pending.get(path) is not entry:
+                    continue
+                if sig is None:
+                    # gelöscht oder Verzeichnis
+                    del self._pending[path]
+                    continue
+                if sig != entry[1]:
+                    entry[1], entry[2] = sig, now
+                    continue
+                if now - entry[0] < self.debounce or now - entry[2] < self.settle or sig[0] == 0:
+                    continue
+                del self._pending[path]
+                if self._reported.get(path) == sig:
+                    continue
+                self._reported[path] = sig
+            ready.append(path)
+        return sorted(ready)
+
+    def _run(self) -> None:
+        next_scan = 0.0
+        while not self._stop.wait(_TICK):
+            if self._observer is None and time.monotonic() >= next_scan:
+                self.scan()
+                next_scan = time.monotonic() + max(1.0, self.settle / 2)
+            ready = self._ready()
+            if ready:
+                try:
+                    self.on_ready(ready)
+                except Exception as e:
+                    # Nicht eingereiht → beim nächsten Ereignis/Scan erneut versuchen
+                    with self._lock:
+                        for p in ready:
+                            self._reported.pop(p, None)
+                    print(f"[watcher] Einreihen fehlgeschlagen: {e}", flush=True)
+
+    # -------- Lebenszyklus --------
+
+    def _start_observer(self) -> None:
+        if WATCH_POLLING:
+            self.mode = "scan"
+            return
+        try:
+            from watchdog.observers import Observer
+            from watchdog.events import FileSystemEventHandler
+        except ImportError:
+            self.mode = "scan"
+            return
+        watcher = self
+
+        class _Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                if event.is_directory:
+                    return
+                if event.event_type == "deleted":
+                    watcher.forget(event.src_path)
+                elif event.event_type == "moved":
+                    watcher.forget(event.src_path)
+                    watcher.touch(event.dest_path)
+                elif event.event_type in ("created", "modified", "closed"):
+                    watcher.touch(event.src_path)
+
+        obs = Observer()
+        obs.schedule(_Handler(), self.directory, recursive=False)
+        obs.daemon = True
+        obs.start()
+        self._observer = obs
+        self.mode = "inotify"
+
+    def start(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        self._stop.clear()
+        self._start_observer()
+        # Bestand beim Start einmal erfassen (Ereignisse gibt es nur für neue Dateien)
+        self.scan()
+        self._thread = threading.Thread(target=self._run, name="inbox-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join(timeout=5)
+            self._observer = None
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._pending)
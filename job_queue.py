@@ -0,0 +1,526 @@
+# Persistente Job-Queue (SQLite) mit separatem Worker-Prozess.
+#
+#   python job_queue.py work [--concurrency N]
+#
+# Die UI reiht Jobs ein (enqueue), fragt Status und Logs ab und kann Jobs abbrechen.
+# Ist Auto-Watch aktiv, läuft im Worker zusätzlich der Inbox-Watcher (inbox_watcher.py).
+# Der Worker wird bei Bedarf gestartet (ensure_worker) und läuft unabhängig von
+# Browser-Tabs weiter; nach einem Absturz/Neustart werden laufende Jobs erneut eingereiht.
+import os, sys, json, time, sqlite3, subprocess, threading, argparse, traceback
+from contextlib import contextmanager
+
+import log_stream
+
+DB_PATH = os.environ.get("JOB_QUEUE_DB", "/app/data/state/jobs.db")
+LOG_DIR = os.environ.get("JOB_LOG_DIR", "/app/data/state/job_logs")
+# Parallele Jobs im Worker (Default; in der UI änderbar, wird in der DB gespeichert)
+DEFAULT_CONCURRENCY = int(os.environ.get("JOB_WORKERS", "1"))
+POLL_INTERVAL = float(os.environ.get("JOB_POLL_INTERVAL", "1.0"))
+# Versuche je Job: stirbt der Worker so oft während desselben Jobs (OOM, Absturz in Marker/Docling),
+# wird er beim nächsten Start als Fehler markiert statt erneut eingereiht
+MAX_ATTEMPTS = int(os.environ.get("QUEUE_MAX_ATTEMPTS", "3"))
+
+ACTIVE = ("queued", "running")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    source TEXT NOT NULL,
+    options TEXT NOT NULL,
+    origin TEXT NOT NULL DEFAULT '',
+    status TEXT NOT NULL DEFAULT 'queued',
+    created REAL NOT NULL,
+    started REAL,
+    finished REAL,
+    worker_pid INTEGER,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    engine TEXT NOT NULL DEFAULT '',
+    output_path TEXT NOT NULL DEFAULT '',
+    duration_ms INTEGER,
+    cache TEXT NOT NULL DEFAULT '',
+    error TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs(status, id);
+CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+_init_lock = threading.Lock()
+_initialized = False
+
+
+def _state_dir() -> str:
+    return os.path.dirname(os.path.abspath(DB_PATH))
+
+def _pid_path() -> str:
+    return os.path.join(_state_dir(), "job_worker.pid")
+
+def _lock_path() -> str:
+    return os.path.join(_state_dir(), "job_worker.lock")
+
+def _worker_log_path() -> str:
+    return os.path.join(_state_dir(), "job_worker.log")
+
+def log_path(job_id: int) -> str:
+    return os.path.join(LOG_DIR, f"{int(job_id)}.log")
+
+
+@contextmanager
+def _db():
+    global _initialized
+    os.makedirs(_state_dir(), exist_ok=True)
+    conn = sqlite3.connect(DB_PATH, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    try:
+        if not _initialized:
+            with _init_lock:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(_SCHEMA)
+                _initialized = True
+        yield conn
+    finally:
+        conn.close()
+
+
+# -------- UI-Seite --------
+
+def enqueue(source: str, options: dict, origin: str = "ui") -> int:
+    """Reiht einen Konvertierungsjob ein und gibt die Job-ID zurück."""
+    with _db() as db:
+        cur = db.execute(
+            "INSERT INTO jobs (source, options, origin, created) VALUES (?, ?, ?, ?)",
+            (os.path.abspath(source), json.dumps(options, ensure_ascii=False), origin, time.time()),
+        )
+        return int(cur.lastrowid)
+
+
+def enqueue_many(sources: list[str], options: dict, origin: str = "ui") -> list[int]:
+    """Mehrere Jobs in einer Transaktion einreihen (z. B. Watcher-Burst)."""
+    opts = json.dumps(options, ensure_ascii=False)
+    now = time.time()
+    ids = []
+    with _db() as db:
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            for src in sources:
+                cur = db.execute(
+                    "INSERT INTO jobs (source, options, origin, created) VALUES (?, ?, ?, ?)",
+                    (os.path.abspath(src), opts, origin, now),
+                )
+                ids.append(int(cur.lastrowid))
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+    return ids
+
+
+def active_sources() -> set[str]:
+    """Quellpfade mit wartendem oder laufendem Job."""
+    with _db() as db:
+        return {r["source"] for r in db.execute("SELECT DISTINCT source FROM jobs WHERE status IN ('queued', 'running')")}
+
+
+def job_statuses(job_ids: list[int]) -> dict[int, str]:
+    if not job_ids:
+        return {}
+    marks = ",".join("?" * len(job_ids))
+    with _db() as db:
+        return {r["id"]: r["status"] for r in db.execute(f"SELECT id, status FROM jobs WHERE id IN ({marks})", list(job_ids))}
+
+
+def request_cancel(job_id: int) -> str:
+    """Wartende Jobs werden sofort abgebrochen, laufende beim nächsten Poll des Workers. Gibt den neuen Status zurück."""
+    with _db() as db:
+        db.execute("UPDATE jobs SET status='cancelled', finished=? WHERE id=? AND status='queued'", (time.time(), job_id))
+        db.execute("UPDATE jobs SET cancel_requested=1 WHERE id=? AND status='running'", (job_id,))
+        row = db.execute("SELECT status FROM jobs WHERE id=?", (job_id,)).fetchone()
+    return row["status"] if row else ""
+
+
+def get_job(job_id: int) -> dict | None:
+    with _db() as db:
+        row = db.execute("SELECT * FROM jobs WHERE id=?", (job_id,)).fetchone()
+    return dict(row) if row else None
+
+
+def list_jobs(limit: int = 50, statuses: tuple[str, ...] | None = None) -> list[dict]:
+    """Neueste Jobs zuerst."""
+    with _db() as db:
+        if statuses:
+            marks = ",".join("?" * len(statuses))
+            rows = db.execute(f"SELECT * FROM jobs WHERE status IN ({marks}) ORDER BY id DESC LIMIT ?", (*statuses, limit)).fetchall()
+        else:
+            rows = db.execute("SELECT * FROM jobs ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+    return [dict(r) for r in rows]
+
+
+def counts() -> dict[str, int]:
+    with _db() as db:
+        return {r["status"]: r["n"] for r in db.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status")}
+
+
+def read_log(job_id: int, max_bytes: int = 64 * 1024) -> str:
+    """Ende des Job-Logs (höchstens max_bytes, an Zeilengrenze abgeschnitten)."""
+    try:
+        with open(log_path(job_id), "rb") as fh:
+            fh.seek(0, os.SEEK_END)
+            size = fh.tell()
+            fh.seek(max(0, size - max_bytes))
+            data = fh.read()
+    except OSError:
+        return ""
+    text = data.decode("utf-8", errors="replace")
+    if size > max_bytes:
+        text = text.split("\n", 1)[-1]
+    return text
+
+
+def get_setting(key: str, default: str = "") -> str:
+    with _db() as db:
+        row = db.execute("SELECT value FROM settings WHERE key=?", (key,)).fetchone()
+    return row["value"] if row else default
+
+
+def set_setting(key: str, value: str) -> None:
+    with _db() as db:
+        db.execute("INSERT INTO settings (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value=excluded.value", (key, str(value)))
+
+
+def get_concurrency() -> int:
+    try:
+        return max(1, int(get_setting("concurrency", str(DEFAULT_CONCURRENCY))))
+    except ValueError:
+        return max(1, DEFAULT_CONCURRENCY)
+
+
+def set_concurrency(n: int) -> None:
+    set_setting("concurrency", str(max(1, int(n))))
+
+
+def get_watch() -> dict:
+    """Watcher-Einstellungen: enabled, settle (Sek.), options (Job-Optionen für eingereihte Dateien), status (vom Worker)."""
+    try:
+        options = json.loads(get_setting("watch_options", "{}"))
+    except ValueError:
+        options = {}
+    try:
+        settle = float(get_setting("watch_settle", "0") or 0)
+    except ValueError:
+        settle = 0.0
+    return {
+        "enabled": get_setting("watch_enabled") == "1",
+        "settle": settle,
+        "options": options,
+        "status": get_setting("watch_status"),
+    }
+
+
+def set_watch(enabled: bool | None = None, settle: float | None = None, options: dict | None = None) -> None:
+    if enabled is not None:
+        set_setting("watch_enabled", "1" if enabled else "0")
+    if settle is not None:
+        set_setting("watch_settle", str(float(settle)))
+    if options is not None:
+        set_setting("watch_options", json.dumps(options, ensure_ascii=False))
+
+
+def request_engine_reload() -> None:
+    """Worker verwirft vorgehaltene Engine-Instanzen vor dem nächsten Job."""
+    set_setting("engine_epoch", str(time.time()))
+
+
+def worker_alive() -> bool:
+    """
+    True, solange ein Worker den Lock job_worker.lock hält. Die PID-Datei liegt im persistenten
+    State-Volume und kann nach SIGKILL/Container-Neustart auf eine wiederverwendete PID zeigen.
+    """
+    import fcntl
+    try:
+        os.makedirs(_state_dir(), exist_ok=True)
+        with open(_lock_path(), "a") as fh:
+            try:
+                fcntl.flock(fh, fcntl.LOCK_SH | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return True
+            fcntl.flock(fh, fcntl.LOCK_UN)
+            return False
+    except OSError:
+        return False
+
+
+def worker_pid() -> int | None:
+    """PID des laufenden Workers (nur zur Anzeige; Lebendigkeit über worker_alive())."""
+    if not worker_alive():
+        return None
+    try:
+        with open(_pid_path()) as fh:
+            return int(fh.read().strip())
+    except (OSError, ValueError):
+        return None
+
+
+def ensure_worker() -> bool:
+    """Startet den Worker-Prozess, falls keiner läuft. True, wenn ein neuer Prozess gestartet wurde."""
+    if worker_alive():
+        return False
+    os.makedirs(_state_dir(), exist_ok=True)
+    with open(_worker_log_path(), "ab") as log_fh:
+        subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "work"],
+            stdout=log_fh, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL,
+            start_new_session=True,
+        )
+    return True
+
+
+# -------- Worker-Seite --------
+
+def _claim(pid: int) -> dict | None:
+    with _db() as db:
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            row = db.execute("SELECT * FROM jobs WHERE status='queued' ORDER BY id LIMIT 1").fetchone()
+            if row is not None:
+                db.execute(
+                    "UPDATE jobs SET status='running', started=?, worker_pid=?, attempts=attempts+1 WHERE id=?",
+                    (time.time(), pid, row["id"]),
+                )
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+    return dict(row) if row is not None else None
+
+
+def _finish(job_id: int, status: str, **fields) -> None:
+    cols = {"status": status, "finished": time.time(), **fields}
+    assign = ", ".join(f"{k}=?" for k in cols)
+    with _db() as db:
+        db.execute(f"UPDATE jobs SET {assign} WHERE id=?", (*cols.values(), job_id))
+
+
+def _requeue(job_id: int) -> None:
+    # Geordnetes Beenden zählt nicht als Versuch
+    with _db() as db:
+        db.execute("UPDATE jobs SET status='queued', started=NULL, worker_pid=NULL, attempts=MAX(0, attempts-1) WHERE id=?", (job_id,))
+
+
+def _recover_running() -> tuple[int, list[dict]]:
+    """
+    Nur ein Worker hält den Lock → alle "running"-Jobs stammen von einem beendeten Worker.
+    Rückgabe: (Anzahl erneut eingereihter Jobs, Jobs, die MAX_ATTEMPTS erreicht haben und als Fehler markiert wurden).
+    """
+    now = time.time()
+    with _db() as db:
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            db.execute("UPDATE jobs SET status='cancelled', finished=? WHERE status='running' AND cancel_requested=1", (now,))
+            failed = [dict(r) for r in db.execute("SELECT * FROM jobs WHERE status='running' AND attempts>=?", (MAX_ATTEMPTS,))]
+            for job in failed:
+                job["error"] = (f"Worker ist während dieses Jobs {job['attempts']}× beendet worden (Absturz/Speicher?) – "
+                                f"wird nicht erneut gestartet (QUEUE_MAX_ATTEMPTS={MAX_ATTEMPTS})")
+                db.execute("UPDATE jobs SET status='error', finished=?, worker_pid=NULL, error=? WHERE id=?", (now, job["error"], job["id"]))
+            cur = db.execute("UPDATE jobs SET status='queued', started=NULL, worker_pid=NULL WHERE status='running'")
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+    return cur.rowcount, failed
+
+
+def _cancel_requested(job_ids: list[int]) -> set[int]:
+    if not job_ids:
+        return set()
+    marks = ",".join("?" * len(job_ids))
+    with _db() as db:
+        rows = db.execute(f"SELECT id FROM jobs WHERE cancel_requested=1 AND id IN ({marks})", job_ids).fetchall()
+    return {r["id"] for r in rows}
+
+
+class _Worker:
+    def __init__(self, concurrency: int | None):
+        import pipeline, engine_registry
+        self.pipeline = pipeline
+        self.registry = engine_registry
+        self.fixed_concurrency = concurrency
+        self.pid = os.getpid()
+        self.stop = threading.Event()
+        self.wake = threading.Event()
+        self.active: dict[int, tuple[threading.Thread, threading.Event]] = {}
+        self.engine_epoch = get_setting("engine_epoch")
+        self.ocr_engine = None
+        self._ocr_lock = threading.Lock()
+        self.watcher = None
+        self.watch_settle = None
+        self.next_retry_check = 0.0
+
+    def _enqueue_watched(self, paths: list[str]) -> None:
+        import watch_manifest
+        # Dateien, die schon in der Queue stehen (z. B. Upload im Konvertieren-Tab), nicht doppelt einreihen
+        busy = active_sources()
+        # Manifest: fertige Dateien überspringen, Fehler nur nach Ablauf des Backoffs
+        pairs = watch_manifest.claim([p for p in paths if os.path.abspath(p) not in busy], job_statuses)
+        if not pairs:
+            return
+        try:
+            ids = enqueue_many([p for p, _sha in pairs], get_watch()["options"], origin="watch")
+        except Exception:
+            watch_manifest.release(pairs)
+            raise
+        watch_manifest.attach_jobs(pairs, ids)
+        print(f"[watcher] {len(ids)} Datei(en) eingereiht", flush=True)
+        self.wake.set()
+
+    def _retry_due(self) -> None:
+        import watch_manifest
+        if time.monotonic() < self.next_retry_check:
+            return
+        self.next_retry_check = time.monotonic() + 10
+        paths = watch_manifest.due()
+        if paths:
+            self._enqueue_watched(paths)
+
+    def _record_watch_result(self, job: dict, status: str, error: str = "") -> None:
+        # Ergebnis ins Watcher-Manifest (auch für Uploads nach data/in, damit sie nach einem Neustart nicht erneut laufen)
+        src = os.path.abspath(job["source"])
+        if job["origin"] != "watch" and os.path.dirname(src) != os.path.abspath(self.pipeline.IN_DIR):
+            return
+        try:
+            import watch_manifest
+            watch_manifest.job_finished(job["id"], src, status, error)
+        except Exception as e:
+            print(f"[watcher] Manifest-Update für Job #{job['id']} fehlgeschlagen: {e}", flush=True)
+
+    def _sync_watcher(self) -> None:
+        import inbox_watcher
+        cfg = get_watch()
+        settle = cfg["settle"] or inbox_watcher.WATCH_SETTLE
+        if self.watcher is not None and (not cfg["enabled"] or settle != self.watch_settle):
+            self.watcher.stop()
+            self.watcher = None
+            set_setting("watch_status", "")
+        if cfg["enabled"] and self.watcher is None:
+            import watch_manifest
+            watch_manifest.prune()
+            self.watcher = inbox_watcher.InboxWatcher(self.pipeline.IN_DIR, self._enqueue_watched, settle=settle)
+            self.watcher.start()
+            self.watch_settle = settle
+            set_setting("watch_status", f"{self.watcher.mode} seit {time.strftime('%H:%M:%S')}")
+
+    def _prepare_engines(self, ocr_engine: str) -> None:
+        # Wie in der UI: OCR-Backend gewechselt → Docling-Instanzen der anderen Backends freigeben
+        with self._ocr_lock:
+            if self.ocr_engine not in (None, ocr_engine):
+                self.registry.evict("docling", keep_variant=ocr_engine)
+            self.ocr_engine = ocr_engine
+
+    def run_job(self, job: dict, cancel_event: threading.Event) -> None:
+        log = log_stream.LogStream(log_path(job["id"]))
+        log.write(f"[queue] Job #{job['id']} gestartet (Versuch {job['attempts'] + 1}): {job['source']}")
+        try:
+            opts = self.pipeline.job_options(json.loads(job["options"]))
+            self._prepare_engines(opts["ocr_engine"])
+            res = self.pipeline.convert_file(
+                job["source"], opts,
+                live_cb=log.write,
+                note_cb=lambda msg: log.write(f"[hinweis] {msg}"),
+                cancel_event=cancel_event,
+            )
+            if res["logs"]:
+                log.write(res["logs"])
+            log.write(f"[queue] fertig: {res['output_path']} ({res['duration_ms']} ms)")
+            _finish(job["id"], "done", engine=res["engine"], output_path=res["output_path"],
+                    duration_ms=res["duration_ms"], cache=res["cache"], error="")
+            self._record_watch_result(job, "done")
+        except self.pipeline.JobCancelled:
+            if self.stop.is_set():
+                log.write("[queue] Worker wird beendet – Job wird erneut eingereiht")
+                _requeue(job["id"])
+            else:
+                log.write("[queue] abgebrochen")
+                _finish(job["id"], "cancelled")
+                self._record_watch_result(job, "cancelled")
+        except Exception as e:
+            log.write(traceback.format_exc())
+            _finish(job["id"], "error", error=str(e)[-4000:])
+            self._record_watch_result(job, "error", str(e))
+        finally:
+            log.close()
+
+    def loop(self) -> None:
+        while not self.stop.is_set():
+            self._sync_watcher()
+            if self.watcher is not None:
+                self._retry_due()
+            epoch = get_setting("engine_epoch")
+            if epoch != self.engine_epoch and not self.active:
+                self.registry.evict()
+                self.engine_epoch = epoch
+            for job_id in _cancel_requested(list(self.active)):
+                self.active[job_id][1].set()
+            for job_id in [j for j, (t, _e) in self.active.items() if not t.is_alive()]:
+                del self.active[job_id]
+            limit = self.fixed_concurrency or get_concurrency()
+            while len(self.active) < limit:
+                job = _claim(self.pid)
+                if job is None:
+                    break
+                ev = threading.Event()
+                t = threading.Thread(target=self.run_job, args=(job, ev), name=f"job-{job['id']}", daemon=True)
+                self.active[job["id"]] = (t, ev)
+                t.start()
+            self.wake.wait(POLL_INTERVAL)
+            self.wake.clear()
+        if self.watcher is not None:
+            self.watcher.stop()
+            set_setting("watch_status", "")
+        # Beenden: laufende Jobs abbrechen (werden in run_job erneut eingereiht)
+        for t, ev in self.active.values():
+            ev.set()
+        for t, _ev in self.active.values():
+            t.join(timeout=30)
+
+
+def work(concurrency: int | None = None) -> None:
+    import fcntl, signal
+    os.makedirs(_state_dir(), exist_ok=True)
+    lock_fh = open(_lock_path(), "a")
+    try:
+        fcntl.flock(lock_fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        print("[job-worker] läuft bereits", flush=True)
+        return
+    with open(_pid_path(), "w") as fh:
+        fh.write(str(os.getpid()))
+    recovered, failed = _recover_running()
+    worker = _Worker(concurrency)
+    for job in failed:
+        log = log_stream.LogStream(log_path(job["id"]))
+        log.write(f"[queue] {job['error']}")
+        log.close()
+        worker._record_watch_result(job, "error", job["error"])
+    def _shutdown(*_):
+        worker.stop.set()
+        worker.wake.set()
+    signal.signal(signal.SIGTERM, _shutdown)
+    signal.signal(signal.SIGINT, _shutdown)
+    print(f"[job-worker] gestartet (pid {os.getpid()}, {recovered} Jobs wieder eingereiht, {len(failed)} nach {MAX_ATTEMPTS} Versuchen aufgegeben)", flush=True)
+    try:
+        worker.loop()
+    finally:
+        try:
+            os.remove(_pid_path())
+        except OSError:
+            pass
+        lock_fh.close()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Worker für die Konvertierungs-Queue")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    wp = sub.add_parser("work")
+    wp.add_argument("--concurrency", type=int, default=None, help="feste Anzahl paralleler Jobs (sonst Einstellung aus der UI)")
+    a = ap.parse_args()
+    if a.cmd == "work":
+        work(a.concurrency)
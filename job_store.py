@@ -0,0 +1,379 @@
+# Job-Log als SQLite-Store (WAL) statt append-only joblog.csv.
+# Indizierte Abfragen mit Filter + Seitenweise Anzeige, CSV-Export zeilenweise aus dem Cursor.
+# Eine vorhandene /app/data/joblog.csv wird beim ersten Zugriff einmalig übernommen
+# (danach als joblog.csv.migrated umbenannt).
+import os, csv, io, json, time, sqlite3, threading
+from contextlib import contextmanager
+
+DB_PATH = os.environ.get("JOB_STORE_DB", "/app/data/state/joblog.db")
+LEGACY_CSV = os.environ.get("JOBLOG_CSV", "/app/data/joblog.csv")
+
+KEYS = ["timestamp", "source", "engine", "ocr", "duration_ms", "output_path", "status", "error", "cache", "chunk_layout", "pages", "probe"]
+_INT_KEYS = ("duration_ms", "pages")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS joblog (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL DEFAULT '',
+    source TEXT NOT NULL DEFAULT '',
+    engine TEXT NOT NULL DEFAULT '',
+    ocr TEXT NOT NULL DEFAULT '',
+    duration_ms INTEGER,
+    output_path TEXT NOT NULL DEFAULT '',
+    status TEXT NOT NULL DEFAULT '',
+    error TEXT NOT NULL DEFAULT '',
+    cache TEXT NOT NULL DEFAULT '',
+    chunk_layout TEXT NOT NULL DEFAULT '',
+    pages INTEGER,
+    probe TEXT NOT NULL DEFAULT '',
+    spans TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS joblog_ts ON joblog(timestamp);
+CREATE INDEX IF NOT EXISTS joblog_status ON joblog(status, timestamp);
+CREATE INDEX IF NOT EXISTS joblog_engine ON joblog(engine, timestamp);
+CREATE INDEX IF NOT EXISTS joblog_duration ON joblog(duration_ms);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS stage_hist (
+    stage TEXT NOT NULL,
+    le TEXT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (stage, le)
+);
+CREATE TABLE IF NOT EXISTS stage_totals (
+    stage TEXT PRIMARY KEY,
+    count INTEGER NOT NULL DEFAULT 0,
+    sum_ms REAL NOT NULL DEFAULT 0
+);
+"""
+
+# Obergrenzen (Sekunden) der Stufen-Histogramme. Nachträglich nur erweitern, nicht verschieben:
+# die Zähler sind kumuliert seit Beginn der Aufzeichnung.
+STAGE_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+
+_init_lock = threading.Lock()
+_initialized = False
+
+
+def _int_or_none(v):
+    if v is None or v == "":
+        return None
+    try:
+        return int(float(v))
+    except (TypeError, ValueError):
+        return None
+
+
+def _values(row: dict) -> tuple:
+    return tuple(_int_or_none(row.get(k)) if k in _INT_KEYS else str(row.get(k) or "") for k in KEYS)
+
+
+_INSERT = f"INSERT INTO joblog ({', '.join(KEYS)}) VALUES ({', '.join('?' * len(KEYS))})"
+
+
+def _migrate_csv(conn) -> int:
+    # Einmalig: altes CSV-Log (auch mit älterer, kürzerer Kopfzeile) übernehmen
+    if not os.path.exists(LEGACY_CSV):
+        return 0
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if conn.execute("SELECT 1 FROM meta WHERE key='csv_migrated'").fetchone():
+            conn.execute("ROLLBACK")
+            return 0
+        with open(LEGACY_CSV, "r", encoding="utf-8", newline="") as fh:
+            cur = conn.executemany(_INSERT, (_values(r) for r in csv.DictReader(fh)))
+            n = cur.rowcount
+        conn.execute("INSERT INTO meta (key, value) VALUES ('csv_migrated', ?)", (str(time.time()),))
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    try:
+        os.replace(LEGACY_CSV, LEGACY_CSV + ".migrated")
+    except OSError:
+        pass
+    return n
+
+
+def _migrate_columns(conn) -> None:
+    # Datenbanken von vor den Spans: Spalte nachrüsten
+    cols = {r[1] for r in conn.execute("PRAGMA table_info(joblog)")}
+    if "spans" not in cols:
+        try:
+            conn.execute("ALTER TABLE joblog ADD COLUMN spans TEXT NOT NULL DEFAULT ''")
+        except sqlite3.OperationalError:
+            pass  # gleichzeitig von einem anderen Prozess ergänzt
+
+
+@contextmanager
+def _db():
+    global _initialized
+    os.makedirs(os.path.dirname(os.path.abspath(DB_PATH)), exist_ok=True)
+    conn = sqlite3.connect(DB_PATH, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    try:
+        if not _initialized:
+            with _init_lock:
+                if not _initialized:
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    conn.executescript(_SCHEMA)
+                    _migrate_columns(conn)
+                    _migrate_csv(conn)
+                    _initialized = True
+        yield conn
+    finally:
+        conn.close()
+
+
+def _bucket(seconds: float) -> str:
+    for le in STAGE_BUCKETS:
+        if seconds <= le:
+            return f"{le:g}"
+    return "+Inf"
+
+
+def log(row: dict) -> int:
+    """
+    Einen Job-Log-Eintrag schreiben (fehlende Felder leer). Sicher bei parallelen Schreibern (WAL + busy timeout).
+    row["spans"]: optionale Span-Liste (spans.Trace); wird mit dem Eintrag gespeichert und in die
+    Stufen-Histogramme übernommen (eine Transaktion).
+    """
+    spans = [s for s in row.get("spans") or () if s.get("ms") is not None]
+    with _db() as db:
+        if not spans:
+            return int(db.execute(_INSERT, _values(row)).lastrowid)
+        per_stage: dict[str, list] = {}
+        for s in spans:
+            per_stage.setdefault(s["name"], []).append(s["ms"])
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            row_id = int(db.execute(_INSERT, _values(row)).lastrowid)
+            db.execute("UPDATE joblog SET spans=? WHERE id=?", (json.dumps(spans, ensure_ascii=False, separators=(",", ":")), row_id))
+            for stage, values in per_stage.items():
+                db.execute("""INSERT INTO stage_totals (stage, count, sum_ms) VALUES (?, ?, ?)
+                              ON CONFLICT(stage) DO UPDATE SET count = count + excluded.count, sum_ms = sum_ms + excluded.sum_ms""",
+                           (stage, len(values), sum(values)))
+                buckets: dict[str, int] = {}
+                for ms in values:
+                    le = _bucket(ms / 1000)
+                    buckets[le] = buckets.get(le, 0) + 1
+                db.executemany("""INSERT INTO stage_hist (stage, le, count) VALUES (?, ?, ?)
+                                  ON CONFLICT(stage, le) DO UPDATE SET count = count + excluded.count""",
+                               [(stage, le, n) for le, n in buckets.items()])
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+        return row_id
+
+
+def _where(filters: dict | None) -> tuple[str, list]:
+    """filters: status, engine (exakt), source (Teilstring), since/until (ISO-Zeitstempel, inkl./exkl.)."""
+    clauses, args = [], []
+    f = filters or {}
+    for key in ("status", "engine"):
+        if f.get(key):
+            clauses.append(f"{key} = ?")
+            args.append(f[key])
+    if f.get("source"):
+        clauses.append("source LIKE ? ESCAPE '\\'")
+        args.append("%" + f["source"].replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%")
+    if f.get("since"):
+        clauses.append("timestamp >= ?")
+        args.append(f["since"])
+    if f.get("until"):
+        clauses.append("timestamp < ?")
+        args.append(f["until"])
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", args
+
+
+def count(filters: dict | None = None) -> int:
+    where, args = _where(filters)
+    with _db() as db:
+        return int(db.execute(f"SELECT COUNT(*) FROM joblog{where}", args).fetchone()[0])
+
+
+def query(filters: dict | None = None, limit: int = 50, offset: int = 0) -> list[dict]:
+    """Eine Seite Einträge, neueste zuerst."""
+    where, args = _where(filters)
+    with _db() as db:
+        rows = db.execute(
+            f"SELECT {', '.join(KEYS)} FROM joblog{where} ORDER BY id DESC LIMIT ? OFFSET ?",
+            (*args, int(limit), int(offset)),
+        ).fetchall()
+    return [dict(r) for r in rows]
+
+
+def last(n: int = 10) -> list[dict]:
+    return query(limit=n)
+
+
+def distinct(column: str) -> list[str]:
+    """Vorhandene Werte einer Spalte (für Filter-Auswahl), z. B. engine oder status."""
+    if column not in ("status", "engine", "ocr", "cache"):
+        raise ValueError(column)
+    with _db() as db:
+        return [r[0] for r in db.execute(f"SELECT DISTINCT {column} FROM joblog WHERE {column} != '' ORDER BY 1")]
+
+
+def iter_csv(filters: dict | None = None, batch: int = 1000):
+    """CSV (mit Kopfzeile) stückweise als str, direkt aus dem Cursor – konstanter Speicherbedarf."""
+    where, args = _where(filters)
+    buf = io.StringIO()
+    w = csv.writer(buf)
+    w.writerow(KEYS)
+    with _db() as db:
+        cur = db.execute(f"SELECT {', '.join(KEYS)} FROM joblog{where} ORDER BY id", args)
+        while True:
+            rows = cur.fetchmany(batch)
+            if not rows:
+                break
+            w.writerows(["" if v is None else v for v in r] for r in rows)
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    if buf.tell():
+        yield buf.getvalue()
+
+
+def export_csv(path: str, filters: dict | None = None) -> int:
+    """Schreibt den (gefilterten) Job-Log als CSV-Datei. Gibt die Dateigröße in Bytes zurück."""
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8", newline="") as fh:
+        for part in iter_csv(filters):
+            fh.write(part)
+    os.replace(tmp, path)
+    return os.path.getsize(path)
+
+
+# -------- Auswertung --------
+# Latenzen nur über erfolgreiche Jobs mit Engine-Lauf (Cache-Treffer würden die Perzentile verfälschen).
+
+_GROUPS = {"engine": "engine", "ocr": "ocr"}
+
+
+def _since_clause(since: str | None, args: list) -> str:
+    if not since:
+        return ""
+    args.append(since)
+    return " AND timestamp >= ?"
+
+
+def duration_stats(group_by: str = "engine", since: str | None = None) -> list[dict]:
+    """
+    Je Engine bzw. OCR-Backend: Jobs, Fehler, Fehlerquote, p50/p95/p99 der Dauer (ms, Nearest-Rank)
+    und Seiten pro Sekunde. Perzentile per Fensterfunktion in SQLite, ohne die Historie zu laden.
+    """
+    col = _GROUPS[group_by]
+    args: list = []
+    since_sql = _since_clause(since, args)
+    with _db() as db:
+        pct = {r["grp"]: dict(r) for r in db.execute(f"""
+            WITH base AS (
+                SELECT {col} AS grp, duration_ms FROM joblog
+                WHERE status = 'ok' AND duration_ms IS NOT NULL AND cache != 'hit' AND {col} != ''{since_sql}
+            ), ranked AS (
+                SELECT grp, duration_ms,
+                       ROW_NUMBER() OVER (PARTITION BY grp ORDER BY duration_ms) AS rn,
+                       COUNT(*) OVER (PARTITION BY grp) AS n
+                FROM base
+            )
+            SELECT grp,
+                   MIN(CASE WHEN rn >= 0.50 * n THEN duration_ms END) AS p50,
+                   MIN(CASE WHEN rn >= 0.95 * n THEN duration_ms END) AS p95,
+                   MIN(CASE WHEN rn >= 0.99 * n THEN duration_ms END) AS p99
+            FROM ranked GROUP BY grp
+        """, args)}
+        totals = db.execute(f"""
+            SELECT {col} AS grp, COUNT(*) AS jobs,
+                   SUM(status = 'error') AS errors,
+                   SUM(CASE WHEN status = 'ok' AND cache != 'hit' AND pages > 0 AND duration_ms > 0 THEN pages END) AS pages,
+                   SUM(CASE WHEN status = 'ok' AND cache != 'hit' AND pages > 0 AND duration_ms > 0 THEN duration_ms END) AS pages_ms
+            FROM joblog WHERE {col} != ''{since_sql}
+            GROUP BY {col} ORDER BY jobs DESC
+        """, args).fetchall()
+    out = []
+    for r in totals:
+        p = pct.get(r["grp"], {})
+        out.append({
+            group_by: r["grp"], "jobs": r["jobs"], "errors": r["errors"],
+            "error_rate": round(r["errors"] / r["jobs"], 3) if r["jobs"] else 0.0,
+            "p50_ms": p.get("p50"), "p95_ms": p.get("p95"), "p99_ms": p.get("p99"),
+            "pages_per_s": round(r["pages"] / (r["pages_ms"] / 1000), 2) if r["pages_ms"] else None,
+        })
+    return out
+
+
+def error_rate(bucket: str = "day", since: str | None = None) -> list[dict]:
+    """Jobs und Fehlerquote je Tag bzw. Stunde (älteste zuerst)."""
+    width = {"day": 10, "hour": 13}[bucket]
+    args: list = []
+    since_sql = _since_clause(since, args)
+    with _db() as db:
+        rows = db.execute(f"""
+            SELECT substr(timestamp, 1, {width}) AS bucket, COUNT(*) AS jobs, SUM(status = 'error') AS errors
+            FROM joblog WHERE timestamp != ''{since_sql}
+            GROUP BY bucket ORDER BY bucket
+        """, args).fetchall()
+    return [{"bucket": r["bucket"], "jobs": r["jobs"], "errors": r["errors"],
+             "error_rate": round(r["errors"] / r["jobs"], 3)} for r in rows]
+
+
+def slowest(limit: int = 20, since: str | None = None) -> list[dict]:
+    """Langsamste erfolgreiche Dokumente (über den Index auf duration_ms)."""
+    args: list = []
+    since_sql = _since_clause(since, args)
+    with _db() as db:
+        rows = db.execute(f"""
+            SELECT timestamp, source, engine, ocr, duration_ms, pages, chunk_layout, probe FROM joblog
+            WHERE status = 'ok' AND duration_ms IS NOT NULL{since_sql}
+            ORDER BY duration_ms DESC LIMIT ?
+        """, (*args, int(limit))).fetchall()
+    return [dict(r) for r in rows]
+
+
+# -------- Spans / Metriken --------
+
+def stage_histograms() -> list[dict]:
+    """Je Stufe: kumulierte Bucket-Zähler (le, n) wie in Prometheus (inkl. +Inf), Anzahl und Summe (s)."""
+    with _db() as db:
+        hist: dict[str, dict[str, int]] = {}
+        for r in db.execute("SELECT stage, le, count FROM stage_hist"):
+            hist.setdefault(r["stage"], {})[r["le"]] = r["count"]
+        totals = db.execute("SELECT stage, count, sum_ms FROM stage_totals ORDER BY stage").fetchall()
+    out = []
+    for r in totals:
+        per = hist.get(r["stage"], {})
+        acc, buckets = 0, []
+        for le in [f"{b:g}" for b in STAGE_BUCKETS] + ["+Inf"]:
+            acc += per.get(le, 0)
+            buckets.append((le, acc))
+        out.append({"stage": r["stage"], "buckets": buckets, "count": r["count"], "sum_s": r["sum_ms"] / 1000})
+    return out
+
+
+def stage_totals() -> list[dict]:
+    """Je Stufe: Anzahl Spans, Gesamt- und Durchschnittszeit (s), größte Summe zuerst."""
+    with _db() as db:
+        rows = db.execute("SELECT stage, count, sum_ms FROM stage_totals ORDER BY sum_ms DESC").fetchall()
+    return [{"stage": r["stage"], "count": r["count"], "total_s": round(r["sum_ms"] / 1000, 1),
+             "avg_s": round(r["sum_ms"] / 1000 / r["count"], 3) if r["count"] else None} for r in rows]
+
+
+def job_counts() -> list[dict]:
+    """Jobs und Seiten je Engine, Status und Cache-Ergebnis (für Zähler-Metriken)."""
+    with _db() as db:
+        rows = db.execute("""
+            SELECT engine, status, cache, COUNT(*) AS jobs, COALESCE(SUM(pages), 0) AS pages
+            FROM joblog GROUP BY engine, status, cache ORDER BY engine, status, cache
+        """).fetchall()
+    return [dict(r) for r in rows]
+
+
+def recent_spans(n: int = 5) -> list[dict]:
+    """Die letzten n Einträge mit Spans (neueste zuerst), spans als Liste."""
+    with _db() as db:
+        rows = db.execute("""
+            SELECT timestamp, source, engine, status, duration_ms, spans FROM joblog
+            WHERE spans != '' ORDER BY id DESC LIMIT ?
+        """, (int(n),)).fetchall()
+    return [dict(r, spans=json.loads(r["spans"])) for r in rows]
@@ -0,0 +1,98 @@
+# Live-Logs mit begrenztem Speicher: die letzten Zeilen im Ringpuffer, das vollständige Log in einer Datei.
+# Marker schreibt Fortschrittsbalken zeilenweise (bei langen PDFs zehntausende Zeilen); statt jede Zeile
+# einzeln zu flushen, wird gepuffert und höchstens alle LOG_FLUSH_INTERVAL Sekunden geschrieben.
+# Leser (UI, read_log) sehen damit spätestens nach diesem Intervall den aktuellen Stand.
+import os, time, threading
+from collections import deque
+
+LOG_FLUSH_INTERVAL = float(os.environ.get("LOG_FLUSH_INTERVAL", "0.5"))
+LOG_TAIL_LINES = int(os.environ.get("LOG_TAIL_LINES", "500"))
+
+
+class LogTail:
+    """Die letzten max_lines Zeilen eines Logs (ältere werden nur gezählt)."""
+    def __init__(self, max_lines: int = LOG_TAIL_LINES):
+        self._lines = deque(maxlen=max_lines)
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    def append(self, line: str) -> None:
+        with self._lock:
+            if len(self._lines) == self._lines.maxlen:
+                self.dropped += 1
+            self._lines.append(line)
+
+    def text(self) -> str:
+        with self._lock:
+            head = [f"[log] … {self.dropped} ältere Zeilen ausgelassen"] if self.dropped else []
+            return "\n".join(head + list(self._lines))
+
+
+class LogStream(LogTail):
+    """
+    Thread-sicheres Log: Ringpuffer (text()) + vollständige Kopie in path.
+    Geschrieben wird gesammelt nach Intervall (auch wenn keine weiteren Zeilen kommen) und bei close().
+    """
+    def __init__(self, path: str, max_lines: int = LOG_TAIL_LINES, flush_interval: float = LOG_FLUSH_INTERVAL):
+        super().__init__(max_lines)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self._fh = open(path, "a", encoding="utf-8")
+        self._pending: list[str] = []
+        self._interval = flush_interval
+        self._last_flush = time.monotonic()
+        self._io_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._flusher = None
+        if flush_interval > 0:
+            self._flusher = threading.Thread(target=self._flush_loop, daemon=True, name="log-stream")
+            self._flusher.start()
+
+    def write(self, line: str) -> None:
+        # mehrzeilige Einträge (z. B. Tracebacks) bleiben im Ringpuffer zusammen
+        line = line.rstrip("\n")
+        self.append(line)
+        with self._io_lock:
+            if self._closed:
+                return
+            self._pending.append(line + "\n")
+            due = self._interval <= 0 or time.monotonic() - self._last_flush >= self._interval
+        if due:
+            self.flush()
+        elif self._flusher is not None and not self._wake.is_set():
+            self._wake.set()
+
+    def flush(self) -> None:
+        with self._io_lock:
+            if self._pending and not self._closed:
+                self._fh.write("".join(self._pending))
+                self._fh.flush()
+                self._pending.clear()
+            self._last_flush = time.monotonic()
+
+    def _flush_loop(self) -> None:
+        # Nachzügler schreiben: nur wach, solange ungeschriebene Zeilen anstehen
+        while True:
+            self._wake.wait()
+            if self._closed:
+                return
+            self._wake.clear()
+            time.sleep(self._interval)
+            self.flush()
+
+    def close(self) -> None:
+        with self._io_lock:
+            if self._closed:
+                return
+            self._fh.write("".join(self._pending))
+            self._pending.clear()
+            self._closed = True
+            self._fh.close()
+        self._wake.set()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,327 @@
+# Langlebiger Marker-Worker: lädt die Surya-/Layout-Modelle einmal und nimmt
+# Konvertierungsjobs über einen lokalen Unix-Socket entgegen.
+#
+#   python marker_worker.py serve --slot 0
+#
+# Protokoll (JSON pro Zeile):
+#   Client → Worker: {"path": ..., "out_dir": ..., "force_ocr": bool, "keep_images": bool, "threads": int|null}
+#   Worker → Client: {"log": "<zeile>"} ... und abschließend {"done": true, "ok": bool, "error": "..."}
+#
+# app.py startet die Worker bei Bedarf selbst; marker_single bleibt der Fallback.
+import os, sys, json, fcntl, socket, subprocess, threading, time, queue, logging, argparse, traceback
+
+import log_stream
+import spans
+
+SOCKET_DIR = os.environ.get("MARKER_WORKER_DIR", "/app/.cache/marker_worker")
+# Ein Worker-Slot je paralleler Chunk; jeder Worker hält die Modelle einmal im RAM
+POOL_SIZE = int(os.environ.get("MARKER_WORKERS", max(1, (os.cpu_count() or 1) // 4)))
+START_TIMEOUT = float(os.environ.get("MARKER_WORKER_START_TIMEOUT", "900"))
+
+
+class WorkerUnavailable(RuntimeError):
+    """Worker konnte nicht gestartet/erreicht werden oder ist während des Jobs abgestürzt."""
+
+
+def socket_path(slot: int) -> str:
+    return os.path.join(SOCKET_DIR, f"worker_{slot}.sock")
+
+def _pid_path(slot: int) -> str:
+    return os.path.join(SOCKET_DIR, f"worker_{slot}.pid")
+
+def _log_path(slot: int) -> str:
+    return os.path.join(SOCKET_DIR, f"worker_{slot}.log")
+
+def _lock_path(slot: int) -> str:
+    return os.path.join(SOCKET_DIR, f"worker_{slot}.lock")
+
+
+# -------- Worker (Server-Seite) --------
+
+class _LineForwarder:
+    """File-artiges Objekt, das geschriebene Zeilen (auch tqdm-\\r-Updates) an den Client schickt."""
+    def __init__(self, send):
+        self._send = send
+        self._buf = ""
+
+    def write(self, s: str) -> int:
+        self._buf += s
+        while True:
+            cut = min((i for i in (self._buf.find("\n"), self._buf.find("\r")) if i != -1), default=-1)
+            if cut == -1:
+                break
+            line, self._buf = self._buf[:cut], self._buf[cut + 1:]
+            if line.strip():
+                self._send(line)
+        return len(s)
+
+    def flush(self) -> None:
+        if self._buf.strip():
+            self._send(self._buf)
+        self._buf = ""
+
+    def isatty(self) -> bool:
+        return False
+
+
+def _convert(req: dict, models: dict) -> None:
+    """Entspricht marker_single: schreibt <out_dir>/<basename>/<basename>.md (+ Bilder)."""
+    from marker.config.parser import ConfigParser
+    from marker.output import save_output
+
+    cfg = {"output_format": "markdown", "output_dir": req["out_dir"]}
+    if req.get("force_ocr"):
+        cfg["force_ocr"] = True
+    if not req.get("keep_images", True):
+        cfg["disable_image_extraction"] = True
+    if req.get("threads"):
+        import torch
+        torch.set_num_threads(int(req["threads"]))
+
+    parser = ConfigParser(cfg)
+    converter_cls = parser.get_converter_cls()
+    converter = converter_cls(
+        config=parser.generate_config_dict(),
+        artifact_dict=models,
+        processor_list=parser.get_processors(),
+        renderer=parser.get_renderer(),
+        llm_service=parser.get_llm_service(),
+    )
+    rendered = converter(req["path"])
+    out_folder = parser.get_output_folder(req["path"])
+    save_output(rendered, out_folder, parser.get_base_filename(req["path"]))
+
+
+def _handle(conn: socket.socket, models: dict) -> None:
+    rfile = conn.makefile("r", encoding="utf-8")
+    wfile = conn.makefile("w", encoding="utf-8")
+
+    def send(obj: dict) -> None:
+        try:
+            wfile.write(json.dumps(obj, ensure_ascii=False) + "\n")
+            wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    line = rfile.readline()
+    if not line:
+        return
+    req = json.loads(line)
+
+    fwd = _LineForwarder(lambda s: send({"log": s}))
+    handler = logging.StreamHandler(fwd)
+    handler.setFormatter(logging.Formatter("%(levelname)s %(name)s: %(message)s"))
+    # Root-Logger reicht, außer Marker hat die Propagation abgeschaltet
+    loggers = [logging.getLogger()]
+    if not logging.getLogger("marker").propagate:
+        loggers.append(logging.getLogger("marker"))
+    old_out, old_err = sys.stdout, sys.stderr
+    sys.stdout = sys.stderr = fwd
+    for lg in loggers:
+        lg.addHandler(handler)
+    try:
+        _convert(req, models)
+        fwd.flush()
+        send({"done": True, "ok": True, "error": ""})
+    except Exception as e:
+        fwd.flush()
+        send({"log": traceback.format_exc()})
+        send({"done": True, "ok": False, "error": str(e)})
+    finally:
+        for lg in loggers:
+            lg.removeHandler(handler)
+        sys.stdout, sys.stderr = old_out, old_err
+
+
+def serve(slot: int, lock_fd: int | None = None) -> None:
+    import signal
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    os.makedirs(SOCKET_DIR, exist_ok=True)
+    sock_file = socket_path(slot)
+
+    # Slot-Lock vor dem teuren Modell-Laden: ein zweiter Worker für denselben Slot (anderer Client-Prozess)
+    # beendet sich sofort, statt Modelle zu laden und dem ersten den Socket wegzunehmen.
+    # Der Lock bleibt bis zum Prozessende gehalten; Clients prüfen ihn (_slot_locked).
+    # lock_fd: vom startenden Client geerbter, schon gesperrter Lock – wird hier nur übernommen.
+    lock_fh = os.fdopen(lock_fd, "a") if lock_fd is not None else open(_lock_path(slot), "a")
+    try:
+        fcntl.flock(lock_fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        print(f"[marker-worker {slot}] Slot bereits belegt – beende", flush=True)
+        return
+    with open(_pid_path(slot), "w") as fh:
+        fh.write(str(os.getpid()))
+
+    # Modelle zuerst laden: der Socket existiert erst, wenn der Worker arbeitsfähig ist
+    from marker.models import create_model_dict
+    t0 = time.time()
+    models = create_model_dict()
+    print(f"[marker-worker {slot}] Modelle geladen in {time.time() - t0:.1f}s", flush=True)
+
+    # Nur der Lock-Inhaber räumt einen verwaisten Socket weg
+    if os.path.exists(sock_file):
+        os.remove(sock_file)
+    srv = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    srv.bind(sock_file)
+    srv.listen(8)
+    try:
+        while True:
+            conn, _ = srv.accept()
+            with conn:
+                try:
+                    _handle(conn, models)
+                except Exception:
+                    traceback.print_exc()
+    finally:
+        srv.close()
+        for p in (sock_file, _pid_path(slot)):
+            try:
+                os.remove(p)
+            except OSError:
+                pass
+        lock_fh.close()
+
+
+# -------- Client-Seite (wird von app.py genutzt) --------
+
+_free_slots: "queue.Queue[int]" = queue.Queue()
+for _i in range(POOL_SIZE):
+    _free_slots.put(_i)
+_spawn_lock = threading.Lock()
+
+
+def _connect(slot: int, timeout: float | None = None) -> socket.socket | None:
+    s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    if timeout is not None:
+        s.settimeout(timeout)
+    try:
+        s.connect(socket_path(slot))
+        s.settimeout(None)
+        return s
+    except OSError:
+        s.close()
+        return None
+
+
+def _slot_locked(slot: int) -> bool:
+    """True, wenn ein Worker (aus irgendeinem Prozess) den Slot-Lock hält – lädt Modelle oder läuft."""
+    os.makedirs(SOCKET_DIR, exist_ok=True)
+    with open(_lock_path(slot), "a") as fh:
+        try:
+            fcntl.flock(fh, fcntl.LOCK_SH | fcntl.LOCK_NB)
+        except OSError:
+            return True
+        fcntl.flock(fh, fcntl.LOCK_UN)
+        return False
+
+
+def _spawn_worker(slot: int) -> bool:
+    """
+    Startet den Worker des Slots, falls kein anderer den Slot-Lock hält. Der Lock wird hier genommen und
+    an den Kindprozess vererbt, damit kein zweiter Client den Slot zwischen Start und Lock-Übernahme
+    für frei hält. True, wenn ein Prozess gestartet wurde.
+    """
+    os.makedirs(SOCKET_DIR, exist_ok=True)
+    with open(_lock_path(slot), "a") as lock_fh:
+        try:
+            fcntl.flock(lock_fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            return False
+        fd = lock_fh.fileno()
+        with open(_log_path(slot), "ab") as log_fh:
+            subprocess.Popen(
+                [sys.executable, os.path.abspath(__file__), "serve", "--slot", str(slot), "--lock-fd", str(fd)],
+                stdout=log_fh, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL,
+                start_new_session=True, pass_fds=(fd,),
+            )
+    # Unser Handle ist geschlossen; der Lock gehört jetzt dem Kindprozess (gemeinsame Open File Description)
+    return True
+
+
+def _ensure_worker(slot: int) -> socket.socket:
+    """Verbindet zum Worker des Slots; startet ihn bei Bedarf und wartet, bis die Modelle geladen sind."""
+    conn = _connect(slot, timeout=5)
+    if conn is not None:
+        return conn
+    # Worker startet bzw. lädt noch seine Modelle: die Wartezeit zählt für diesen Job als Modell-Laden
+    with spans.span("marker_model_load", slot=slot):
+        with _spawn_lock:
+            _spawn_worker(slot)
+        deadline = time.time() + START_TIMEOUT
+        while time.time() < deadline:
+            conn = _connect(slot, timeout=5)
+            if conn is not None:
+                return conn
+            if not _slot_locked(slot):
+                raise WorkerUnavailable(f"Marker-Worker {slot} beendet (siehe {_log_path(slot)})")
+            time.sleep(0.5)
+        raise WorkerUnavailable(f"Marker-Worker {slot} nicht innerhalb von {START_TIMEOUT:.0f}s bereit")
+
+
+def run_job(path: str, out_dir: str, force_ocr: bool, keep_images: bool, live_cb=None, threads: int | None = None, cancel_event=None) -> tuple[bool, str]:
+    """
+    Schickt einen Job an einen freien Worker und liefert (ok, logs).
+    live_cb: optional callback(line:str) – gleiche Schnittstelle wie bei convert_marker_cli.
+    cancel_event: optional threading.Event; beim Setzen wird die Verbindung getrennt
+    (der Worker rechnet den laufenden Job zu Ende, das Ergebnis wird verworfen).
+    Raises WorkerUnavailable, wenn kein Worker genutzt werden konnte (→ Fallback marker_single).
+    """
+    slot = _free_slots.get()
+    finished = threading.Event()
+    try:
+        conn = _ensure_worker(slot)
+        collected = log_stream.LogTail()
+        if cancel_event is not None:
+            def _hangup():
+                while not finished.is_set():
+                    if cancel_event.wait(0.5):
+                        try:
+                            conn.shutdown(socket.SHUT_RDWR)
+                        except OSError:
+                            pass
+                        return
+            threading.Thread(target=_hangup, daemon=True).start()
+        with conn, spans.span("marker_inference", slot=slot, force_ocr=bool(force_ocr)):
+            req = {"path": os.path.abspath(path), "out_dir": os.path.abspath(out_dir),
+                   "force_ocr": bool(force_ocr), "keep_images": bool(keep_images), "threads": threads}
+            conn.sendall((json.dumps(req) + "\n").encode("utf-8"))
+            for raw in conn.makefile("r", encoding="utf-8"):
+                msg = json.loads(raw)
+                if "log" in msg:
+                    collected.append(msg["log"])
+                    if callable(live_cb):
+                        live_cb(msg["log"])
+                if msg.get("done"):
+                    if msg.get("error"):
+                        collected.append(msg["error"])
+                    return bool(msg.get("ok")), collected.text()
+        raise WorkerUnavailable("Verbindung zum Marker-Worker während des Jobs verloren")
+    except OSError as e:
+        raise WorkerUnavailable(f"Verbindung zum Marker-Worker unterbrochen: {e}") from e
+    except json.JSONDecodeError as e:
+        raise WorkerUnavailable(f"ungültige Antwort vom Marker-Worker: {e}") from e
+    finally:
+        finished.set()
+        _free_slots.put(slot)
+
+
+def stop_workers() -> None:
+    """Beendet alle laufenden Worker (z. B. nach Modell-Updates)."""
+    import signal
+    for slot in range(POOL_SIZE):
+        try:
+            with open(_pid_path(slot)) as fh:
+                os.kill(int(fh.read().strip()), signal.SIGTERM)
+        except (OSError, ValueError):
+            pass
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Persistenter Marker-Worker")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sp = sub.add_parser("serve")
+    sp.add_argument("--slot", type=int, default=0)
+    sp.add_argument("--lock-fd", type=int, default=None, help="vom Client geerbter Slot-Lock (intern)")
+    a = ap.parse_args()
+    if a.cmd == "serve":
+        serve(a.slot, a.lock_fd)
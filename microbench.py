@@ -0,0 +1,223 @@
+# Micro-Benchmarks der reinen Python-Textstufen (laufen für jedes Dokument, ohne Engine).
+#
+#   python microbench.py                                  # 10K, 100K, 1M, 10M
+#   python microbench.py --sizes 10K,1M,200M --stages postprocess_markdown,repair:komplett
+#   python microbench.py --json mb.json --check           # Exit-Code 1 bei überlinearem Verhalten
+#
+# Eingabe ist synthetisches Markdown (Überschriften, Tabellen mit/ohne Trennzeile, Codeblöcke, Bildlinks,
+# Listen, Anführungszeichen, wiederkehrende Fußzeilen, Frontmatter). Gemessen wird je Stufe und Größe
+# der Durchsatz (MB/s, bester von --repeat Läufen) und der Spitzen-Speicher (tracemalloc) relativ zur Eingabe.
+# Quadratisches Verhalten fällt als Skalierungs-Exponent > 1.3 zwischen 1 MB und der größten Größe auf.
+import os, sys, gc, json, math, time, random, shutil, argparse, tempfile, tracemalloc
+
+import pipeline
+import repair_tools
+
+DEFAULT_SIZES = "10K,100K,1M,10M"
+# tracemalloc verlangsamt stark → Speichermessung nur bis zu dieser Größe
+ALLOC_MAX = 10 * 1024 * 1024
+SUPERLINEAR_EXPONENT = 1.3
+SEED = 4711
+
+# -------- Eingabe --------
+
+_WORDS = ("Daten Modell Analyse Ergebnis Verfahren Größe Übung Lösung Prüfung Abschnitt Beispiel Methode "
+          "zeigt ergibt folgt liefert enthält gilt für über unter zwischen durch wird sind nicht auch").split()
+
+
+def _sentence(rng: random.Random) -> str:
+    return " ".join(rng.choice(_WORDS) for _ in range(rng.randint(5, 14))).capitalize() + "."
+
+
+def _section(rng: random.Random, n: int) -> str:
+    """Ein Abschnitt mit allen Elementen, die die Textstufen anfassen."""
+    out = [f"{'#' * rng.choice((1, 2, 2, 3, 5))} {n} {rng.choice(_WORDS)} {rng.choice(_WORDS)}", ""]
+    for _ in range(rng.randint(1, 3)):
+        out += [" ".join(_sentence(rng) for _ in range(rng.randint(2, 5))) + "   ", ""]
+    if rng.random() < 0.5:
+        out += [f'Er sagte "{rng.choice(_WORDS)} {rng.choice(_WORDS)}" und ging.', ""]
+    if rng.random() < 0.5:
+        marker = rng.choice(("*", "-", "+", "1."))
+        out += [f"{'  ' * (i % 2)}{marker}  {_sentence(rng)}" for i in range(rng.randint(2, 5))] + [""]
+    if rng.random() < 0.4:
+        cols = rng.randint(2, 5)
+        out.append("|  " + "  |  ".join(rng.choice(_WORDS) for _ in range(cols)) + "  |")
+        if rng.random() < 0.6:
+            out.append("|" + " --- |" * cols)
+        out += ["| " + " | ".join(str(rng.randint(1, 9999)) for _ in range(cols)) + " |" for _ in range(rng.randint(2, 6))]
+        out.append("")
+    if rng.random() < 0.3:
+        out += ["```python", "# kein Heading im Code", f"def f{n}(x):", '    return "x"  # "Zitat"', "```", ""]
+    if rng.random() < 0.6:
+        out += [f"![Abbildung {n}](_page_{n}_Picture_{rng.randint(0, 3)}.jpeg)",
+                f"![](assets/fig_{n}.png) und ![extern](https://example.org/x{n}.png)", ""]
+    # Seitenfuß wie aus PDF-Konvertierungen (Seitenzahl, "Seite X von Y")
+    out += ["", str(n), "", f"Seite {n} von 9999", "", "", ""]
+    return "\n".join(out)
+
+
+def make_markdown(size: int, seed: int = SEED) -> str:
+    """Synthetisches Markdown von etwa size Bytes (Latin-1, damit 1 Byte je Zeichen im Speicher)."""
+    rng = random.Random(seed)
+    pool = [_section(rng, i) for i in range(256)]
+    parts = ['---\n{"title": "Bench", "tags": ["bench"]}\n---\n\n<!-- TOC -->\n<!-- /TOC -->\n']
+    total, n = len(parts[0]), 0
+    while total < size:
+        # Abschnitte wiederverwenden, Seitenzahlen fortlaufend (sonst identische Zeilen)
+        sec = pool[n % len(pool)].replace("Seite ", f"Seite {n} ", 1)
+        parts.append(sec)
+        total += len(sec) + 1
+        n += 1
+    return "\n".join(parts)[:max(size, 1)]
+
+
+# -------- Stufen --------
+# (Vorbereitung außerhalb der Zeitmessung, Aufruf)
+
+_NAMES = {f"_page_{i}_Picture_{j}.jpeg": f"{i:016x}.jpeg" for i in range(0, 256, 2) for j in range(4)}
+
+
+def _split_docs(text: str, parts: int = 8) -> list[tuple[str, str]]:
+    step = max(1, len(text) // parts)
+    docs, pos = [], 0
+    for i in range(parts):
+        end = len(text) if i == parts - 1 else text.find("\n", pos + step)
+        end = len(text) if end < 0 else end
+        docs.append((f"Teil {i:02d}.md", text[pos:end]))
+        pos = end
+    return docs
+
+
+def _repair(**kw):
+    return lambda text: repair_tools.load_markdown_and_repair(text, [], **kw)
+
+
+def stages(assets_dir: str) -> dict:
+    # repair:basis = Frontmatter, Tokenizer, Fences, Link-Report ohne Ordner; die einzelnen Pässe jeweils allein darauf
+    return {
+        "postprocess_markdown": (lambda t: (t,), pipeline.postprocess_markdown),
+        "strip_frontmatter": (lambda t: (t,), pipeline.strip_frontmatter),
+        "rewrite_chunk_links": (lambda t: (t, _NAMES, "c01_"), pipeline.rewrite_chunk_links),
+        "merge_markdown": (lambda t: (_split_docs(t),), pipeline.merge_markdown),
+        "repair:basis": (lambda t: (t,), _repair(passes=[], regen_toc=False)),
+        "repair:HeadingLevels": (lambda t: (t,), _repair(passes=[repair_tools.HeadingLevels()], regen_toc=False)),
+        "repair:ListMarkers": (lambda t: (t,), _repair(passes=[repair_tools.ListMarkers()], regen_toc=False)),
+        "repair:GermanQuotes": (lambda t: (t,), _repair(passes=[repair_tools.GermanQuotes()], regen_toc=False)),
+        "repair:toc": (lambda t: (t,), _repair(passes=[], regen_toc=True)),
+        "repair:links": (lambda t: (t,), _repair(passes=[], regen_toc=False, assets_dir=assets_dir)),
+        "repair:komplett": (lambda t: (t,), _repair(assets_dir=assets_dir)),
+    }
+
+
+def _make_assets(path: str) -> None:
+    # ein Teil der verlinkten Bilder existiert, der Rest wird als fehlend gemeldet
+    os.makedirs(path, exist_ok=True)
+    for i in range(0, 256, 3):
+        open(os.path.join(path, f"fig_{i}.png"), "wb").close()
+
+
+# -------- Messung --------
+
+def parse_size(s: str) -> int:
+    s = s.strip().upper()
+    mult = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}.get(s[-1:], 1)
+    return int(float(s[:-1] if s[-1:] in "KMG" else s) * mult)
+
+
+def _fmt_size(n: int) -> str:
+    for unit, div in (("G", 1024 ** 3), ("M", 1024 ** 2), ("K", 1024)):
+        if n >= div:
+            return f"{n / div:g}{unit}"
+    return str(n)
+
+
+def measure(fn, args: tuple, size: int, repeat: int, budget: float = 2.0) -> dict:
+    """Bester Lauf aus bis zu repeat Wiederholungen (abbrechen, wenn budget Sekunden verbraucht sind)."""
+    best, spent, runs = math.inf, 0.0, 0
+    gc.collect()
+    while runs < repeat and (runs == 0 or spent < budget):
+        t0 = time.perf_counter()
+        fn(*args)
+        dt = time.perf_counter() - t0
+        best, spent, runs = min(best, dt), spent + dt, runs + 1
+    rec = {"seconds": best, "mb_per_s": size / (1024 ** 2) / best if best > 0 else None, "runs": runs}
+    if size <= ALLOC_MAX:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            fn(*args)
+            _cur, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        rec.update(peak_alloc_mb=peak / (1024 ** 2), alloc_factor=peak / size if size else None)
+    return rec
+
+
+def scaling(records: list[dict]) -> float | None:
+    """Exponent k in t ~ size^k zwischen der kleinsten Größe ab 1 MB und der größten (1 = linear)."""
+    big = [r for r in records if r["size"] >= 1024 ** 2]
+    if len(big) < 2:
+        big = records
+    if len(big) < 2:
+        return None
+    a, b = big[0], big[-1]
+    if a["size"] == b["size"] or a["seconds"] <= 0:
+        return None
+    return math.log(b["seconds"] / a["seconds"]) / math.log(b["size"] / a["size"])
+
+
+def run(sizes: list[int], selected: list[str] | None = None, repeat: int = 5, out=sys.stdout) -> dict:
+    tmp = tempfile.mkdtemp(prefix="md-microbench-")
+    try:
+        assets_dir = os.path.join(tmp, "assets")
+        _make_assets(assets_dir)
+        all_stages = stages(assets_dir)
+        names = selected or list(all_stages)
+        results = {name: [] for name in names}
+        print(f"{'Stufe':<22} {'Größe':>6} {'MB/s':>9} {'Zeit':>10} {'Spitze':>9} {'×Eingabe':>8}", file=out)
+        for size in sizes:
+            text = make_markdown(size)
+            for name in names:
+                prepare, fn = all_stages[name]
+                rec = dict(size=size, **measure(fn, prepare(text), size, repeat))
+                results[name].append(rec)
+                peak = f"{rec['peak_alloc_mb']:>7.1f}MB {rec['alloc_factor']:>7.1f}×" if "peak_alloc_mb" in rec else ""
+                print(f"{name:<22} {_fmt_size(size):>6} {rec['mb_per_s']:>9.1f} {rec['seconds'] * 1000:>8.1f}ms {peak}", file=out, flush=True)
+            del text
+        summary = {}
+        for name, recs in results.items():
+            k = scaling(recs)
+            summary[name] = {"exponent": round(k, 2) if k is not None else None,
+                             "superlinear": k is not None and k > SUPERLINEAR_EXPONENT}
+        return {"sizes": sizes, "repeat": repeat, "python": sys.version.split()[0], "results": results, "scaling": summary}
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Micro-Benchmarks der Markdown-Textstufen")
+    ap.add_argument("--sizes", default=DEFAULT_SIZES, help=f"Eingabegrößen, kommagetrennt (Default {DEFAULT_SIZES}, bis 200M)")
+    ap.add_argument("--stages", help="nur diese Stufen, kommagetrennt")
+    ap.add_argument("--repeat", type=int, default=5, help="Läufe je Messung (bester zählt)")
+    ap.add_argument("--json", help="Ergebnisse zusätzlich als JSON schreiben")
+    ap.add_argument("--check", action="store_true", help=f"Exit-Code 1, wenn eine Stufe überlinear skaliert (Exponent > {SUPERLINEAR_EXPONENT})")
+    a = ap.parse_args()
+    known = list(stages(""))
+    selected = [s.strip() for s in a.stages.split(",")] if a.stages else None
+    unknown = [s for s in selected or [] if s not in known]
+    if unknown:
+        ap.error(f"unbekannte Stufe(n): {', '.join(unknown)} (verfügbar: {', '.join(known)})")
+    res = run(sorted(parse_size(s) for s in a.sizes.split(",")), selected, max(1, a.repeat))
+    print()
+    flagged = []
+    for name, s in res["scaling"].items():
+        if s["exponent"] is not None:
+            mark = "  ← überlinear" if s["superlinear"] else ""
+            print(f"{name:<22} Skalierung t ~ n^{s['exponent']:.2f}{mark}")
+        if s["superlinear"]:
+            flagged.append(name)
+    if a.json:
+        with open(a.json, "w", encoding="utf-8") as fh:
+            json.dump(res, fh, indent=2)
+    if a.check and flagged:
+        sys.exit(1)
@@ -0,0 +1,162 @@
+# Schneller PDF→Markdown-Pfad für digitale PDFs: nur Textlayer via pypdf, keine Modelle.
+# Struktur über einfache Heuristiken: Überschriften nach Schriftgröße, Listen nach
+# Aufzählungszeichen, Absätze nach Zeilenabstand, Seitenumbrüche als HTML-Kommentar.
+import os, re
+from collections import Counter
+
+# Ab diesem Vielfachen der Fließtext-Größe gilt eine Zeile als Überschrift
+HEADING_MIN_RATIO = float(os.environ.get("PDF_TEXT_HEADING_RATIO", "1.15"))
+HEADING_MAX_CHARS = 120
+MAX_HEADING_LEVEL = 4
+
+_BULLET_RE = re.compile(r"^[•◦▪▫●○■□‣⁃∙·\-–—*]\s+")
+_NUMBERED_RE = re.compile(r"^(\d{1,3}|[a-zA-Z])[.)]\s+")
+
+
+def _mult(m: list[float], n: list[float]) -> list[float]:
+    # Affine 3x3-Matrizen in PDF-Notation [a b c d e f]
+    return [
+        m[0] * n[0] + m[1] * n[2], m[0] * n[1] + m[1] * n[3],
+        m[2] * n[0] + m[3] * n[2], m[2] * n[1] + m[3] * n[3],
+        m[4] * n[0] + m[5] * n[2] + n[4], m[4] * n[1] + m[5] * n[3] + n[5],
+    ]
+
+
+def _size_key(size: float) -> float:
+    return round(size * 2) / 2
+
+
+def page_lines(page) -> list[tuple[str, float, float]]:
+    """Zeilen einer Seite als (text, effektive Schriftgröße, y) in Content-Stream-Reihenfolge."""
+    lines: list[tuple[str, float, float]] = []
+    cur: list[str] = []
+    state = {"size": 0.0, "y": None}
+
+    def flush() -> None:
+        text = re.sub(r"\s+", " ", "".join(cur)).strip()
+        if text:
+            lines.append((text, state["size"], state["y"] or 0.0))
+        cur.clear()
+        state["size"], state["y"] = 0.0, None
+
+    def visit(text, cm, tm, _font, font_size) -> None:
+        if not text:
+            return
+        m = _mult(tm, cm)
+        size = abs(font_size or 0) * (m[2] ** 2 + m[3] ** 2) ** 0.5
+        y = m[5]
+        if state["y"] is not None and abs(y - state["y"]) > 0.5 * max(size, state["size"], 1.0):
+            flush()
+        for i, part in enumerate(text.split("\n")):
+            if i:
+                flush()
+            if part.strip():
+                if state["y"] is None:
+                    state["y"] = y
+                cur.append(part)
+                state["size"] = max(state["size"], size)
+
+    page.extract_text(visitor_text=visit)
+    flush()
+    return lines
+
+
+def _join_paragraph(parts: list[str]) -> str:
+    out = ""
+    for p in parts:
+        # Silbentrennung am Zeilenende auflösen ("Konver-" + "tierung")
+        if out.endswith("-") and len(out) > 1 and out[-2].isalpha() and p[:1].islower():
+            out = out[:-1] + p
+        else:
+            out = f"{out} {p}" if out else p
+    return out
+
+
+def lines_to_markdown(pages: list[list[tuple[str, float, float]]], page_marks: bool = True) -> str:
+    """Setzt die Zeilen aller Seiten zu Markdown zusammen (Größen-Statistik über das ganze Dokument)."""
+    weights: Counter = Counter()
+    for lines in pages:
+        for text, size, _y in lines:
+            weights[_size_key(size)] += len(text)
+    if not weights:
+        return ""
+    body = weights.most_common(1)[0][0]
+    heading_sizes = sorted(
+        {_size_key(s) for lines in pages for t, s, _y in lines
+         if _size_key(s) >= body * HEADING_MIN_RATIO and len(t) <= HEADING_MAX_CHARS},
+        reverse=True,
+    )
+    levels = {s: min(i + 1, MAX_HEADING_LEVEL) for i, s in enumerate(heading_sizes)}
+
+    blocks: list[tuple[str, str]] = []  # (art, markdown) mit art in heading/list/para/page
+
+    for no, lines in enumerate(pages, start=1):
+        if page_marks and no > 1:
+            blocks.append(("page", f"<!-- Seite {no} -->"))
+        para: list[str] = []
+        prev_y = prev_size = None
+        last = ""
+
+        def flush_para() -> None:
+            if para:
+                blocks.append(("para", _join_paragraph(para)))
+                para.clear()
+
+        for text, size, y in lines:
+            key = _size_key(size)
+            gap = (prev_y - y) if prev_y is not None else None
+            close = gap is not None and 0 <= gap <= 1.6 * max(size, prev_size or 0, 1.0)
+            if key in levels and len(text) <= HEADING_MAX_CHARS:
+                flush_para()
+                level = levels[key]
+                if last == "heading" and close and blocks[-1][1].startswith("#" * level + " "):
+                    # mehrzeilige Überschrift
+                    blocks[-1] = ("heading", f"{blocks[-1][1]} {text}")
+                else:
+                    blocks.append(("heading", f"{'#' * level} {text}"))
+                last = "heading"
+            elif _BULLET_RE.match(text):
+                flush_para()
+                blocks.append(("list", "- " + _BULLET_RE.sub("", text, count=1)))
+                last = "list"
+            elif _NUMBERED_RE.match(text) and len(text) > 3:
+                flush_para()
+                m = _NUMBERED_RE.match(text)
+                blocks.append(("list", f"{m.group(1)}. {text[m.end():]}"))
+                last = "list"
+            elif last == "list" and close and not para:
+                # Fortsetzungszeile eines Listenpunkts
+                blocks[-1] = ("list", _join_paragraph([blocks[-1][1], text]))
+            else:
+                if para and not close:
+                    flush_para()
+                para.append(text)
+                last = "para"
+            prev_y, prev_size = y, size
+        flush_para()
+
+    out: list[str] = []
+    for i, (kind, md) in enumerate(blocks):
+        if i:
+            out.append("\n" if kind == "list" and blocks[i - 1][0] == "list" else "\n\n")
+        out.append(md)
+    return "".join(out).strip() + "\n"
+
+
+def convert(path: str, page_marks: bool = True) -> str:
+    """
+    Konvertiert ein PDF mit Textlayer nach Markdown (ohne Bilder/Tabellenstruktur).
+    Raises RuntimeError bei verschlüsselten PDFs ohne leeres Passwort oder fehlendem Textlayer.
+    """
+    from pypdf import PdfReader
+    reader = PdfReader(path)
+    if reader.is_encrypted:
+        try:
+            reader.decrypt("")
+        except Exception as e:
+            raise RuntimeError(f"PDF ist verschlüsselt: {e}") from e
+    pages = [page_lines(p) for p in reader.pages]
+    md_text = lines_to_markdown(pages, page_marks=page_marks)
+    if not md_text.strip():
+        raise RuntimeError("Kein Textlayer gefunden – Marker oder Docling mit OCR verwenden.")
+    return md_text
@@ -0,0 +1,1057 @@
+# Konvertierungs-Pipeline ohne Streamlit: Engines, Chunking, Post-Processing, Job-Log.
+# Wird von app.py (UI) und vom Job-Queue-Worker (job_queue.py) genutzt.
+# Einstellungen kommen als Options-dict (Schlüssel wie DEFAULT_OPTIONS), nicht aus der Sidebar.
+import os, shutil, time, subprocess, tempfile, re, json, queue, threading, signal
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime
+
+# Engines (MarkItDown, Docling) werden lazy über die Registry gebaut und wiederverwendet
+import engine_registry
+import doc_probe
+import pdf_text
+import job_store
+import log_stream
+import spans
+
+
+IN_DIR  = "/app/data/in"
+OUT_DIR = "/app/data/out"
+AUTO_CHUNK_THRESHOLD = 0  # immer chunken: jedes PDF mit >=1 Seite wird gechunkt
+# Ab dieser Dateigröße splittet qpdf statt pypdf (schneller, weniger RAM)
+QPDF_SPLIT_MIN_MB = float(os.environ.get("QPDF_SPLIT_MIN_MB", "50"))
+# Parallele Marker-Läufe pro PDF (Default: ein Prozess je 4 Kerne), per ENV überschreibbar
+MAX_PARALLEL_CHUNKS = int(os.environ.get("MAX_PARALLEL_CHUNKS", max(1, (os.cpu_count() or 1) // 4)))
+
+# Persistenter Marker-Worker (Modelle einmal laden); ohne Modul bleibt marker_single der einzige Pfad
+try:
+    import marker_worker
+except Exception:
+    marker_worker = None
+
+# Konvertierungs-Cache (Hash der Quelle + Einstellungen); ohne Modul wird immer konvertiert
+try:
+    import conversion_cache
+except Exception:
+    conversion_cache = None
+
+# Inhaltsadressierter Asset-Speicher (Hardlinks statt Kopien); ohne Modul wird wie bisher kopiert
+try:
+    import asset_store
+except Exception:
+    asset_store = None
+
+# Bild-Nachbearbeitung (Pillow, Prozess-Pool); ohne Modul bleiben die Bilder wie von der Engine geliefert
+try:
+    import asset_optimize
+except Exception:
+    asset_optimize = None
+
+try:
+    from housekeeping import delete_from_inbox  # def delete_from_inbox(path:str) -> None
+except Exception:
+    def delete_from_inbox(path: str) -> None:
+        try:
+            if os.path.exists(path):
+                os.remove(path)
+        except Exception:
+            pass
+
+# Einstellungen eines Konvertierungsjobs (Sidebar bzw. Queue-Job)
+DEFAULT_OPTIONS = {
+    "engine": "Auto",
+    "auto_pdf_text": True,
+    "add_frontmatter": True,
+    "tags": ["studium", "import"],
+    "output_name": "",
+    "output_dir": "",  # leer: OUT_DIR/<slug>; API-Jobs bekommen einen eigenen Ordner je Job
+    "force_ocr": False,
+    "ocr_routing": False,
+    "keep_images": True,
+    "ocr_engine": "auto",
+    "use_marker_worker": os.environ.get("MARKER_WORKER", "1") != "0" and marker_worker is not None,
+    "chunk_mode": "fest",
+    "chunk_size": 20,
+    "max_parallel_chunks": MAX_PARALLEL_CHUNKS,
+    "cleanup_chunks": True,
+    "delete_after_success": False,
+    "use_cache": os.environ.get("CONVERSION_CACHE", "1") != "0" and conversion_cache is not None,
+    "image_optimize": os.environ.get("IMAGE_OPTIMIZE", "0") == "1" and asset_optimize is not None,
+    "image_format": "original",
+    "image_max_dim": 0,
+}
+
+
+# Gültige Werte der Auswahl-Optionen und Grenzen (min, max; None = offen) der Zahl-Optionen wie in der Sidebar
+OPTION_CHOICES = {
+    "engine": ("Auto", "MarkItDown", "Docling", "Marker", "pptx2md", "PDF-Text"),
+    "ocr_engine": ("auto", "easyocr", "tesseract", "rapidocr"),
+    "chunk_mode": ("fest", "adaptiv"),
+    "image_format": ("original", "webp", "avif"),
+}
+OPTION_LIMITS = {
+    "chunk_size": (10, 100),
+    "max_parallel_chunks": (0, None),  # 0 = Default (MAX_PARALLEL_CHUNKS bzw. 1)
+    "image_max_dim": (0, 20000),
+}
+
+
+class JobCancelled(RuntimeError):
+    """Job wurde über die Queue abgebrochen."""
+
+
+def job_options(overrides: dict | None = None) -> dict:
+    """DEFAULT_OPTIONS mit überschriebenen Werten (unbekannte Schlüssel werden ignoriert)."""
+    opts = dict(DEFAULT_OPTIONS)
+    for k, v in (overrides or {}).items():
+        if k in opts:
+            opts[k] = v
+    return opts
+
+
+def _check_cancel(cancel_event) -> None:
+    if cancel_event is not None and cancel_event.is_set():
+        raise JobCancelled("Job abgebrochen")
+
+def slugify(name: str) -> str:
+    base = os.path.splitext(os.path.basename(name))[0]
+    base = re.sub(r"[^\w\-]+","-", base.lower()).strip("-")
+    return base or f"doc-{int(time.time())}"
+
+def write_frontmatter(md_text: str, title: str, src_name: str, tags: list[str]) -> str:
+    fm = {
+        "title": title,
+        "source_file": src_name,
+        "imported_at": datetime.now().isoformat(timespec="seconds"),
+        "tags": tags
+    }
+    return f"---\n{json.dumps(fm, ensure_ascii=False, indent=2)}\n---\n\n{md_text}"
+
+# Post-Processing als Zeilen-Pipeline: ein Durchgang, vorkompilierte Muster, auch für Dateien.
+# Ergebnis identisch zur früheren Mehrfach-Pass-Variante (Regex über den ganzen Text, splitlines,
+# Footer-Filter, Leerzeilen-Regex). Die frühere Häufigkeitszählung kurzer Zeilen entfällt: sie
+# erkannte nur Zeilen, die der Footer-Test ohnehin verwirft.
+_PP_IMAGE_RE = re.compile(r'!\[(.*?)\]\((?:\./)?(?:assets/)?([^\)\s]+)\)')
+# reine Seitenzahlen · Seite X / Seite X von Y / Page X / Page X of Y
+_PP_FOOTER_RE = re.compile(r"^(?:\d{1,4}|(seite|page)\s+\d+(\s+(von|of)\s+\d+)?)$")
+_PP_SPACES_RE = re.compile(r" {2,}")
+_PP_BLOCK = 1 << 20
+
+def _pp_lines(chunks, assets_rel: str):
+    # Das Bild-Muster kann "\n" nicht überspannen und "\r\n" liegt nie auf einer Stückgrenze,
+    # daher liefern Regex + splitlines je Stück dieselben Zeilen wie für den ganzen Text.
+    repl = lambda m: f"![{m.group(1)}]({assets_rel}/{m.group(2)})"
+    for chunk in chunks:
+        if "![" in chunk:
+            chunk = _PP_IMAGE_RE.sub(repl, chunk)
+        yield from chunk.splitlines()
+
+def _pp_emit(lines):
+    # Footer-Zeilen verwerfen, Tabellenzeilen normalisieren, 3+ Zeilenumbrüche auf 2 kürzen
+    footer = _PP_FOOTER_RE.match
+    spaces = _PP_SPACES_RE.sub
+    pending = -1  # Leerzeilen seit der letzten Textzeile (-1: noch keine Zeile)
+    for ln in lines:
+        raw = ln.rstrip()
+        if raw:
+            key = raw.lstrip()
+            # Footer beginnen mit einer Ziffer oder s/p – alle anderen Zeilen ohne Regex durchlassen
+            c = key[0]
+            if (c in "sSpP" or c.isdigit() or not c.isascii()) and footer(key.lower()):
+                continue
+            if "|" in raw:
+                raw = spaces(" ", raw)
+            yield "\n" * min(pending + 1, 2) + raw if pending >= 0 else raw
+            pending = 0
+        else:
+            pending += 1
+    if pending > 0:
+        yield "\n" * min(pending, 2)
+
+def iter_postprocess(chunks, assets_rel: str = "./assets"):
+    """
+    Post-Processing als Generator über Textstücke (jedes außer dem letzten endet mit "\n"),
+    liefert Ausgabe-Stücke. Relativiert Bildpfade, entfernt Seitenzahl-/Footer-Zeilen,
+    normalisiert Tabellen-Leerzeichen und fasst 3+ Zeilenumbrüche zu einer Leerzeile zusammen.
+    """
+    return _pp_emit(_pp_lines(chunks, assets_rel))
+
+def _text_chunks(text: str, size: int = _PP_BLOCK):
+    # Großen Text in "\n"-terminierte Stücke teilen, damit Zwischenlisten klein bleiben
+    start, n = 0, len(text)
+    while n - start > size:
+        cut = text.find("\n", start + size) + 1
+        if not cut:
+            break
+        yield text[start:cut]
+        start = cut
+    yield text[start:]
+
+def postprocess_markdown(md_text: str, assets_rel="./assets") -> str:
+    return "".join(iter_postprocess(_text_chunks(md_text), assets_rel))
+
+def _read_chunks(fh, block_size: int = _PP_BLOCK):
+    # Blockweise lesen, jeweils bis zum letzten "\n" (nicht an "\r" wie die Zeilen-Iteration mit newline="")
+    rest = ""
+    while True:
+        block = fh.read(block_size)
+        if not block:
+            break
+        block = rest + block
+        cut = block.rfind("\n") + 1
+        rest = block[cut:]
+        if cut:
+            yield block[:cut]
+    yield rest
+
+def postprocess_file(src_path: str, dst_path: str, assets_rel: str = "./assets") -> None:
+    """postprocess_markdown für Dateien, ohne das Dokument vollständig in den Speicher zu laden."""
+    with open(src_path, "r", encoding="utf-8", newline="") as src, \
+            open(dst_path, "w", encoding="utf-8", newline="") as dst:
+        for part in iter_postprocess(_read_chunks(src), assets_rel):
+            dst.write(part)
+
+
+# Helper: Entfernt YAML-Frontmatter am Dokumentanfang, falls vorhanden.
+def strip_frontmatter(md: str) -> str:
+    """Entfernt YAML-Frontmatter am Dokumentanfang, falls vorhanden."""
+    if md.lstrip().startswith("---"):
+        lines = md.splitlines()
+        if lines and lines[0].strip() == "---":
+            for i in range(1, len(lines)):
+                if lines[i].strip() == "---":
+                    return "\n".join(lines[i+1:]).lstrip("\n")
+    return md
+
+_MERGE_BLANKS_RE = re.compile(r"\n{3,}")
+_MERGE_ANCHOR_RE = re.compile(r"[^a-z0-9\-]+")
+
+def merge_markdown(docs: list[tuple[str, str]], use_headings: bool = True, add_toc: bool = True,
+                   drop_frontmatter: bool = True, sep: str = "\n\n---\n\n") -> str:
+    """
+    Merge-Tab: docs [(Dateiname, Text), ...] in Namensreihenfolge zu einem Dokument zusammenführen,
+    optional mit Dateiname als H2, Inhaltsverzeichnis und ohne Frontmatter.
+    """
+    parts = []
+    toc = ["## Inhalt"] if add_toc else []
+    ordered = sorted(docs, key=lambda d: d[0].lower())
+    for idx, (name, text) in enumerate(ordered, start=1):
+        if drop_frontmatter:
+            text = strip_frontmatter(text)
+        heading = os.path.splitext(os.path.basename(name))[0]
+        anchor = _MERGE_ANCHOR_RE.sub("-", heading.lower()).strip("-")
+        if use_headings:
+            parts.append(f"\n\n<a name=\"{anchor}\"></a>\n## {heading}\n\n")
+        if add_toc:
+            toc.append(f"- [{heading}](#{anchor})")
+        parts.append(text.strip())
+        if idx != len(ordered) and sep:
+            parts.append(sep)
+
+    merged = ("\n\n".join(toc) + "\n\n" if toc else "") + "\n".join(parts)
+    # sanfte Normalisierung: 3+ Zeilenumbrüche auf 2 kürzen
+    return _MERGE_BLANKS_RE.sub("\n\n", merged)
+
+# Job-Log liegt in job_store (SQLite); die Helfer bleiben als dünne Wrapper erhalten
+JOBLOG_KEYS = job_store.KEYS
+
+def log_job(row: dict):
+    job_store.log(row)
+
+def read_joblog_last(n: int = 10):
+    return job_store.last(n)
+
+def convert_markitdown(path: str) -> str:
+    with engine_registry.lease("markitdown") as md:
+        res = md.convert(path)
+    return res.text_content
+
+def convert_docling(path: str, ocr_engine: str = "auto") -> str:
+    # Docling-Converter kommt aus der Registry (einmal gebaut je OCR-Backend, danach wiederverwendet)
+    want_ocr = os.path.splitext(path)[1].lower() in [".pdf", ".png", ".jpg", ".jpeg", ".tif", ".tiff"]
+
+    with engine_registry.lease("docling", ocr_engine) as conv:
+        # Vor-OCR für Tesseract via ocrmypdf (optional, falls installiert)
+        if ocr_engine == "tesseract" and want_ocr:
+            ocr_out = None
+            try:
+                tmp_pdf = path
+                if path.lower().endswith(".pdf"):
+                    ocr_out = tempfile.NamedTemporaryFile(suffix=".pdf", delete=False).name
+                    subprocess.run(["ocrmypdf", "--skip-text", path, ocr_out, "--optimize", "0"], check=True)
+                    tmp_pdf = ocr_out
+                # Danach normale Konvertierung auf OCR-PDF
+                return conv.convert(tmp_pdf).document.export_to_markdown()
+            except Exception as _:
+                # Fallback: normale Konvertierung
+                pass
+            finally:
+                _remove_quietly(ocr_out)
+        result = conv.convert(path)
+        return result.document.export_to_markdown()
+
+def convert_pptx2md(path: str, out_dir: str) -> str:
+    # legt Bilder im Ordner an; schreibt stdout als MD
+    import subprocess, os
+    assets = os.path.join(out_dir, "assets")
+    os.makedirs(assets, exist_ok=True)
+    # --img-dir legt das Ziel für exportierte Bilder fest
+    res = subprocess.run(
+        ["pptx2md", path, "--img-dir", assets],
+        check=True, capture_output=True, text=True
+    )
+    return res.stdout
+
+
+def _marker_advice(force_ocr: bool, keep_images: bool) -> str:
+    tips = [
+        "Prüfe, ob das PDF passwortgeschützt oder beschädigt ist.",
+        f"Schalte OCR {'aus' if force_ocr else 'ein'} (Option „OCR forcieren“) und versuche es erneut.",
+        "Setze die Chunk-Größe kleiner (z. B. 10–15 Seiten).",
+        "Lass testweise Bilder-Extraktion an, falls Layout-Analyse an Bilder gebunden ist.",
+        "Teste die gleiche Datei einmal mit Docling (Engine „Docling“), um ein Datei- oder Parserproblem auszuschließen.",
+    ]
+    if not keep_images:
+        tips.append("Hinweis: Bilder-Extraktion ist deaktiviert – das ist ok, kann aber die Layout-Erkennung beeinflussen.")
+    return "- " + "\n- ".join(tips)
+
+def convert_marker_cli(path: str, out_dir: str, force_ocr: bool, keep_images: bool, live_cb=None, threads: int | None = None, use_worker: bool = False, cancel_event=None) -> tuple[str, str]:
+    """
+    Runs Marker and returns (markdown_text, debug_log).
+    With use_worker, the job goes to a persistent marker_worker process (models preloaded);
+    if no worker is available, marker_single is used.
+    On failure, tries a fallback run toggling --force_ocr.
+    Raises RuntimeError with combined stderr if both attempts fail.
+    live_cb: optional callback(line:str) for live logs.
+    threads: optional CPU thread limit for the marker process (used when chunks run in parallel).
+    cancel_event: optional threading.Event; when set, marker_single is killed and JobCancelled is raised.
+    """
+    env = None
+    if threads:
+        env = dict(os.environ, OMP_NUM_THREADS=str(threads), MKL_NUM_THREADS=str(threads))
+
+    def _run_marker(_force_ocr: bool) -> tuple[bool, str, str]:
+        if use_worker and marker_worker is not None:
+            try:
+                ok, worker_logs = marker_worker.run_job(path, out_dir, _force_ocr, keep_images, live_cb=live_cb, threads=threads, cancel_event=cancel_event)
+                _check_cancel(cancel_event)
+                return ok, "", worker_logs
+            except marker_worker.WorkerUnavailable as e:
+                # Abbruch trennt die Verbindung → kein Fallback auf marker_single
+                _check_cancel(cancel_event)
+                if callable(live_cb):
+                    live_cb(f"[marker-worker] nicht verfügbar ({e}) → marker_single")
+        # Modell-Laden und Inferenz laufen hier in einem Prozess → ein gemeinsamer Span
+        with spans.span("marker_single", force_ocr=_force_ocr):
+            args = [
+                "marker_single",
+                path,
+                "--output_format", "markdown",
+                "--output_dir", out_dir,
+            ]
+            if _force_ocr:
+                args.append("--force_ocr")
+            if not keep_images:
+                args.append("--disable_image_extraction")
+
+            if callable(live_cb) or cancel_event is not None:
+                # Stream live output
+                proc = subprocess.Popen(args, text=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, bufsize=1, env=env,
+                                        start_new_session=cancel_event is not None)
+                if cancel_event is not None:
+                    # Abbruch auch dann, wenn Marker gerade keine Ausgabe schreibt; ganze Prozessgruppe beenden
+                    def _reap():
+                        while proc.poll() is None:
+                            if cancel_event.wait(0.5):
+                                try:
+                                    os.killpg(proc.pid, signal.SIGKILL)
+                                except OSError:
+                                    pass
+                                return
+                    threading.Thread(target=_reap, daemon=True).start()
+                # nur das Ende behalten (für Fehlermeldungen); das vollständige Log geht über live_cb in die Job-Log-Datei
+                collected = log_stream.LogTail()
+                try:
+                    for line in proc.stdout:
+                        line = line.rstrip("\n")
+                        collected.append(line)
+                        if callable(live_cb):
+                            live_cb(line)
+                finally:
+                    proc.wait()
+                _check_cancel(cancel_event)
+                ok = proc.returncode == 0
+                return ok, collected.text(), ""  # stderr gemerged in stdout
+            else:
+                # capture stdout/stderr to show in UI
+                proc = subprocess.run(args, text=True, capture_output=True, env=env)
+                ok = proc.returncode == 0
+                return ok, proc.stdout, proc.stderr
+
+    # First attempt
+    ok1, out1, err1 = _run_marker(force_ocr)
+    if ok1:
+        # Pick newest .md from out_dir (recursive)
+        md_candidates = []
+        for root, _dirs, files in os.walk(out_dir):
+            for n in files:
+                if n.lower().endswith(".md"):
+                    md_candidates.append(os.path.join(root, n))
+        if not md_candidates:
+            raise RuntimeError(
+                "Marker hat keine Markdown-Datei erzeugt.\n\nLogs:\n" + (err1 or out1 or "(keine Logs)") +
+                "\n\nEmpfehlungen:\n" + _marker_advice(force_ocr, keep_images)
+            )
+        md_candidates.sort(key=lambda p: os.path.getmtime(p), reverse=True)
+        with open(md_candidates[0], "r", encoding="utf-8") as fh:
+            md_text = fh.read()
+        # Sanity check: empty or trivially short output is suspicious
+        if not md_text or len(md_text.strip()) < 50:
+            raise RuntimeError(
+                "Sanity check fehlgeschlagen: Marker hat eine ungewöhnlich kurze Markdown-Datei erzeugt.\n\n"
+                "Empfehlungen:\n" + _marker_advice(force_ocr, keep_images)
+            )
+        return md_text, err1 or ""
+
+    # Fallback attempt: toggle force_ocr
+    ok2, out2, err2 = _run_marker(not force_ocr)
+    if ok2:
+        md_candidates = []
+        for root, _dirs, files in os.walk(out_dir):
+            for n in files:
+                if n.lower().endswith(".md"):
+                    md_candidates.append(os.path.join(root, n))
+        if not md_candidates:
+            raise RuntimeError(
+                "Marker (Fallback) hat keine Markdown-Datei erzeugt.\n\nErster Lauf:\n{}\n\nFallback-Logs:\n{}\n\nEmpfehlungen:\n{}".format(
+                    err1 or "(keine Logs)", err2 or "(keine Logs)", _marker_advice(force_ocr, keep_images)
+                )
+            )
+        md_candidates.sort(key=lambda p: os.path.getmtime(p), reverse=True)
+        with open(md_candidates[0], "r", encoding="utf-8") as fh:
+            md_text = fh.read()
+        # Sanity check: empty or trivially short output is suspicious
+        if not md_text or len(md_text.strip()) < 50:
+            raise RuntimeError(
+                "Sanity check fehlgeschlagen: Marker hat eine ungewöhnlich kurze Markdown-Datei erzeugt.\n\n"
+                "Empfehlungen:\n" + _marker_advice(force_ocr, keep_images)
+            )
+        return md_text, (err1 or "") + "\n" + (err2 or "")
+
+    # Both failed: raise with combined logs
+    combined = "First attempt (force_ocr={}):\n{}\n\nFallback (force_ocr={}):\n{}".format(
+        force_ocr, err1 or out1 or "(no logs)", not force_ocr, err2 or out2 or "(no logs)"
+    )
+    raise RuntimeError("Marker failed on both attempts.\n\n" + combined + "\n\nEmpfehlungen:\n" + _marker_advice(force_ocr, keep_images))
+
+
+def _convert_chunk(idx: int, tmp_pdf: str, start: int, end: int, chunk_out: str, force_ocr: bool, keep_images: bool, threads: int | None, log_q, use_worker: bool = False, ocr_engine: str = "auto", cancel_event=None) -> tuple[str, list[str], str]:
+    """
+    Konvertiert einen einzelnen Chunk (Marker, Fallback Docling). Läuft im Worker-Thread.
+    Live-Zeilen gehen in log_q (nicht direkt an Streamlit), Rückgabe: (md_text, logs, engine).
+    """
+    with spans.span("chunk", chunk=idx, pages=f"{start}-{end}") as sp:
+        logs = []
+        live = (lambda line: log_q.put(f"[chunk {idx:02d}] {line}")) if log_q is not None else None
+        try:
+            md_text, mk_logs = convert_marker_cli(tmp_pdf, chunk_out, force_ocr, keep_images, live_cb=live, threads=threads, use_worker=use_worker, cancel_event=cancel_event)
+            used = "marker"
+            logs.append(f"[chunk {idx} {start}-{end}] MARKER ok")
+            if mk_logs:
+                logs.append(mk_logs)
+        except JobCancelled:
+            raise
+        except Exception as e:
+            logs.append(f"[chunk {idx} {start}-{end}] MARKER failed: {e}")
+            try:
+                _check_cancel(cancel_event)
+                with spans.span("docling_fallback", chunk=idx):
+                    md_text = convert_docling(tmp_pdf, ocr_engine)
+                used = "docling"
+                logs.append(f"[chunk {idx} {start}-{end}] DOCLING ok")
+            except Exception as e2:
+                logs.append(f"[chunk {idx} {start}-{end}] DOCLING failed: {e2}")
+                raise RuntimeError("\n".join(logs))
+        sp["engine"] = used
+    return md_text, logs, used
+
+def _drain_live_logs(log_q, live_cb) -> None:
+    # Live-Logs nur im Script-Thread ausgeben (Streamlit-Aufrufe aus Worker-Threads sind nicht erlaubt)
+    if log_q is None:
+        return
+    while True:
+        try:
+            line = log_q.get_nowait()
+        except queue.Empty:
+            return
+        live_cb(line)
+
+# Chunk-Manifest je Zielordner: erledigte Chunks werden bei einem erneuten Lauf übernommen
+CHUNK_MANIFEST = "_chunk_manifest.json"
+CHUNK_RESULT = "_chunk_result.md"
+
+def _load_chunk_manifest(target_dir: str) -> dict:
+    try:
+        with open(os.path.join(target_dir, CHUNK_MANIFEST), "r", encoding="utf-8") as fh:
+            return json.load(fh)
+    except Exception:
+        return {}
+
+def _save_chunk_manifest(target_dir: str, manifest: dict) -> None:
+    path = os.path.join(target_dir, CHUNK_MANIFEST)
+    with open(path + ".tmp", "w", encoding="utf-8") as fh:
+        json.dump(manifest, fh, ensure_ascii=False, indent=2)
+    os.replace(path + ".tmp", path)
+
+def convert_marker_chunked(src_pdf: str, target_dir: str, force_ocr: bool, keep_images: bool, chunk_size: int, live_cb=None, cleanup: bool = False, max_parallel: int = 1, use_worker: bool = False, adaptive: bool = False, ocr_routing: bool = False, info: dict | None = None, meta: dict | None = None, ocr_engine: str = "auto", cancel_event=None) -> tuple[str, str]:
+    """
+    Verarbeitet ein PDF in Chunks mit Marker. Fällt pro Chunk auf Docling zurück.
+    Bis zu max_parallel Chunks laufen gleichzeitig; die Ergebnisse werden in Seitenreihenfolge gemergt.
+    Fortschritt steht im Chunk-Manifest (target_dir/_chunk_manifest.json): bei einem erneuten Lauf
+    werden nur fehlende/fehlgeschlagene Chunks oder Chunks mit geänderten Seiten konvertiert.
+    adaptive: Chunks nach geschätzten Seitenkosten statt fester Seitenzahl schneiden (chunk_size = Ziel-Kosten).
+    ocr_routing: OCR-Bedarf je Seite bestimmen; Chunks werden an OCR-/Text-Grenzen geteilt und nur
+    Chunks mit Scan-Seiten laufen mit --force_ocr (force_ocr wird dann ignoriert).
+    info: optionales dict, in das das gewählte Layout geschrieben wird (info["chunk_layout"]).
+    meta: Probe-Datensatz (doc_probe.probe); ohne Angabe wird er hier erstellt bzw. aus dem Cache gelesen.
+    ocr_engine: OCR-Backend für den Docling-Fallback je Chunk.
+    cancel_event: bei gesetztem Event werden keine weiteren Chunks gestartet, laufende abgebrochen (JobCancelled).
+    Gibt (merged_markdown, combined_logs) zurück.
+    """
+    if meta is None or (ocr_routing and not meta.get("text_stats")):
+        meta = doc_probe.probe(src_pdf, sha=(meta or {}).get("sha256"), text_stats=ocr_routing)
+    pages_info = meta.get("page_info") or []
+    costs = [page_cost(p) for p in pages_info] if adaptive else None
+    ranges = build_page_chunks(len(pages_info), chunk_size, costs)
+    ocr_flags = None
+    if ocr_routing:
+        ocr_flags = [bool(p["needs_ocr"]) for p in pages_info]
+        ranges = split_ranges_by_flag(ranges, ocr_flags)
+    chunk_ocr = [ocr_flags[s - 1] for s, _e in ranges] if ocr_flags is not None else [bool(force_ocr)] * len(ranges)
+    layout = ("adaptiv " if adaptive else "fest ") + describe_chunk_layout(ranges, costs, ocr_flags)
+    if info is not None:
+        info["chunk_layout"] = layout
+    chunk_dirs = [os.path.join(target_dir, f"_chunk_{idx:02d}") for idx in range(1, len(ranges) + 1)]
+
+    # Manifest abgleichen: Seitenbereich, Seiten-Hash, Status, Chunk-Einstellungen (OCR, Bilder, OCR-Backend
+    # des Docling-Fallbacks) und gespeichertes Ergebnis müssen passen
+    source_sha = meta["sha256"]
+    manifest = _load_chunk_manifest(target_dir)
+    prev = {(c.get("start"), c.get("end")): c for c in manifest.get("chunks", [])}
+    page_hashes = doc_probe.chunk_hashes(meta, ranges)
+    entries = []
+    todo: list[int] = []
+    for idx, ((start, end), pages_sha, chunk_out) in enumerate(zip(ranges, page_hashes, chunk_dirs), start=1):
+        old = prev.get((start, end)) or {}
+        if (old.get("idx") == idx and old.get("status") == "ok" and old.get("pages_sha256") == pages_sha
+                and old.get("force_ocr") == chunk_ocr[idx - 1]
+                and old.get("keep_images") == bool(keep_images) and old.get("ocr_engine") == ocr_engine
+                and os.path.isfile(os.path.join(chunk_out, CHUNK_RESULT))):
+            entries.append(old)
+            continue
+        # Chunk neu konvertieren: alte Teilergebnisse verwerfen
+        shutil.rmtree(chunk_out, ignore_errors=True)
+        os.makedirs(chunk_out, exist_ok=True)
+        entries.append({"idx": idx, "start": start, "end": end, "pages_sha256": pages_sha,
+                        "force_ocr": chunk_ocr[idx - 1], "keep_images": bool(keep_images), "ocr_engine": ocr_engine, "engine": "", "status": "pending", "error": "", "result": os.path.join(os.path.basename(chunk_out), CHUNK_RESULT)})
+        todo.append(idx)
+    manifest = {"version": 1, "source": os.path.basename(src_pdf), "source_sha256": source_sha,
+                "chunk_size": int(chunk_size), "adaptive": bool(adaptive), "chunks": entries}
+    _save_chunk_manifest(target_dir, manifest)
+
+    workers = max(1, min(int(max_parallel or 1), len(todo) or 1))
+    # CPU-Kerne auf die parallelen Marker-Prozesse aufteilen (sonst Überbelegung durch Torch-Threads)
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    log_q = queue.Queue() if callable(live_cb) else None
+
+    chunk_logs: dict[int, list[str]] = {}
+    errors: dict[int, str] = {}
+    logs = [f"[layout] {layout}"]
+    if ocr_flags is not None:
+        ocr_pages = sum(ocr_flags)
+        logs.append(f"[ocr] pro Seite: {ocr_pages}/{len(ocr_flags)} Seiten mit OCR, {sum(chunk_ocr)}/{len(ranges)} Chunks mit --force_ocr")
+    logs += [
+        f"[parallel] {len(ranges)} Chunks ({len(ranges) - len(todo)} aus Manifest), max. {workers} parallel, {threads} Threads je Marker-Prozess",
+    ]
+    for entry in entries:
+        if entry["idx"] not in todo:
+            chunk_logs[entry["idx"]] = [f"[chunk {entry['idx']} {entry['start']}-{entry['end']}] aus Manifest übernommen ({entry.get('engine') or '?'})"]
+
+    # Chunks werden erst geschrieben, wenn ein Worker frei wird (max. workers + 1 Dateien gleichzeitig),
+    # und nach der Konvertierung sofort gelöscht. Splitten überlappt so mit laufenden Marker-Jobs.
+    workdir = tempfile.mkdtemp(prefix="mdconv_chunks_")
+    try:
+        chunk_iter = chunk_pdf(src_pdf, chunk_size, ranges=ranges, only=set(todo), workdir=workdir)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="chunk") as pool:
+            futures = {}
+            pending = set()
+            exhausted = not todo
+            while pending or not exhausted:
+                if cancel_event is not None and cancel_event.is_set():
+                    exhausted = True
+                while not exhausted and len(pending) < workers + 1:
+                    t_split = time.perf_counter()
+                    nxt = next(chunk_iter, None)
+                    if nxt is None:
+                        exhausted = True
+                        break
+                    idx, tmp_pdf, (start, end) = nxt
+                    spans.record("chunk_pdf", t_split, chunk=idx)
+                    fut = pool.submit(spans.bind(_convert_chunk), idx, tmp_pdf, start, end, chunk_dirs[idx - 1], chunk_ocr[idx - 1], keep_images, threads, log_q, use_worker, ocr_engine, cancel_event)
+                    futures[fut] = (idx, tmp_pdf)
+                    pending.add(fut)
+                if not pending:
+                    continue
+                done, pending = wait(pending, timeout=0.25, return_when=FIRST_COMPLETED)
+                _drain_live_logs(log_q, live_cb)
+                for fut in done:
+                    idx, tmp_pdf = futures.pop(fut)
+                    _remove_quietly(tmp_pdf)
+                    entry = entries[idx - 1]
+                    try:
+                        md_text, chunk_logs[idx], used = fut.result()
+                        with open(os.path.join(chunk_dirs[idx - 1], CHUNK_RESULT), "w", encoding="utf-8") as oh:
+                            oh.write(md_text)
+                        entry.update(status="ok", engine=used, error="")
+                    except JobCancelled:
+                        entry.update(status="pending", error="abgebrochen")
+                    except Exception as e:
+                        # Übrige Chunks laufen weiter: ihr Ergebnis landet im Manifest und spart den nächsten Versuch
+                        errors[idx] = str(e)
+                        entry.update(status="failed", error=str(e)[-2000:])
+                    _save_chunk_manifest(target_dir, manifest)
+            _drain_live_logs(log_q, live_cb)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    # Fertige Chunks bleiben im Manifest und werden beim nächsten Lauf übernommen
+    _check_cancel(cancel_event)
+
+    # Logs in Seitenreihenfolge zusammenstellen
+    for idx in range(1, len(ranges) + 1):
+        if idx in chunk_logs:
+            logs.extend(chunk_logs[idx])
+        elif idx in errors:
+            logs.append(errors[idx])
+    if errors:
+        done_cnt = sum(1 for e in entries if e["status"] == "ok")
+        logs.append(f"[manifest] {done_cnt}/{len(entries)} Chunks gesichert – ein erneuter Lauf konvertiert nur die fehlenden.")
+        raise RuntimeError("\n".join(logs))
+
+    # Merge aus den im Manifest gesicherten Ergebnissen
+    md_parts: list[tuple[str, tuple[int,int]]] = []
+    chunk_assets_dirs: list[str] = []
+    for entry, chunk_out in zip(entries, chunk_dirs):
+        with open(os.path.join(chunk_out, CHUNK_RESULT), "r", encoding="utf-8") as fh:
+            md_text = fh.read()
+        # Determine asset source for this chunk: prefer <chunk>/assets, otherwise the chunk root
+        src_assets = os.path.join(chunk_out, "assets") if os.path.isdir(os.path.join(chunk_out, "assets")) else chunk_out
+        chunk_assets_dirs.append(src_assets)
+        md_parts.append((md_text, (entry["start"], entry["end"])))
+
+    with spans.span("merge_chunk_output", chunks=len(md_parts)):
+        merged_md, assets_report = merge_chunk_output(md_parts, os.path.join(target_dir, "assets"), chunk_assets_dirs)
+    if assets_report:
+        logs.append(assets_report)
+    # Optional: temporäre Chunk-Ordner (und Manifest) entfernen
+    if cleanup:
+        for d in chunk_dirs:
+            try:
+                shutil.rmtree(d, ignore_errors=True)
+            except Exception:
+                pass
+        try:
+            os.remove(os.path.join(target_dir, CHUNK_MANIFEST))
+        except OSError:
+            pass
+    return merged_md, "\n".join(logs)
+
+def convert_plain_text(path: str) -> str:
+    with open(path, "r", encoding="utf-8", errors="ignore") as fh:
+        return fh.read()
+def page_cost(info: dict) -> float:
+    """
+    Geschätzte Marker-Kosten einer Seite in "Textseiten-Äquivalenten" (1.0 = A4-Seite mit Textlayer).
+    Signale aus doc_probe: Seitenfläche, Textlayer (sonst OCR), Anzahl Bilder.
+    """
+    area = (info.get("width", 595.0) * info.get("height", 842.0)) / (595.0 * 842.0)
+    cost = min(4.0, max(0.5, area))
+    # OCR-Bedarf: aus der Seiten-Klassifikation, sonst "kein Textlayer"
+    if info.get("needs_ocr", not info.get("has_text")):
+        cost *= 3.0  # OCR über die ganze Seite
+    cost += 0.25 * min(int(info.get("images", 0)), 20)
+    return round(cost, 2)
+
+def build_page_chunks(total_pages: int, chunk_size: int, costs: list[float] | None = None) -> list[tuple[int,int]]:
+    """
+    Seitenbereiche (1-basiert). Ohne costs: feste chunk_size Seiten je Chunk.
+    Mit costs (adaptiv): Seiten werden gruppiert, bis ein Chunk die Ziel-Kosten chunk_size erreicht
+    (mindestens 1 Seite, höchstens 4 × chunk_size Seiten).
+    Raises ValueError bei chunk_size < 1.
+    """
+    if chunk_size < 1:
+        raise ValueError(f"chunk_size muss >= 1 sein, nicht {chunk_size}")
+    chunks = []
+    if costs is None:
+        start = 1
+        while start <= total_pages:
+            end = min(start + chunk_size - 1, total_pages)
+            chunks.append((start, end))
+            start = end + 1
+        return chunks
+    start, acc = 1, 0.0
+    for page in range(1, total_pages + 1):
+        c = costs[page - 1]
+        size = page - start
+        if size > 0 and (acc + c > chunk_size or size >= 4 * chunk_size):
+            chunks.append((start, page - 1))
+            start, acc = page, 0.0
+        acc += c
+    if start <= total_pages:
+        chunks.append((start, total_pages))
+    return chunks
+
+def split_ranges_by_flag(ranges: list[tuple[int,int]], flags: list[bool]) -> list[tuple[int,int]]:
+    """Teilt Seitenbereiche dort, wo das Seiten-Flag (z. B. OCR nötig) wechselt; Reihenfolge bleibt erhalten."""
+    out = []
+    for (s, e) in ranges:
+        start = s
+        for p in range(s + 1, e + 1):
+            if flags[p - 1] != flags[p - 2]:
+                out.append((start, p - 1))
+                start = p
+        out.append((start, e))
+    return out
+
+def describe_chunk_layout(ranges: list[tuple[int,int]], costs: list[float] | None = None, ocr_flags: list[bool] | None = None) -> str:
+    # Kompakte Layout-Beschreibung für Logs/Job-Log, z. B. "1-12:19.8 13-20:20.1+ocr"
+    parts = []
+    for s, e in ranges:
+        item = f"{s}-{e}" if costs is None else f"{s}-{e}:{sum(costs[s-1:e]):.1f}"
+        if ocr_flags is not None and ocr_flags[s - 1]:
+            item += "+ocr"
+        parts.append(item)
+    return " ".join(parts)
+
+def _remove_quietly(path: str | None) -> None:
+    try:
+        if path:
+            os.remove(path)
+    except OSError:
+        pass
+
+def _qpdf_split(src_path: str, start: int, end: int, out_path: str) -> bool:
+    # Nativer Splitter (qpdf ist im Image); False → pypdf-Fallback
+    try:
+        res = subprocess.run(
+            ["qpdf", "--empty", "--pages", src_path, f"{start}-{end}", "--", out_path],
+            capture_output=True, text=True
+        )
+        # Exit 3 = Warnungen, Datei ist trotzdem geschrieben
+        return res.returncode in (0, 3) and os.path.getsize(out_path) > 0
+    except Exception:
+        return False
+
+def chunk_pdf(src_path: str, chunk_size: int, ranges: list[tuple[int,int]] | None = None, only: set[int] | None = None, workdir: str | None = None):
+    """
+    Generator: schneidet src_path in PDFs mit je chunk_size Seiten (oder entlang ranges) und liefert
+    (idx, pdf_path, (start,end)) – 1-basiert – sobald der jeweilige Chunk geschrieben ist.
+    only: optional Menge von Chunk-Indizes; andere Chunks werden übersprungen.
+    workdir: Zielordner der Chunk-Dateien (Default: Temp-Ordner). Der Aufrufer löscht die Dateien nach Gebrauch.
+    Große Dateien (>= QPDF_SPLIT_MIN_MB) werden mit qpdf gesplittet, sonst pypdf.
+    """
+    reader = None
+    if ranges is None:
+        from pypdf import PdfReader
+        reader = PdfReader(src_path)
+        ranges = build_page_chunks(len(reader.pages), chunk_size)
+    use_qpdf = (
+        shutil.which("qpdf") is not None
+        and os.path.getsize(src_path) >= QPDF_SPLIT_MIN_MB * 1024 * 1024
+    )
+    for idx, (start, end) in enumerate(ranges, start=1):
+        if only is not None and idx not in only:
+            continue
+        fd, tmp = tempfile.mkstemp(suffix=".pdf", prefix=f"chunk_{idx:03d}_", dir=workdir)
+        os.close(fd)
+        if not (use_qpdf and _qpdf_split(src_path, start, end, tmp)):
+            from pypdf import PdfReader, PdfWriter
+            if reader is None:
+                reader = PdfReader(src_path)
+            writer = PdfWriter()
+            for p in range(start, end+1):
+                writer.add_page(reader.pages[p-1])
+            with open(tmp, "wb") as oh:
+                writer.write(oh)
+        yield idx, tmp, (start, end)
+
+_ASSET_EXT_RE = re.compile(r"\.(png|jpe?g|webp|gif|svg|tif|tiff|bmp|heic|avif)$", re.IGNORECASE)
+
+_CHUNK_IMAGE_RE = re.compile(r'!\[(.*?)\]\(([^)\s]+)\)')
+
+def rewrite_chunk_links(md_text: str, names: dict[str, str], prefix: str) -> str:
+    """Bildlinks eines Chunks auf ./assets/<name> umschreiben: names (Dateiname → Ablagename), sonst prefix + Dateiname."""
+    def _rewr_any(m):
+        alt, href = m.group(1), m.group(2)
+        # Skip external/data/anchor links
+        if href.startswith(("http://", "https://", "data:", "#")):
+            return m.group(0)
+        fname = os.path.basename(href)
+        return f"![{alt}](./assets/{names.get(fname) or prefix + fname})"
+    return _CHUNK_IMAGE_RE.sub(_rewr_any, md_text)
+
+def merge_chunk_output(md_parts: list[tuple[str, tuple[int,int]]], final_assets_dir: str, chunk_assets_dirs: list[str]) -> tuple[str, str]:
+    """
+    md_parts: Liste [(md_text, (start,end)), ...]
+    chunk_assets_dirs: parallele Liste mit Pfaden zu den assets-Quellordnern je Chunk
+    Legt Assets in final_assets_dir ab (Hardlinks aus dem Asset-Speicher, Name = Inhalts-Hash; ohne Speicher
+    Kopie mit Chunk-Präfix), schreibt die Links um, baut eine TOC pro Chunk und setzt Überschriften.
+    """
+    os.makedirs(final_assets_dir, exist_ok=True)
+    merged = []
+    toc = ["## Inhalt (Chunks)"]
+    report_lines = []
+    for idx, ((md_text, (start, end)), src_assets) in enumerate(zip(md_parts, chunk_assets_dirs), start=1):
+        anchor = f"chunk-{idx:02d}-seiten-{start}-{end}"
+        heading = f"## Chunk {idx:02d} (Seiten {start}–{end})"
+        toc.append(f"- [{heading[3:]}](#{anchor})")
+
+        prefix = f"c{idx:02d}_"
+        found_cnt = 0
+        copied_cnt = 0
+        linked_cnt = 0
+        # Dateiname im Chunk → Name in final_assets_dir (mit Asset-Speicher: Inhalts-Hash)
+        names: dict[str, str] = {}
+        if os.path.isdir(src_assets):
+            # Copy images recursively (Marker kann Unterordner wie images/, figures/ etc. anlegen)
+            for root, _dirs, files in os.walk(src_assets):
+                for name in files:
+                    if _ASSET_EXT_RE.search(name):
+                        found_cnt += 1
+                        src = os.path.join(root, name)
+                        if asset_store is not None:
+                            new_name, linked = asset_store.place(src, final_assets_dir)
+                            names.setdefault(name, new_name)
+                            if linked:
+                                linked_cnt += 1
+                            else:
+                                copied_cnt += 1
+                            continue
+                        dst = os.path.join(final_assets_dir, prefix + name)
+                        try:
+                            shutil.copy2(src, dst)
+                            copied_cnt += 1
+                        except Exception:
+                            base, ext = os.path.splitext(name)
+                            k = 1
+                            while True:
+                                alt = f"{prefix}{base}_{k}{ext}"
+                                dst_alt = os.path.join(final_assets_dir, alt)
+                                if not os.path.exists(dst_alt):
+                                    shutil.copy2(src, dst_alt)
+                                    copied_cnt += 1
+                                    break
+                                k += 1
+        # Berichtzeile je Chunk
+        report_lines.append(f"[assets] Chunk {idx:02d} {start}-{end}: gefunden={found_cnt}, kopiert={copied_cnt}, verlinkt={linked_cnt}, quelle='{src_assets}'")
+
+        # Bildlinks im Markdown auf ./assets/ umschreiben (Inhalts-Name bzw. Chunk-Präfix)
+        md_text = rewrite_chunk_links(md_text, names, prefix)
+
+        # Abschnitt in den Merge-Container aufnehmen
+        merged.append(f"\n\n<a name=\"{anchor}\"></a>\n{heading}\n\n{md_text}")
+
+    merged_text = "\n\n".join(toc) + "\n\n" + "\n\n".join(merged)
+    return merged_text, "\n".join(report_lines)
+
+# Helper: get page count of a PDF (aus dem gecachten Probe-Datensatz)
+def get_pdf_page_count(path: str) -> int:
+    pages = doc_probe.probe(path).get("pages")
+    return pages if pages is not None else -1
+
+def choose_engine(path: str, engine_choice: str, prefer_text_layer: bool = False, meta: dict | None = None) -> str:
+    ext = os.path.splitext(path)[1].lower()
+    if engine_choice != "Auto":
+        return engine_choice
+    # Heuristik:
+    if ext in [".pdf"]:
+        # Digitale PDFs mit sauberem Textlayer brauchen keine Layout-Modelle
+        if prefer_text_layer and (meta or doc_probe.probe(path)).get("text_layer_ok"):
+            return "PDF-Text"
+        return "Marker"       # sehr gute PDF-Qualität
+    if ext in [".ppt", ".pptx"]:
+        return "pptx2md"
+    if ext in [".txt"]:
+        return "plain"
+    if ext in [".ppt", ".pptx", ".doc", ".docx", ".xls", ".xlsx", ".html", ".htm", ".epub"]:
+        return "MarkItDown"
+    # Fallback
+    return "Docling"
+
+def run_engine(pick: str, input_path: str, target_dir: str, opts: dict, live_cb=None, note_cb=None, info: dict | None = None, meta: dict | None = None, cancel_event=None) -> tuple[str, str]:
+    """
+    Engine-Dispatch mit den Job-Einstellungen opts (siehe DEFAULT_OPTIONS).
+    Rückgabe: (md_text, engine_logs); engine_logs ist nur bei Marker gefüllt.
+    note_cb: optional callback(text:str) für Hinweise (z. B. Auto-Chunk).
+    info: optionales dict für Job-Metadaten (z. B. chunk_layout).
+    meta: Probe-Datensatz der Eingabe (doc_probe.probe), wird bei Bedarf erstellt.
+    cancel_event: optional threading.Event zum Abbrechen (wirkt sofort bei Marker, sonst nach dem Engine-Lauf).
+    """
+    if pick == "MarkItDown":
+        return convert_markitdown(input_path), ""
+    if pick == "Docling":
+        return convert_docling(input_path, opts["ocr_engine"]), ""
+    if pick == "pptx2md":
+        return convert_pptx2md(input_path, target_dir), ""
+    if pick == "plain":
+        return convert_plain_text(input_path), ""
+    if pick == "PDF-Text":
+        return pdf_text.convert(input_path), ""
+    # Marker (CLI / Worker)
+    chunk_size = int(opts["chunk_size"])
+    is_pdf = input_path.lower().endswith(".pdf")
+    if is_pdf:
+        meta = meta or doc_probe.probe(input_path)
+        pc = meta["pages"] if meta.get("pages") is not None else -1
+        # OCR-Routing braucht den Chunk-Pfad auch unterhalb der Auto-Chunk-Schwelle
+        if pc != -1 and (pc > int(AUTO_CHUNK_THRESHOLD) or (opts["ocr_routing"] and pc > 1)):
+            if callable(note_cb):
+                if pc > int(AUTO_CHUNK_THRESHOLD):
+                    note_cb(f"Auto-Chunk aktiv: {pc} Seiten > {int(AUTO_CHUNK_THRESHOLD)} → Chunk-Größe {chunk_size} ({opts['chunk_mode']}).")
+                else:
+                    note_cb(f"OCR pro Seite: {pc} Seiten werden nach Textlayer/Scan gruppiert.")
+            return convert_marker_chunked(
+                input_path, target_dir, opts["force_ocr"], opts["keep_images"], chunk_size,
+                live_cb=live_cb,
+                cleanup=opts["cleanup_chunks"],
+                max_parallel=int(opts["max_parallel_chunks"]),
+                use_worker=opts["use_marker_worker"],
+                adaptive=opts["chunk_mode"] == "adaptiv",
+                ocr_routing=opts["ocr_routing"],
+                info=info,
+                meta=meta,
+                ocr_engine=opts["ocr_engine"],
+                cancel_event=cancel_event
+            )
+    return convert_marker_cli(
+        input_path, target_dir, opts["force_ocr"], opts["keep_images"],
+        live_cb=live_cb,
+        use_worker=opts["use_marker_worker"],
+        cancel_event=cancel_event
+    )
+
+def conversion_settings(pick: str, opts: dict) -> dict:
+    """Einstellungen, die das Engine-Ergebnis beeinflussen (Teil des Cache-Schlüssels)."""
+    settings = {"engine": pick}
+    if pick == "Marker":
+        # Docling ist Fallback je Chunk → OCR-Backend gehört mit in den Schlüssel
+        settings.update(force_ocr=bool(opts["force_ocr"]), keep_images=bool(opts["keep_images"]), chunk_size=int(opts["chunk_size"]), chunk_mode=opts["chunk_mode"], ocr_routing=bool(opts["ocr_routing"]), ocr_engine=opts["ocr_engine"])
+    elif pick == "Docling":
+        settings.update(ocr_engine=opts["ocr_engine"])
+    return settings
+
+def run_engine_cached(pick: str, input_path: str, target_dir: str, opts: dict, live_cb=None, note_cb=None, info: dict | None = None, meta: dict | None = None, cancel_event=None) -> tuple[str, str, str]:
+    """
+    Wie run_engine, aber über den Konvertierungs-Cache.
+    Rückgabe: (md_text, engine_logs, cache_state) mit cache_state "hit", "miss" oder "" (Cache aus).
+    """
+    if not opts["use_cache"] or conversion_cache is None:
+        with spans.span(f"engine:{pick}"):
+            md_text, logs = run_engine(pick, input_path, target_dir, opts, live_cb=live_cb, note_cb=note_cb, info=info, meta=meta, cancel_event=cancel_event)
+        return md_text, logs, ""
+    with spans.span("cache_lookup") as sp:
+        source_sha = meta["sha256"] if meta else doc_probe.file_sha256(input_path)
+        key = conversion_cache.make_key(source_sha, pick, conversion_settings(pick, opts))
+        cached = conversion_cache.lookup(key, target_dir)
+        sp["hit"] = cached is not None
+    if cached is not None:
+        return cached, f"[cache] Treffer {key[:12]} – keine Engine ausgeführt", "hit"
+    with spans.span(f"engine:{pick}"):
+        md_text, logs = run_engine(pick, input_path, target_dir, opts, live_cb=live_cb, note_cb=note_cb, info=info, meta=meta, cancel_event=cancel_event)
+    _check_cancel(cancel_event)
+    try:
+        with spans.span("cache_store"):
+            conversion_cache.store(key, md_text, target_dir, info={"source": os.path.basename(input_path), "sha256": source_sha, "engine": pick})
+    except Exception as e:
+        logs = (logs + "\n" if logs else "") + f"[cache] Speichern fehlgeschlagen: {e}"
+    return md_text, logs, "miss"
+
+def ocr_label(pick: str, opts: dict) -> str:
+    """OCR-Backend für Job-Log/Auswertung: Docling-OCR-Engine bzw. Marker-OCR-Modus."""
+    if pick == "Docling":
+        return opts["ocr_engine"]
+    if pick == "Marker":
+        return "marker-pro-seite" if opts["ocr_routing"] else ("marker-force" if opts["force_ocr"] else "")
+    return ""
+
+def convert_file(input_path: str, opts: dict, live_cb=None, note_cb=None, cancel_event=None) -> dict:
+    """
+    Kompletter Job für eine Eingabedatei: Probe, Engine-Wahl, Konvertierung (mit Cache),
+    Post-Processing, Frontmatter, Schreiben nach OUT_DIR/<slug>/ und Job-Log-Eintrag.
+    Rückgabe: dict mit engine, output_path, duration_ms, cache, chunk_layout, pages, logs, image_bytes_saved, spans.
+    Bei Fehlern wird der Job-Log-Eintrag geschrieben und die Exception weitergereicht.
+    Die Zeiten der einzelnen Stufen (spans.py) stehen mit dem Job-Log-Eintrag in job_store.
+    """
+    t0 = time.time()
+    src_name = os.path.basename(input_path)
+    slug = slugify(src_name)
+    base_name = (opts.get("output_name") or "").strip() or slug
+    target_dir = opts.get("output_dir") or os.path.join(OUT_DIR, slug)
+    os.makedirs(os.path.join(target_dir, "assets"), exist_ok=True)
+
+    row = {"source": src_name, "engine": opts["engine"]}
+    trace = spans.Trace("job", source=src_name)
+    with trace:
+        try:
+            with spans.span("probe"):
+                meta = doc_probe.probe(input_path)
+            pick = choose_engine(input_path, opts["engine"], prefer_text_layer=opts["auto_pdf_text"], meta=meta)
+            row.update(engine=pick, ocr=ocr_label(pick, opts),
+                       pages=meta.get("pages") or "", probe=doc_probe.summarize(meta))
+            if callable(note_cb):
+                note_cb(f"Engine: {pick} · {row['probe']}")
+            job_info = {}
+            md_text, engine_logs, cache_state = run_engine_cached(
+                pick, input_path, target_dir, opts,
+                live_cb=live_cb, note_cb=note_cb, info=job_info, meta=meta, cancel_event=cancel_event
+            )
+            images = None
+            if opts["image_optimize"] and asset_optimize is not None:
+                # Bilder im Prozess-Pool umrechnen, während der Text nachbearbeitet wird
+                t_images = time.perf_counter()
+                refs = {m.group(2) for m in _PP_IMAGE_RE.finditer(md_text)}
+                images = asset_optimize.start(os.path.join(target_dir, "assets"), refs,
+                                              fmt=opts["image_format"], max_dim=int(opts["image_max_dim"]))
+            with spans.span("postprocess_markdown"):
+                md_text = postprocess_markdown(md_text, assets_rel="./assets")
+            image_stats = None
+            if images is not None:
+                renames, image_stats = images.result()
+                spans.record("asset_optimize", t_images, images=len(refs))
+                md_text = asset_optimize.rewrite_links(md_text, renames)
+                engine_logs = (engine_logs + "\n" if engine_logs else "") + asset_optimize.describe(image_stats)
+            with spans.span("write"):
+                if opts["add_frontmatter"]:
+                    md_text = write_frontmatter(md_text, title=slug, src_name=src_name, tags=list(opts["tags"]))
+                out_md = os.path.join(target_dir, f"{base_name}.md")
+                with open(out_md, "w", encoding="utf-8") as oh:
+                    oh.write(md_text)
+        except Exception as e:
+            status = "cancelled" if isinstance(e, JobCancelled) else "error"
+            row.update(timestamp=datetime.now().isoformat(timespec="seconds"), duration_ms=int((time.time() - t0) * 1000),
+                       output_path="", status=status, error=str(e), spans=trace.finish(status=status))
+            log_job(row)
+            raise
+        job_spans = trace.finish(engine=pick, cache=cache_state or "off")
+    dur_ms = int((time.time() - t0) * 1000)
+    if opts["delete_after_success"]:
+        try:
+            delete_from_inbox(input_path)
+        except Exception:
+            pass
+    row.update(timestamp=datetime.now().isoformat(timespec="seconds"), duration_ms=dur_ms, output_path=out_md,
+               status="ok", error="", cache=cache_state, chunk_layout=job_info.get("chunk_layout", ""), spans=job_spans)
+    log_job(row)
+    engine_logs = (engine_logs + "\n" if engine_logs else "") + spans.describe(job_spans)
+    return {"engine": pick, "output_path": out_md, "duration_ms": dur_ms, "cache": cache_state,
+            "chunk_layout": job_info.get("chunk_layout", ""), "pages": meta.get("pages") or 0, "logs": engine_logs,
+            "image_bytes_saved": image_stats["bytes_before"] - image_stats["bytes_after"] if image_stats else 0,
+            "spans": job_spans}
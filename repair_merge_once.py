@@ -1,38 +1,59 @@
 # repair_merge_once.py
 import os, re, shutil, sys
 
+try:
+    import asset_store
+except Exception:
+    asset_store = None
+
 base = sys.argv[1]  # z.B. ./data/out/hr_folien_ws_2021-1
 final_md = os.path.join(base, "hr_folien_ws_2021-1.md")
 assets = os.path.join(base, "assets")
 os.makedirs(assets, exist_ok=True)
 
-# 1) Assets einsammeln & präfixen
-chunks = sorted([d for d in os.listdir(base) if d.startswith("_chunk_")])
-for i, d in enumerate(chunks, start=1):
-    prefix = f"c{i:02d}_"
+# 1) Assets einsammeln: mit Asset-Speicher als Hardlink unter Inhalts-Namen, sonst Kopie mit Präfix.
+#    Marker nummeriert Bilder in jedem Chunk neu (_page_0_Picture_1.jpeg …) → Zuordnung je Chunk.
+names = {}  # (Chunk-Nr., Dateiname) → Name in assets/
+chunks = sorted([d for d in os.listdir(base) if re.fullmatch(r"_chunk_\d+", d)])
+for d in chunks:
+    idx = int(d[len("_chunk_"):])
+    prefix = f"c{idx:02d}_"
     co = os.path.join(base, d)
     cand = os.path.join(co, "assets") if os.path.isdir(os.path.join(co,"assets")) else co
     for name in os.listdir(cand):
         src = os.path.join(cand, name)
         if os.path.isfile(src) and re.search(r"\.(png|jpg|jpeg|webp|gif|svg)$", name, re.I):
-            shutil.copy2(src, os.path.join(assets, prefix + name))
+            if asset_store is not None:
+                names.setdefault((idx, name), asset_store.place(src, assets)[0])
+            else:
+                shutil.copy2(src, os.path.join(assets, prefix + name))
+                names.setdefault((idx, name), prefix + name)
 
-# 2) Links in der finalen MD umschreiben
+# 2) Links in der finalen MD je Chunk-Abschnitt umschreiben (Anker aus merge_chunk_output)
 with open(final_md, "r", encoding="utf-8") as f:
     md = f.read()
 
-def rewr(m):
-    alt, href = m.group(1), m.group(2)
-    if href.startswith(("http://","https://","data:", "#")):
-        return m.group(0)
-    fname = os.path.basename(href)
-    # versuche, Prefix anhand Chunknummer zu schätzen: _chunk_XX im Kontext
-    # (Fallback: kein Mapping → belasse fname, damit wenigstens Assets da sind)
-    return f"![{alt}](./assets/{fname})"
+def rewrite_section(text, idx):
+    def rewr(m):
+        alt, href = m.group(1), m.group(2)
+        if href.startswith(("http://","https://","data:", "#")):
+            return m.group(0)
+        fname = os.path.basename(href)
+        if idx is None:
+            # vor dem ersten Chunk-Anker: keine Zuordnung möglich, Link unverändert auf assets/
+            return f"![{alt}](./assets/{fname})"
+        # ohne Treffer auf den Präfix-Namen zeigen (sichtbar kaputt statt falsches Bild)
+        return f"![{alt}](./assets/{names.get((idx, fname)) or f'c{idx:02d}_{fname}'})"
+    return re.sub(r'!\[(.*?)\]\(([^)\s]+)\)', rewr, text)
 
-md = re.sub(r'!\[(.*?)\]\(([^)\s]+)\)', rewr, md)
+parts = re.split(r'(<a name="chunk-(\d+)-seiten-[^"]*"></a>)', md)
+out = [rewrite_section(parts[0], None)]
+for k in range(1, len(parts), 3):
+    anchor, num, text = parts[k], parts[k + 1], parts[k + 2]
+    out.append(anchor + rewrite_section(text, int(num)))
+md = "".join(out)
 
 with open(final_md, "w", encoding="utf-8") as f:
     f.write(md)
 
-print("Reparatur abgeschlossen:", final_md)
\ No newline at end of file
+print("Reparatur abgeschlossen:", final_md)
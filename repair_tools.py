@@ -1,6 +1,6 @@
-import re, json, os
+import re, io, json, os, tempfile, itertools
 from datetime import datetime
-from typing import Tuple, List, Dict, Any
+from typing import Tuple, List, Dict, Any, Iterable, Iterator
 
 # -------- Frontmatter helpers --------
 
@@ -50,160 +50,370 @@ def _parse_json_frontmatter(front: str) -> Dict[str, Any]:
 def _compose_json_frontmatter(data: Dict[str, Any]) -> str:
     return f"---\n{json.dumps(data, ensure_ascii=False, indent=2)}\n---\n"
 
-# -------- Text block helpers (protect code blocks) --------
+# -------- Token stream --------
+# The body is split into lines once (str.splitlines semantics) and each line becomes one
+# token (kind, line): "fence" for ``` lines, "code" inside a fenced block, "prose" otherwise.
+# All repairs run over this single stream; no step re-splits or rescans the text.
 
-_FENCE_RE = re.compile(r"^```.*$")
+_LINE_BREAKS = "\n\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029"
+_READ_BLOCK = 1 << 20
 
-def _split_code_blocks(text: str) -> List[Tuple[bool, str]]:
-    """Split into [(is_code, chunk), ...] preserving order."""
-    parts: List[Tuple[bool, str]] = []
-    buf: List[str] = []
+def tokenize(lines: Iterable[str]) -> Iterator[Tuple[str, str]]:
+    """Yield (kind, line); a fence is a line starting with ``` after leading whitespace."""
     in_code = False
-    for ln in text.splitlines():
-        if _FENCE_RE.match(ln.strip()):
-            # push current buffer
-            if buf:
-                parts.append((in_code, "\n".join(buf) + "\n"))
-                buf = []
-            # toggle state including the fence line itself
-            parts.append((True, ln + "\n"))
+    for ln in lines:
+        if "```" in ln and ln.strip().startswith("```"):
             in_code = not in_code
+            yield "fence", ln
         else:
-            buf.append(ln)
-    if buf:
-        parts.append((in_code, "\n".join(buf) + ("\n" if text.endswith("\n") else "")))
-    return parts
+            yield ("code" if in_code else "prose"), ln
+
+class _FileLines:
+    """Lines of a text file (opened with newline="") with str.splitlines semantics, read block by block."""
+    def __init__(self, fh):
+        self.fh = fh
+        self.ends_with_newline = False
 
-def _join_code_blocks(parts: List[Tuple[bool, str]]) -> str:
-    return "".join(chunk for _is_code, chunk in parts)
+    def __iter__(self) -> Iterator[str]:
+        carry = ""
+        while True:
+            block = self.fh.read(_READ_BLOCK)
+            if not block:
+                break
+            self.ends_with_newline = block.endswith("\n")
+            parts = (carry + block).splitlines(True)
+            carry = parts.pop() if parts else ""
+            # a trailing "\r" may be the first half of a "\r\n" split across blocks
+            if carry and carry[-1] in _LINE_BREAKS and carry[-1] != "\r":
+                parts.append(carry)
+                carry = ""
+            for p in parts:
+                yield p[:-2] if p.endswith("\r\n") else p[:-1]
+        if carry:
+            yield carry[:-1] if carry[-1] in _LINE_BREAKS else carry
 
-# -------- Repairs --------
+# -------- Repair passes --------
 
-def _normalize_headings(text: str) -> str:
-    """Ensure H levels don't jump more than +1; keep at least one leading '#'.
-    Only handle lines starting with '#'.
+class RepairPass:
+    """One repair step over the token stream.
+    prose(line) rewrites a prose line (code is never passed in); reset() is called at every fence,
+    so per-section state starts fresh after a code block.
     """
-    out = []
-    last_level = None
-    for ln in text.splitlines():
-        m = re.match(r"^(#{1,6})\s+(.*)$", ln)
+    def prose(self, line: str) -> str:
+        return line
+
+    def reset(self) -> None:
+        pass
+
+_HEADING_RE = re.compile(r"^(#{1,6})\s+(.*)$")
+_LIST_RE = re.compile(r"^(\s*)([-*+]|[0-9]+\.)\s+(.*)$")
+_ORDERED_RE = re.compile(r"^[0-9]+\.$")
+_QUOTE_RE = re.compile(r"\"([^\"]{1,80})\"")
+
+class HeadingLevels(RepairPass):
+    """Ensure H levels don't jump more than +1; keep at least one leading '#'."""
+    def __init__(self):
+        self.last_level = None
+
+    def reset(self) -> None:
+        self.last_level = None
+
+    def prose(self, line: str) -> str:
+        if not line.startswith("#"):
+            return line
+        m = _HEADING_RE.match(line)
         if not m:
-            out.append(ln)
-            continue
+            return line
         hashes, title = m.group(1), m.group(2)
         lvl = len(hashes)
-        if last_level is None:
-            last_level = lvl
+        if self.last_level is None:
+            self.last_level = lvl
         # Avoid upward jumps larger than 1
-        if last_level is not None and lvl > last_level + 1:
-            lvl = last_level + 1
-        # Avoid lvl==0 (not possible) and cap at 6
+        if lvl > self.last_level + 1:
+            lvl = self.last_level + 1
         lvl = max(1, min(6, lvl))
-        out.append("#" * lvl + " " + title.strip())
-        last_level = lvl
-    return "\n".join(out)
+        self.last_level = lvl
+        return "#" * lvl + " " + title.strip()
 
-def _fix_lists(text: str) -> str:
+class ListMarkers(RepairPass):
     """Normalize bullet markers to '-', ensure single space after marker, 2-space indents for nesting."""
-    out = []
-    for ln in text.splitlines():
-        m = re.match(r"^(\s*)([-*+]|[0-9]+\.)\s+(.*)$", ln)
+    def prose(self, line: str) -> str:
+        m = _LIST_RE.match(line)
         if not m:
-            out.append(ln)
-            continue
+            return line
         indent, marker, rest = m.groups()
         # keep ordered lists as "1." but normalize spacing; unordered to "-"
-        if re.match(r"^[0-9]+\.$", marker):
-            new_marker = marker  # keep numbering
-        else:
-            new_marker = "-"
+        new_marker = marker if _ORDERED_RE.match(marker) else "-"
         # normalize indent to multiples of 2 spaces
         ind_len = len(indent.replace("\t", "  "))
-        new_indent = " " * (2 * (ind_len // 2))
-        out.append(f"{new_indent}{new_marker} {rest.strip()}")
-    return "\n".join(out)
-
-def _close_unbalanced_code_fences(text: str) -> str:
-    """If the number of ``` fences is odd, append one closing fence at end."""
-    fence_count = len(re.findall(r"^```", text, flags=re.MULTILINE))
-    if fence_count % 2 != 0:
-        return text.rstrip() + "\n```\n"
-    return text
-
-def _fix_german_quotes(text: str) -> str:
-    """Replace straight quotes with „…“ on non-code lines without backticks; conservative regex."""
-    out = []
-    for ln in text.splitlines():
-        if "`" in ln:  # skip inline/code
-            out.append(ln)
-            continue
-        # replace "word or phrase" with „word or phrase“
-        def repl(m):
-            inner = m.group(1)
-            return f"„{inner}“"
-        ln2 = re.sub(r"\"([^\"]{1,80})\"", repl, ln)
-        out.append(ln2)
-    return "\n".join(out)
-
-def _regenerate_toc_if_marked(text: str) -> str:
-    """Regenerate TOC only if markers are present: <!-- TOC --> ... <!-- /TOC -->."""
-    start = text.find("<!-- TOC -->")
-    end = text.find("<!-- /TOC -->")
-    if start == -1 or end == -1 or end <= start:
-        return text
-
-    body_before = text[:start]
-    body_after = text[end + len("<!-- /TOC -->"):]
-    main = text[start:end]
-
-    # collect headings from body_after (whole doc) — simple slugify
-    def _slug(s: str) -> str:
-        s = s.strip().lower()
-        s = re.sub(r"[^\w\s-]", "", s, flags=re.UNICODE)
-        s = re.sub(r"\s+", "-", s)
-        return s
-
-    headings = re.findall(r"^(#{1,6})\s+(.*)$", body_after, flags=re.MULTILINE)
-    items = []
-    for hashes, title in headings:
-        level = len(hashes)
-        anchor = _slug(title)
-        indent = "  " * (level - 1)
-        items.append(f"{indent}- [{title}](#{anchor})")
-
-    toc_md = "\n".join(items) + "\n"
-    return body_before + "<!-- TOC -->\n" + toc_md + "<!-- /TOC -->" + body_after
-
-def _validate_asset_links(text: str, assets_dir: str = "") -> str:
-    """Append an HTML comment report about asset link validity.
-    If assets_dir exists, we check file existence for ./assets/<name>.
+        return f"{' ' * (2 * (ind_len // 2))}{new_marker} {rest.strip()}"
+
+class GermanQuotes(RepairPass):
+    """Replace straight quotes with „…“ on lines without backticks; conservative regex."""
+    def prose(self, line: str) -> str:
+        if '"' not in line or "`" in line:
+            return line
+        return _QUOTE_RE.sub(lambda m: f"„{m.group(1)}“", line)
+
+def default_passes(apply_quotes: bool = True) -> List[RepairPass]:
+    passes: List[RepairPass] = [HeadingLevels(), ListMarkers()]
+    if apply_quotes:
+        passes.append(GermanQuotes())
+    return passes
+
+# -------- Document checks (code fences, TOC, asset links) --------
+
+_TOC_START = "<!-- TOC -->"
+_TOC_END = "<!-- /TOC -->"
+_HASHES_ONLY_RE = re.compile(r"(#{1,6})(\s*)")
+_SLUG_DROP_RE = re.compile(r"[^\w\s-]", flags=re.UNICODE)
+_SLUG_SPACE_RE = re.compile(r"\s+")
+_LINK_RE = re.compile(r"!\[[^\]]*\]\(([^)]+)\)")
+
+def _slug(s: str) -> str:
+    s = s.strip().lower()
+    s = _SLUG_DROP_RE.sub("", s)
+    return _SLUG_SPACE_RE.sub("-", s)
+
+class _TocCollector:
     """
-    links = re.findall(r"!\[[^\]]*\]\(([^)]+)\)", text)
-    report = ["validation: assets"]
-    ok = 0
-    missing = 0
-    unknown = 0
-    for href in links:
+    Headings after the TOC end marker, matching re.findall(r"^(#{1,6})\\s+(.*)$", ..., re.M) on the text:
+    a line of only hashes takes the next non-blank line as its title. Only lines starting with '#'
+    (or any line while such a title is pending) need to be fed.
+    """
+    def __init__(self):
+        self.items: List[List[str]] = []
+        self.open = None  # [hashes, whitespace/newline seen] while waiting for the title line
+        self._last_end = -1  # end offset of the line that gave the last item
+
+    def line(self, ln: str, line_end: int) -> None:
+        if self.open is not None:
+            if not ln or ln.isspace():
+                self.open[1] = True
+                return
+            self.items.append([self.open[0], ln.lstrip()])
+            self.open = None
+            self._last_end = line_end
+            return
+        m = _HASHES_ONLY_RE.fullmatch(ln)
+        if m:
+            self.open = [m.group(1), bool(m.group(2))]
+            return
+        m = _HEADING_RE.match(ln)
+        if m:
+            self.items.append([m.group(1), m.group(2)])
+            self._last_end = line_end
+
+    def rstrip(self, text_end: int) -> None:
+        """The text was rstripped to text_end: a heading on the last line loses its trailing whitespace."""
+        if self.items and self._last_end >= text_end:
+            self.items[-1][1] = self.items[-1][1].rstrip()
+
+    def finish(self) -> str:
+        if self.open is not None and self.open[1]:
+            self.items.append([self.open[0], ""])
+        lines = [f"{'  ' * (len(hashes) - 1)}- [{title}](#{_slug(title)})" for hashes, title in self.items]
+        return "\n".join(lines) + "\n"
+
+class _LinkReport:
+    """Asset-link validation over the final text, fed in pieces (a link may span lines and pieces)."""
+    def __init__(self, assets_dir: str):
+        self.assets_dir = assets_dir if assets_dir and os.path.isdir(assets_dir) else ""
+        self.report = ["validation: assets"]
+        self.ok = self.missing = self.unknown = 0
+        self._carry: List[str] = []
+        self._need = ""  # character the held-back candidate still waits for ("" = any)
+
+    def feed(self, text: str) -> None:
+        if self._carry:
+            self._carry.append(text)
+            if self._need and self._need not in text:
+                return
+            text = "".join(self._carry)
+            self._carry = []
+        end = 0
+        for m in _LINK_RE.finditer(text):
+            self._check(m.group(1))
+            end = m.end()
+        self._hold(text, end)
+
+    def _hold(self, text: str, pos: int) -> None:
+        # keep the text from the first "![" that could still complete into a link
+        while True:
+            p = text.find("![", pos)
+            if p == -1:
+                if text.endswith("!"):
+                    self._carry, self._need = ["!"], "["
+                return
+            close = text.find("]", p + 2)
+            if close == -1:
+                self._carry, self._need = [text[p:]], "]"
+                return
+            if close + 1 == len(text):
+                self._carry, self._need = [text[p:]], ""
+                return
+            if text[close + 1] == "(" and text.find(")", close + 2) == -1:
+                self._carry, self._need = [text[p:]], ")"
+                return
+            pos = p + 2
+
+    def _check(self, href: str) -> None:
         if href.startswith(("http://", "https://", "data:", "#")):
-            continue
+            return
         # normalize
-        href_norm = href
-        if href_norm.startswith("./"):
-            href_norm = href_norm[2:]
-        if href_norm.startswith("assets/"):
-            if assets_dir and os.path.isdir(assets_dir):
-                p = os.path.join(assets_dir, os.path.basename(href_norm))
-                if os.path.exists(p):
-                    ok += 1
-                    report.append(f"OK {href}")
-                else:
-                    missing += 1
-                    report.append(f"MISSING {href}")
+        href_norm = href[2:] if href.startswith("./") else href
+        if not href_norm.startswith("assets/"):
+            return
+        if self.assets_dir:
+            if os.path.exists(os.path.join(self.assets_dir, os.path.basename(href_norm))):
+                self.ok += 1
+                self.report.append(f"OK {href}")
             else:
-                unknown += 1
-                report.append(f"UNKNOWN {href} (assets_dir not provided)")
-    report.append(f"SUMMARY ok={ok} missing={missing} unknown={unknown}")
-    return text.rstrip() + "\n\n<!-- " + " | ".join(report) + " -->\n"
+                self.missing += 1
+                self.report.append(f"MISSING {href}")
+        else:
+            self.unknown += 1
+            self.report.append(f"UNKNOWN {href} (assets_dir not provided)")
+
+    def comment(self) -> str:
+        report = self.report + [f"SUMMARY ok={self.ok} missing={self.missing} unknown={self.unknown}"]
+        return "\n\n<!-- " + " | ".join(report) + " -->\n"
+
+class _RStripWriter:
+    """Holds back trailing whitespace, so the written text can be rstripped without buffering it."""
+    def __init__(self, write):
+        self._write = write
+        self._ws = ""
+        self.pos = 0  # characters written so far, without held-back whitespace after rstrip()
+
+    def write(self, s: str) -> None:
+        if not s:
+            return
+        self.pos += len(s)
+        body = s.rstrip()
+        if not body:
+            self._ws += s
+            return
+        self._write(self._ws + body)
+        self._ws = s[len(body):]
+
+    def rstrip(self) -> None:
+        self.pos -= len(self._ws)
+        self._ws = ""
+
+_FLUSH_LINES = 4096
+
+def _repair_stream(tokens: Iterable[Tuple[str, str]], write, passes: List[RepairPass],
+                   regen_toc: bool) -> Tuple[int, int, str]:
+    """
+    Phase 1: apply passes, close an unbalanced fence, locate the TOC markers and collect the TOC.
+    Trailing blank lines are not written (the body is rstripped anyway). Returns (toc_start, toc_end, toc_md)
+    as offsets into the written text; toc_start == -1 if there is no TOC to regenerate.
+    """
+    out = _RStripWriter(write)
+    buf: List[str] = []
+    pos = 0  # length of the text so far (written + buffered)
+    toc = _TocCollector()
+    start = end = -1
+    fences = 0
+    kind = ""
+    first = True
+    # empty prose lines are held back until the next line: at the end of the document they are dropped
+    empty = 0
+
+    def newlines(n: int) -> None:
+        nonlocal pos
+        if n > 0:
+            buf.append("\n" * n)
+            pos += n
+            if toc.open is not None:
+                toc.open[1] = True
+
+    for kind, ln in tokens:
+        if kind == "prose":
+            for p in passes:
+                ln = p.prose(ln)
+            if not ln:
+                empty += 1
+                continue
+        elif kind == "fence":
+            for p in passes:
+                p.reset()
+            if ln.startswith("```"):
+                fences += 1
+        if empty:
+            newlines(empty - 1 if first else empty)
+            first, empty = False, 0
+        if not first:
+            ln = "\n" + ln
+        first = False
+        if regen_toc:
+            if end != -1:
+                if ln.startswith("#", 1) or toc.open is not None:
+                    toc.line(ln[1:], pos + len(ln))
+            else:
+                if start == -1 and _TOC_START in ln:
+                    start = pos + ln.find(_TOC_START)
+                if _TOC_END in ln:
+                    i = ln.find(_TOC_END) + len(_TOC_END)
+                    end = pos + i
+                    toc.line(ln[i:], pos + len(ln))
+        buf.append(ln)
+        pos += len(ln)
+        if len(buf) >= _FLUSH_LINES:
+            out.write("".join(buf))
+            buf.clear()
+    out.write("".join(buf))
+    if fences % 2:
+        out.rstrip()
+        toc.rstrip(out.pos)
+        out.write("\n```\n")
+        if end != -1:
+            toc.line("```", out.pos)
+            toc.line("", out.pos)
+    # a line of only hashes at the very end has no title line left to take
+    toc.open = None
+    if start == -1 or end == -1 or end - len(_TOC_END) <= start:
+        return -1, -1, ""
+    return start, end, toc.finish()
+
+def _spliced(read, start: int, end: int, toc_md: str) -> Iterator[str]:
+    """Phase 2: the phase-1 text (read(n) returns the next n characters) with the TOC region replaced."""
+    def copy(n):
+        while n is None or n > 0:
+            part = read(_READ_BLOCK if n is None else min(_READ_BLOCK, n))
+            if not part:
+                return
+            if n is not None:
+                n -= len(part)
+            yield part
+    if start == -1:
+        yield from copy(None)
+        return
+    yield from copy(start)
+    yield _TOC_START + "\n" + toc_md + _TOC_END
+    for _part in copy(end - start):
+        pass
+    yield from copy(None)
+
+def _finish_body(pieces: Iterable[str], write, assets_dir: str) -> None:
+    """Write the final body (rstripped, leading newlines dropped) followed by the asset-link report."""
+    leading = True
+    def write_body(s: str) -> None:
+        nonlocal leading
+        if leading:
+            s = s.lstrip("\n")
+            if not s:
+                return
+            leading = False
+        write(s)
+    out = _RStripWriter(write_body)
+    links = _LinkReport(assets_dir)
+    for part in pieces:
+        links.feed(part)
+        out.write(part)
+    out.rstrip()
+    write_body(links.comment())
 
 def _ensure_frontmatter_template(data: Dict[str, Any], extra_tags: List[str]) -> Dict[str, Any]:
     # base fields
@@ -225,17 +435,8 @@ def _ensure_frontmatter_template(data: Dict[str, Any], extra_tags: List[str]) ->
 
 # -------- Public API --------
 
-def load_markdown_and_repair(
-    md_text: str,
-    extra_tags: list[str],
-    *,
-    apply_quotes: bool = True,
-    regen_toc: bool = True,
-    fm_overrides: Dict[str, Any] | None = None,
-    assets_dir: str | None = None,
-) -> str:
-    # 1) Frontmatter split & parse
-    fm_text, body = _split_frontmatter(md_text)
+def _frontmatter_data(fm_text: str, extra_tags: List[str], fm_overrides: Dict[str, Any] | None,
+                      assets_dir: str | None) -> Dict[str, Any]:
     data = _parse_json_frontmatter(fm_text)
     data = _ensure_frontmatter_template(data, extra_tags or [])
 
@@ -246,37 +447,124 @@ def load_markdown_and_repair(
                 data[k] = fm_overrides[k]
     if assets_dir:
         data["assets_dir"] = assets_dir
+    return data
 
-    # 2) Work on non-code parts for risky transforms (headings, lists, quotes)
-    parts = _split_code_blocks(body)
-
-    repaired_parts: List[Tuple[bool, str]] = []
-    for is_code, chunk in parts:
-        if is_code:
-            repaired_parts.append((True, chunk))
-            continue
-        # operations on prose
-        chunk = _normalize_headings(chunk)
-        chunk = _fix_lists(chunk)
-        if apply_quotes:
-            chunk = _fix_german_quotes(chunk)
-        repaired_parts.append((False, chunk))
+def load_markdown_and_repair(
+    md_text: str,
+    extra_tags: list[str],
+    *,
+    apply_quotes: bool = True,
+    regen_toc: bool = True,
+    fm_overrides: Dict[str, Any] | None = None,
+    assets_dir: str | None = None,
+    passes: List[RepairPass] | None = None,
+) -> str:
+    """
+    Repair a Markdown document: headings, lists and quotes outside code, unbalanced fences,
+    TOC between <!-- TOC --> markers, JSON frontmatter and an asset-link report.
+    passes replaces the default prose passes (HeadingLevels, ListMarkers, GermanQuotes).
+    """
+    # 1) Frontmatter split & parse
+    fm_text, body = _split_frontmatter(md_text)
+    data = _frontmatter_data(fm_text, extra_tags, fm_overrides, assets_dir)
 
-    body_repaired = _join_code_blocks(repaired_parts)
+    # 2) One pass over the token stream: prose repairs, fence balancing, TOC collection
+    if passes is None:
+        passes = default_passes(apply_quotes)
+    phase1 = io.StringIO()
+    start, end, toc_md = _repair_stream(tokenize(body.splitlines()), phase1.write, passes, regen_toc)
 
-    # 3) Ensure code fences balanced
-    body_repaired = _close_unbalanced_code_fences(body_repaired)
+    # 3) TOC splice, asset-link validation, frontmatter
+    out = io.StringIO()
+    out.write(_compose_json_frontmatter(data) + "\n")
+    phase1.seek(0)
+    _finish_body(_spliced(phase1.read, start, end, toc_md), out.write, assets_dir or data.get("assets_dir") or "")
+    return out.getvalue()
 
-    # 4) Optional TOC regeneration if markers are present
-    if regen_toc:
-        body_repaired = _regenerate_toc_if_marked(body_repaired)
+def _read_to_rule(lines: Iterator[str], head: List[str]) -> int | None:
+    for ln in lines:
+        head.append(ln)
+        if ln.strip() == "---":
+            return len(head) - 1
+    return None
 
-    # 5) Compose frontmatter
-    fm_text = _compose_json_frontmatter(data)
+def _split_frontmatter_lines(lines: Iterator[str]) -> Tuple[str, List[str]]:
+    """
+    _split_frontmatter on a line stream: returns (frontmatter, lines already read that belong to the body);
+    the body continues with the rest of the iterator. Only reads ahead while a frontmatter is possible.
+    """
+    head: List[str] = []
+    for ln in lines:
+        head.append(ln)
+        if ln.strip():
+            break
+    if not head or not head[-1].lstrip().startswith("---"):
+        return "", head
+    start = next((i for i, ln in enumerate(head) if ln.strip() == "---"), None)
+    if start is None:
+        start = _read_to_rule(lines, head)
+    end = None
+    if start is not None:
+        end = next((j for j in range(start + 1, len(head)) if head[j].strip() == "---"), None)
+        if end is None:
+            end = _read_to_rule(lines, head)
+    if end is not None and len(head) < 3:
+        head.extend(itertools.islice(lines, 3 - len(head)))
+    if end is None or len(head) < 3:
+        return "", head
+    return "\n".join(head[start:end + 1]) + "\n", head[end + 1:]
 
-    # 6) Validate asset links (only if assets_dir provided)
-    assets_for_validate = assets_dir or data.get("assets_dir") or ""
-    body_repaired = _validate_asset_links(body_repaired, assets_dir=assets_for_validate)
+def _rejoined(lines: Iterator[str], reader: _FileLines) -> Iterator[str]:
+    # _split_frontmatter rejoins the body lines with "\n": a final empty line without newline disappears
+    prev = None
+    for ln in lines:
+        if prev is not None:
+            yield prev
+        prev = ln
+    if prev is not None and (prev or reader.ends_with_newline):
+        yield prev
 
-    # 7) Return combined
-    return fm_text + "\n" + body_repaired.lstrip("\n")
\ No newline at end of file
+def repair_file(
+    src: str,
+    dst: str,
+    extra_tags: list[str],
+    *,
+    apply_quotes: bool = True,
+    regen_toc: bool = True,
+    fm_overrides: Dict[str, Any] | None = None,
+    assets_dir: str | None = None,
+    passes: List[RepairPass] | None = None,
+) -> str:
+    """
+    load_markdown_and_repair for files too large to hold in memory: reads src block by block,
+    writes the repaired document to dst (atomically) and returns dst. Same result as
+    load_markdown_and_repair(open(src).read(), ...).
+    """
+    if passes is None:
+        passes = default_passes(apply_quotes)
+    out_dir = os.path.dirname(os.path.abspath(dst))
+    fd, phase1_path = tempfile.mkstemp(prefix=".repair-", suffix=".md", dir=out_dir)
+    try:
+        with open(src, "r", encoding="utf-8", newline="") as fh, \
+                os.fdopen(fd, "w", encoding="utf-8", newline="") as phase1:
+            reader = _FileLines(fh)
+            lines = iter(reader)
+            fm_text, head = _split_frontmatter_lines(lines)
+            body = itertools.chain(head, lines)
+            if fm_text:
+                body = _rejoined(body, reader)
+            start, end, toc_md = _repair_stream(tokenize(body), phase1.write, passes, regen_toc)
+        data = _frontmatter_data(fm_text, extra_tags, fm_overrides, assets_dir)
+        tmp = dst + ".tmp"
+        with open(phase1_path, "r", encoding="utf-8", newline="") as phase1, \
+                open(tmp, "w", encoding="utf-8", newline="") as out:
+            out.write(_compose_json_frontmatter(data) + "\n")
+            _finish_body(_spliced(phase1.read, start, end, toc_md), out.write,
+                         assets_dir or data.get("assets_dir") or "")
+        os.replace(tmp, dst)
+    finally:
+        try:
+            os.remove(phase1_path)
+        except OSError:
+            pass
+    return dst
@@ -0,0 +1,186 @@
+# Zeitmessung je Pipeline-Stufe: convert_file öffnet einen Trace, die Stufen darin messen sich mit
+#
+#   with spans.span("merge_chunk_output", chunks=12):
+#       ...
+#
+# Ohne aktiven Trace (Repair-Tab, Benchmarks, direkte Aufrufe) ist span() ein No-Op. Der Trace hängt an
+# einer ContextVar; Worker-Threads (Chunks) übernehmen ihn über spans.bind(fn).
+# Die Spans landen mit dem Job-Log-Eintrag in job_store (Spalte spans, JSON) und fließen dort in
+# kumulierte Histogramme je Stufe; prometheus_text() liefert sie im Prometheus-Textformat:
+#
+#   python spans.py metrics [--out /var/lib/node_exporter/md_converter.prom]
+#   python spans.py show [-n 5]        # Stufen der letzten Jobs
+import os, sys, time, argparse, threading, contextvars
+from contextlib import contextmanager
+
+import job_store
+
+# (trace, Index des umschließenden Spans)
+_current: contextvars.ContextVar = contextvars.ContextVar("md_converter_span", default=None)
+
+
+class Trace:
+    """Spans eines Jobs: flache Liste mit Eltern-Index, Zeiten in ms relativ zum Trace-Start."""
+    def __init__(self, name: str = "job", **attrs):
+        self._t0 = time.perf_counter()
+        self._lock = threading.Lock()
+        self._spans = [{"name": name, "start_ms": 0.0, "ms": None, "parent": None, **attrs}]
+        self._token = None
+
+    def _open(self, name: str, parent: int | None, attrs: dict) -> tuple[int, dict]:
+        rec = {"name": name, "start_ms": round((time.perf_counter() - self._t0) * 1000, 1), "ms": None, "parent": parent, **attrs}
+        with self._lock:
+            self._spans.append(rec)
+            return len(self._spans) - 1, rec
+
+    def _close(self, rec: dict) -> None:
+        rec["ms"] = round((time.perf_counter() - self._t0) * 1000 - rec["start_ms"], 1)
+
+    def finish(self, **attrs) -> list[dict]:
+        """Wurzel-Span schließen (einmalig) und alle Spans zurückgeben."""
+        root = self._spans[0]
+        if root["ms"] is None:
+            root.update(attrs)
+            self._close(root)
+        return self.spans()
+
+    def spans(self) -> list[dict]:
+        with self._lock:
+            return [dict(s) for s in self._spans]
+
+    def __enter__(self):
+        self._token = _current.set((self, 0))
+        return self
+
+    def __exit__(self, *exc):
+        self.finish()
+        _current.reset(self._token)
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """Misst den Block als Kind des aktuellen Spans. Liefert ein dict für nachträgliche Attribute."""
+    cur = _current.get()
+    if cur is None:
+        yield {}
+        return
+    trace, parent = cur
+    idx, rec = trace._open(name, parent, attrs)
+    token = _current.set((trace, idx))
+    try:
+        yield rec
+    except BaseException as e:
+        rec["error"] = type(e).__name__
+        raise
+    finally:
+        trace._close(rec)
+        _current.reset(token)
+
+
+def record(name: str, started: float, **attrs) -> None:
+    """Span nachträglich eintragen (started = time.perf_counter() beim Beginn), z. B. bei Generatoren/Futures."""
+    cur = _current.get()
+    if cur is None:
+        return
+    trace, parent = cur
+    _idx, rec = trace._open(name, parent, attrs)
+    rec["start_ms"] = round((started - trace._t0) * 1000, 1)
+    trace._close(rec)
+
+
+def bind(fn):
+    """fn im aktuellen Kontext ausführen (für ThreadPoolExecutor.submit; je Aufruf eine eigene Kopie)."""
+    ctx = contextvars.copy_context()
+    return lambda *args, **kwargs: ctx.run(fn, *args, **kwargs)
+
+
+def describe(spans: list[dict]) -> str:
+    """Eine Log-Zeile: Gesamtzeit und Summe je Stufe (Stufen mit mehreren Spans mit Anzahl)."""
+    if not spans:
+        return ""
+    totals: dict[str, list] = {}
+    for s in spans[1:]:
+        t = totals.setdefault(s["name"], [0, 0.0])
+        t[0] += 1
+        t[1] += s["ms"] or 0.0
+    parts = [f"{name} {'×%d ' % n if n > 1 else ''}{ms / 1000:.2f} s" for name, (n, ms) in totals.items()]
+    return f"[spans] {spans[0]['name']} {(spans[0]['ms'] or 0) / 1000:.2f} s" + (" · " + " · ".join(parts) if parts else "")
+
+
+# -------- Prometheus --------
+
+def _label(v) -> str:
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def prometheus_text(queue_counts: dict | None = None) -> str:
+    """Metriken im Prometheus-Textformat (0.0.4) aus den kumulierten Zählern in job_store."""
+    out = [
+        "# HELP md_converter_stage_duration_seconds Dauer der Pipeline-Stufen (Spans) je Job bzw. Chunk.",
+        "# TYPE md_converter_stage_duration_seconds histogram",
+    ]
+    for st in job_store.stage_histograms():
+        stage = _label(st["stage"])
+        for le, n in st["buckets"]:
+            out.append(f'md_converter_stage_duration_seconds_bucket{{stage="{stage}",le="{le}"}} {n}')
+        out.append(f'md_converter_stage_duration_seconds_sum{{stage="{stage}"}} {round(st["sum_s"], 6)}')
+        out.append(f'md_converter_stage_duration_seconds_count{{stage="{stage}"}} {st["count"]}')
+    out += [
+        "# HELP md_converter_jobs_total Protokollierte Jobs je Engine, Status und Cache-Ergebnis.",
+        "# TYPE md_converter_jobs_total counter",
+    ]
+    counts = job_store.job_counts()
+    for r in counts:
+        out.append(f'md_converter_jobs_total{{engine="{_label(r["engine"])}",status="{_label(r["status"])}",cache="{_label(r["cache"])}"}} {r["jobs"]}')
+    out += [
+        "# HELP md_converter_pages_total Seiten erfolgreich konvertierter Dokumente je Engine.",
+        "# TYPE md_converter_pages_total counter",
+    ]
+    for r in counts:
+        if r["status"] == "ok" and r["pages"]:
+            out.append(f'md_converter_pages_total{{engine="{_label(r["engine"])}",cache="{_label(r["cache"])}"}} {r["pages"]}')
+    if queue_counts is not None:
+        out += ["# HELP md_converter_queue_jobs Jobs in der Queue je Status.", "# TYPE md_converter_queue_jobs gauge"]
+        out += [f'md_converter_queue_jobs{{status="{_label(k)}"}} {v}' for k, v in sorted(queue_counts.items())]
+    return "\n".join(out) + "\n"
+
+
+def write_metrics(path: str, queue_counts: dict | None = None) -> None:
+    """Für den Textfile-Collector von node_exporter: atomar ersetzen."""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        fh.write(prometheus_text(queue_counts))
+    os.replace(tmp, path)
+
+
+def _print_tree(spans: list[dict]) -> None:
+    depth = {}
+    for i, s in enumerate(spans):
+        d = 0 if s["parent"] is None else depth.get(s["parent"], 0) + 1
+        depth[i] = d
+        extra = " ".join(f"{k}={v}" for k, v in s.items() if k not in ("name", "start_ms", "ms", "parent"))
+        print(f"  {'  ' * d}{s['name']:<{max(1, 28 - 2 * d)}} {s['start_ms']:>10.1f} ms  +{s['ms'] or 0:>10.1f} ms  {extra}".rstrip())
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Spans und Metriken der Konvertierungs-Jobs")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    mp = sub.add_parser("metrics", help="Prometheus-Textformat ausgeben bzw. schreiben")
+    mp.add_argument("--out", help="Datei (atomar ersetzt), sonst stdout")
+    sp = sub.add_parser("show", help="Stufen der letzten Jobs")
+    sp.add_argument("-n", type=int, default=5)
+    a = ap.parse_args()
+    if a.cmd == "metrics":
+        try:
+            import job_queue
+            counts = job_queue.counts()
+        except Exception:
+            counts = None
+        if a.out:
+            write_metrics(a.out, counts)
+        else:
+            sys.stdout.write(prometheus_text(counts))
+    elif a.cmd == "show":
+        for row in job_store.recent_spans(a.n):
+            print(f"{row['timestamp']}  {row['source']}  ({row['engine']}, {row['status']})")
+            _print_tree(row["spans"])
@@ -0,0 +1,53 @@
+# Job-Optionen aus API-Query und CLI: Auswahlwerte und Zahlenbereiche wie in der Sidebar, sonst 400 bzw.
+# argparse-Fehler; build_page_chunks lehnt chunk_size < 1 ab (sonst Endlosschleife).
+import os, sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import api  # noqa: E402
+import cli  # noqa: E402
+import pipeline  # noqa: E402
+
+
+@pytest.mark.parametrize("key,raw", [
+    ("chunk_size", "0"), ("chunk_size", "-3"), ("chunk_size", "101"), ("chunk_size", "x"),
+    ("max_parallel_chunks", "-1"), ("image_max_dim", "-1"),
+    ("engine", "Foo"), ("ocr_engine", "paddle"), ("chunk_mode", "auto"), ("image_format", "bmp"),
+    ("output_dir", "/tmp"), ("unbekannt", "1"),
+])
+def test_api_rejects(key, raw):
+    with pytest.raises(api.ApiError) as e:
+        api.parse_options({key: [raw]})
+    assert e.value.status == 400
+
+
+def test_api_accepts():
+    opts = api.parse_options({"chunk_size": ["10"], "max_parallel_chunks": ["0"], "engine": ["Marker"],
+                              "ocr_engine": ["tesseract"], "chunk_mode": ["adaptiv"], "image_max_dim": ["1600"],
+                              "force_ocr": ["ja"], "tags": ["a, b"]})
+    assert opts == {"chunk_size": 10, "max_parallel_chunks": 0, "engine": "Marker", "ocr_engine": "tesseract",
+                    "chunk_mode": "adaptiv", "image_max_dim": 1600, "force_ocr": True, "tags": ["a", "b"]}
+
+
+@pytest.mark.parametrize("args", [["--chunk-size", "0"], ["--chunk-size", "-1"], ["--chunk-size", "500"],
+                                  ["--max-parallel-chunks", "-2"], ["--image-max-dim", "-1"], ["--ocr-engine", "x"]])
+def test_cli_rejects(args, capsys):
+    with pytest.raises(SystemExit) as e:
+        cli.main(["nicht-vorhanden.pdf", *args])
+    assert e.value.code == 2
+    assert "error:" in capsys.readouterr().err
+
+
+@pytest.mark.parametrize("size", [0, -4])
+def test_build_page_chunks_guard(size):
+    with pytest.raises(ValueError):
+        pipeline.build_page_chunks(5, size)
+    with pytest.raises(ValueError):
+        pipeline.build_page_chunks(5, size, costs=[1.0] * 5)
+
+
+def test_build_page_chunks():
+    assert pipeline.build_page_chunks(25, 10) == [(1, 10), (11, 20), (21, 25)]
@@ -0,0 +1,53 @@
+# Golden-Tests für das Post-Processing: <fall>.in.md → <fall>.out.md.
+# Die erwarteten Dateien stammen aus der ursprünglichen postprocess_markdown-Implementierung (vor dem
+# Streaming-Umbau); String-Pfad, Datei-Pfad und die Stückelung an beliebigen Zeilengrenzen müssen sie
+# byte-genau reproduzieren.
+import os, sys, glob
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pipeline  # noqa: E402
+
+GOLDEN_DIR = os.path.join(ROOT, "tests", "golden", "postprocess")
+CASES = sorted(os.path.basename(p)[:-len(".in.md")] for p in glob.glob(os.path.join(GOLDEN_DIR, "*.in.md")))
+
+
+def _read(path: str) -> str:
+    with open(path, "r", encoding="utf-8", newline="") as fh:
+        return fh.read()
+
+
+def _case(name: str) -> tuple[str, str, str]:
+    src = os.path.join(GOLDEN_DIR, f"{name}.in.md")
+    return src, _read(src), _read(os.path.join(GOLDEN_DIR, f"{name}.out.md"))
+
+
+def test_cases_present():
+    assert {"footers", "tables", "frontmatter", "code_fences"} <= set(CASES)
+
+
+@pytest.mark.parametrize("name", CASES)
+def test_string_path(name):
+    _src, text, expected = _case(name)
+    assert pipeline.postprocess_markdown(text) == expected
+
+
+@pytest.mark.parametrize("name", CASES)
+def test_file_path(name, tmp_path):
+    src, _text, expected = _case(name)
+    dst = tmp_path / "out.md"
+    pipeline.postprocess_file(src, str(dst))
+    assert _read(str(dst)) == expected
+
+
+@pytest.mark.parametrize("block", [1, 7, 64])
+@pytest.mark.parametrize("name", CASES)
+def test_small_chunks(name, block):
+    # Stückgrenzen mitten im Dokument (String- und Datei-Stückelung) ändern die Ausgabe nicht
+    src, text, expected = _case(name)
+    assert "".join(pipeline.iter_postprocess(pipeline._text_chunks(text, block))) == expected
+    with open(src, "r", encoding="utf-8", newline="") as fh:
+        assert "".join(pipeline.iter_postprocess(pipeline._read_chunks(fh, block))) == expected
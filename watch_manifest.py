@@ -0,0 +1,245 @@
+# Persistentes Manifest des Inbox-Watchers (SQLite unter /app/data/state).
+# Schlüssel = Pfad + SHA-256 des Inhalts. Je Datei: Status, Versuche, nächster Versuch.
+# Fertige Dateien werden nach einem Neustart nicht erneut konvertiert, Fehler mit
+# exponentiellem Backoff wiederholt (bis WATCH_MAX_ATTEMPTS, danach erst nach Inhaltsänderung).
+import os, time, sqlite3, threading
+from contextlib import contextmanager
+
+DB_PATH = os.environ.get("WATCH_MANIFEST_DB", "/app/data/state/watch_manifest.db")
+MAX_ATTEMPTS = int(os.environ.get("WATCH_MAX_ATTEMPTS", "5"))
+RETRY_BASE = float(os.environ.get("WATCH_RETRY_BASE", "60"))
+RETRY_MAX = float(os.environ.get("WATCH_RETRY_MAX", str(6 * 3600)))
+# Einträge zu nicht mehr vorhandenen Dateien nach so vielen Tagen verwerfen
+KEEP_DAYS = float(os.environ.get("WATCH_MANIFEST_KEEP_DAYS", "30"))
+
+# queued: Job eingereiht/läuft · done: fertig · error: wartet auf Wiederholung
+# failed: MAX_ATTEMPTS erreicht · cancelled: abgebrochen (erst nach Inhaltsänderung wieder)
+STATUSES = ("queued", "done", "error", "failed", "cancelled")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT NOT NULL,
+    sha256 TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    job_id INTEGER,
+    next_attempt REAL,
+    last_error TEXT NOT NULL DEFAULT '',
+    updated REAL NOT NULL,
+    PRIMARY KEY (path, sha256)
+);
+CREATE INDEX IF NOT EXISTS files_due ON files(status, next_attempt);
+CREATE INDEX IF NOT EXISTS files_job ON files(job_id);
+"""
+
+_init_lock = threading.Lock()
+_initialized = False
+
+
+@contextmanager
+def _db():
+    global _initialized
+    os.makedirs(os.path.dirname(os.path.abspath(DB_PATH)), exist_ok=True)
+    conn = sqlite3.connect(DB_PATH, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    try:
+        if not _initialized:
+            with _init_lock:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(_SCHEMA)
+                _initialized = True
+        yield conn
+    finally:
+        conn.close()
+
+
+def backoff(attempts: int) -> float:
+    """Wartezeit vor dem nächsten Versuch: RETRY_BASE · 2^(Versuche−1), gedeckelt auf RETRY_MAX."""
+    return min(RETRY_MAX, RETRY_BASE * 2 ** max(0, attempts - 1))
+
+
+def identify(path: str) -> tuple[str, int, int] | None:
+    """(sha256, size, mtime_ns); der Hash wird wiederverwendet, wenn Größe und mtime bekannt sind."""
+    import doc_probe
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    with _db() as db:
+        row = db.execute(
+            "SELECT sha256 FROM files WHERE path=? AND size=? AND mtime_ns=? ORDER BY updated DESC LIMIT 1",
+            (path, st.st_size, st.st_mtime_ns),
+        ).fetchone()
+    if row is not None:
+        return row["sha256"], st.st_size, st.st_mtime_ns
+    try:
+        return doc_probe.file_sha256(path), st.st_size, st.st_mtime_ns
+    except OSError:
+        return None
+
+
+def claim(paths: list[str], job_statuses=None) -> list[tuple[str, str]]:
+    """
+    Filtert gemeldete Dateien: gibt (path, sha256) zurück, die jetzt eingereiht werden sollen.
+    Fertige, endgültig fehlgeschlagene, abgebrochene und noch im Backoff befindliche Dateien entfallen.
+    job_statuses(job_ids) → {job_id: status} aus der Queue; damit werden "queued"-Einträge abgeglichen,
+    deren Job ohne Rückmeldung endete (vor dem Start abgebrochen, Queue-DB gelöscht).
+    """
+    now = time.time()
+    out: list[tuple[str, str]] = []
+    for path in map(os.path.abspath, paths):
+        ident = identify(path)
+        if ident is None:
+            continue
+        sha, size, mtime_ns = ident
+        with _db() as db:
+            # Wiederholungen für einen früheren Inhalt derselben Datei sind überholt
+            db.execute("DELETE FROM files WHERE path=? AND sha256!=? AND status='error'", (path, sha))
+            row = db.execute("SELECT * FROM files WHERE path=? AND sha256=?", (path, sha)).fetchone()
+            if row is None:
+                db.execute(
+                    "INSERT INTO files (path, sha256, size, mtime_ns, status, updated) VALUES (?, ?, ?, ?, 'queued', ?)",
+                    (path, sha, size, mtime_ns, now),
+                )
+                out.append((path, sha))
+                continue
+            # mtime kann sich bei gleichem Inhalt ändern (touch, erneutes Kopieren)
+            db.execute("UPDATE files SET size=?, mtime_ns=? WHERE path=? AND sha256=?", (size, mtime_ns, path, sha))
+        status = row["status"]
+        if status == "queued":
+            if row["job_id"] is None or job_statuses is None:
+                continue
+            job_status = job_statuses([row["job_id"]]).get(row["job_id"])
+            if job_status in ("queued", "running"):
+                continue
+            if job_status is not None:
+                # Job endete ohne Rückmeldung (z. B. vor dem Start abgebrochen) → Ergebnis nachtragen
+                with _db() as db:
+                    _apply_result(db, path, sha, job_status, "", row["attempts"])
+                continue
+            # Job unbekannt (Queue-DB gelöscht) → erneut einreihen
+        elif status == "error":
+            if (row["next_attempt"] or 0) > now:
+                continue
+        else:
+            continue
+        with _db() as db:
+            db.execute("UPDATE files SET status='queued', updated=? WHERE path=? AND sha256=?", (now, path, sha))
+        out.append((path, sha))
+    return out
+
+
+def attach_jobs(pairs: list[tuple[str, str]], job_ids: list[int]) -> None:
+    with _db() as db:
+        db.executemany(
+            "UPDATE files SET job_id=?, updated=? WHERE path=? AND sha256=?",
+            [(jid, time.time(), path, sha) for (path, sha), jid in zip(pairs, job_ids)],
+        )
+
+
+def release(pairs: list[tuple[str, str]]) -> None:
+    """Gerade beanspruchte Einträge zurücknehmen (Einreihen in die Queue fehlgeschlagen)."""
+    with _db() as db:
+        for path, sha in pairs:
+            row = db.execute("SELECT attempts, job_id FROM files WHERE path=? AND sha256=?", (path, sha)).fetchone()
+            if row is None:
+                continue
+            if row["attempts"] == 0 and row["job_id"] is None:
+                db.execute("DELETE FROM files WHERE path=? AND sha256=?", (path, sha))
+            else:
+                db.execute("UPDATE files SET status='error', next_attempt=? WHERE path=? AND sha256=?", (time.time(), path, sha))
+
+
+def _apply_result(db, path: str, sha: str, status: str, error: str, attempts: int) -> None:
+    now = time.time()
+    next_attempt = None
+    if status == "error":
+        attempts += 1
+        if attempts >= MAX_ATTEMPTS:
+            status = "failed"
+        else:
+            next_attempt = now + backoff(attempts)
+    elif status == "done":
+        error = ""
+    db.execute(
+        "UPDATE files SET status=?, attempts=?, next_attempt=?, last_error=?, updated=? WHERE path=? AND sha256=?",
+        (status, attempts, next_attempt, (error or "")[-1000:], now, path, sha),
+    )
+
+
+def job_finished(job_id: int, source: str, status: str, error: str = "") -> None:
+    """
+    Ergebnis eines Jobs übernehmen (status: done/error/cancelled).
+    Jobs ohne Manifest-Eintrag (z. B. Upload im Konvertieren-Tab nach data/in) werden über
+    den aktuellen Dateiinhalt zugeordnet, damit der Watcher sie nach einem Neustart nicht erneut einreiht.
+    """
+    with _db() as db:
+        row = db.execute("SELECT path, sha256, attempts FROM files WHERE job_id=?", (job_id,)).fetchone()
+        if row is not None:
+            _apply_result(db, row["path"], row["sha256"], status, error, row["attempts"])
+            return
+    if status != "done":
+        return
+    path = os.path.abspath(source)
+    ident = identify(path)
+    if ident is None:
+        return
+    sha, size, mtime_ns = ident
+    with _db() as db:
+        db.execute(
+            "INSERT INTO files (path, sha256, size, mtime_ns, status, job_id, updated) VALUES (?, ?, ?, ?, 'done', ?, ?) "
+            "ON CONFLICT(path, sha256) DO UPDATE SET status='done', job_id=excluded.job_id, last_error='', "
+            "next_attempt=NULL, updated=excluded.updated",
+            (path, sha, size, mtime_ns, job_id, time.time()),
+        )
+
+
+def due(limit: int = 100) -> list[str]:
+    """Pfade mit fehlgeschlagenem Versuch, deren Backoff abgelaufen ist (verschwundene Dateien → failed)."""
+    with _db() as db:
+        rows = db.execute(
+            "SELECT path, sha256 FROM files WHERE status='error' AND next_attempt<=? ORDER BY next_attempt LIMIT ?",
+            (time.time(), limit),
+        ).fetchall()
+        gone = [(r["path"], r["sha256"]) for r in rows if not os.path.isfile(r["path"])]
+        db.executemany(
+            "UPDATE files SET status='failed', last_error='Datei nicht mehr vorhanden', next_attempt=NULL WHERE path=? AND sha256=?",
+            gone,
+        )
+    return [r["path"] for r in rows if (r["path"], r["sha256"]) not in gone]
+
+
+def retry_failed() -> int:
+    """Fehlgeschlagene/abgebrochene Einträge sofort wieder freigeben (Versuche zurücksetzen)."""
+    with _db() as db:
+        cur = db.execute(
+            "UPDATE files SET status='error', attempts=0, next_attempt=?, updated=? WHERE status IN ('error', 'failed', 'cancelled')",
+            (time.time(), time.time()),
+        )
+        return cur.rowcount
+
+
+def prune(keep_days: float = KEEP_DAYS) -> int:
+    """Einträge zu nicht mehr vorhandenen Dateien entfernen, die länger als keep_days unverändert sind."""
+    cutoff = time.time() - keep_days * 86400
+    with _db() as db:
+        rows = db.execute("SELECT path, sha256 FROM files WHERE updated<? AND status != 'queued'", (cutoff,)).fetchall()
+        gone = [(r["path"], r["sha256"]) for r in rows if not os.path.exists(r["path"])]
+        db.executemany("DELETE FROM files WHERE path=? AND sha256=?", gone)
+    return len(gone)
+
+
+def counts() -> dict[str, int]:
+    with _db() as db:
+        return {r["status"]: r["n"] for r in db.execute("SELECT status, COUNT(*) AS n FROM files GROUP BY status")}
+
+
+def problems(limit: int = 20) -> list[dict]:
+    """Einträge mit Fehler (neueste zuerst) für die Anzeige."""
+    with _db() as db:
+        rows = db.execute(
+            "SELECT * FROM files WHERE status IN ('error', 'failed') ORDER BY updated DESC LIMIT ?", (limit,)
+        ).fetchall()
+    return [dict(r) for r in rows]